@@ -4,8 +4,14 @@ from logging.handlers import RotatingFileHandler
 from flask import Flask, render_template, session
 from flask_cors import CORS
 from config import Config
-from utils.db import init_db
+from utils.db import init_db, migrate_db, start_checkpointer
+from utils.purge import start_purger
 from utils.auth import get_current_user
+from utils.assets import asset_url, send_asset
+from utils.compression import compress_response
+from utils.json_provider import FastJSONProvider
+from utils.metrics import install as install_metrics, start_flusher, metrics_response
+from utils.profiler import install as install_profiler
 from routes.auth import auth_bp
 from routes.table import table_bp
 from routes.api import api_bp
@@ -16,9 +22,15 @@ load_dotenv()
 
 # Initialize Flask app
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 app.config.from_object(Config)
 app.secret_key = Config.SECRET_KEY  # Required for sessions
 CORS(app, supports_credentials=True)
+app.jinja_env.globals['asset_url'] = asset_url
+# First, so request latency includes the other hooks and compression
+install_metrics(app, auth_bp, table_bp, api_bp)
+install_profiler(app, auth_bp, table_bp, api_bp)
+app.after_request(compress_response)
 
 # Setup logging
 def setup_logging():
@@ -67,6 +79,16 @@ def terms():
     """Terms of service page"""
     return render_template('terms.html')
 
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics for all workers"""
+    return metrics_response()
+
+@app.route('/static/dist/<path:filename>')
+def dist_asset(filename):
+    """Fingerprinted build output, cached forever by browsers"""
+    return send_asset(filename)
+
 @app.errorhandler(404)
 def not_found(error):
     """404 error handler"""
@@ -92,6 +114,14 @@ def initialize():
             app.logger.info("Database initialized successfully")
         else:
             app.logger.error("Failed to initialize database")
+    
+    # Add columns introduced since the database was created
+    migrate_db()
+    
+    # Per-process, so it also runs in every forked gunicorn worker
+    start_checkpointer()
+    start_purger()
+    start_flusher()
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -1,6 +1,20 @@
 import os
 from datetime import timedelta
 
+def local_timezone():
+    """IANA name of the server's zone (TZ, /etc/timezone or /etc/localtime), else UTC"""
+    if os.environ.get('TZ'):
+        return os.environ['TZ'].lstrip(':')
+    try:
+        with open('/etc/timezone', 'r') as f:
+            return f.read().strip() or 'UTC'
+    except OSError:
+        pass
+    localtime = os.path.realpath('/etc/localtime')
+    if 'zoneinfo/' in localtime:
+        return localtime.split('zoneinfo/', 1)[1]
+    return 'UTC'
+
 class Config:
     # Security
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
@@ -9,13 +23,95 @@ class Config:
     
     # Database
     DATABASE_PATH = os.environ.get('DATABASE_PATH') or 'kitchen_table.db'
+    DB_PROFILE = os.environ.get('DB_PROFILE') or 'pi'
+    # Per-table data is spread over this many files (see utils.db.shard_for)
+    DB_SHARDS = int(os.environ.get('DB_SHARDS') or 1)
+    
+    # Per-connection PRAGMAs for each DB_PROFILE (cache_size < 0 is KiB)
+    DB_PROFILES = {
+        'pi': {
+            'synchronous': 'NORMAL',
+            'cache_size': -8000,  # 8 MB
+            'mmap_size': 64 * 1024 * 1024,
+            'temp_store': 'MEMORY',
+            'busy_timeout': 5000,  # ms
+            'journal_size_limit': 16 * 1024 * 1024,
+        },
+        'server': {
+            'synchronous': 'NORMAL',
+            'cache_size': -64000,  # 64 MB
+            'mmap_size': 256 * 1024 * 1024,
+            'temp_store': 'MEMORY',
+            'busy_timeout': 10000,
+            'journal_size_limit': 64 * 1024 * 1024,
+        },
+        'test': {
+            'synchronous': 'OFF',
+            'cache_size': -2000,
+            'mmap_size': 0,
+            'temp_store': 'MEMORY',
+            'busy_timeout': 1000,
+            'journal_size_limit': 4 * 1024 * 1024,
+        },
+    }
+    
+    # Background WAL checkpointer (one thread per worker process)
+    DB_CHECKPOINT_ENABLED = os.environ.get('DB_CHECKPOINT_ENABLED', 'true').lower() == 'true'
+    DB_CHECKPOINT_INTERVAL = int(os.environ.get('DB_CHECKPOINT_INTERVAL') or 60)  # seconds
+    
+    # Single writer thread per process with group commit (see utils/writer.py)
+    WRITE_QUEUE_ENABLED = os.environ.get('WRITE_QUEUE_ENABLED', 'true').lower() == 'true'
+    WRITE_BATCH_MAX = int(os.environ.get('WRITE_BATCH_MAX') or 64)
+    WRITE_BATCH_WAIT_MS = float(os.environ.get('WRITE_BATCH_WAIT_MS') or 2)
+    WRITE_TIMEOUT = 10  # seconds a request waits for its write to commit
+    
+    # Background deletion of tombstoned accounts and tables (see utils/purge.py)
+    PURGE_ENABLED = os.environ.get('PURGE_ENABLED', 'true').lower() == 'true'
+    PURGE_INTERVAL = int(os.environ.get('PURGE_INTERVAL') or 60)  # seconds between checks for new jobs
+    PURGE_BATCH_SIZE = int(os.environ.get('PURGE_BATCH_SIZE') or 200)  # rows deleted per write
+    PURGE_PAUSE_MS = 20  # gap between batches so other writes get in
+    PURGE_LEASE = 300  # seconds a worker owns a job before another may take it over
+    
+    # Prometheus metrics at /metrics, summed over workers (see utils/metrics.py)
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # scrapers send Authorization: Bearer <token>; metrics are off without one
+    METRICS_ENABLED = bool(METRICS_TOKEN) and os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_DATABASE_PATH = os.environ.get('METRICS_DATABASE_PATH') or 'kitchen_table_metrics.db'
+    METRICS_FLUSH_INTERVAL = int(os.environ.get('METRICS_FLUSH_INTERVAL') or 5)  # seconds a worker's counts wait before they're shared
+    METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # latency histogram bounds in seconds
+    
+    # Request profiling (see utils/profiler.py and scripts/profile_report.py)
+    PROFILE_SAMPLE_RATE = int(os.environ.get('PROFILE_SAMPLE_RATE') or 0)  # profile 1 in N requests; 0 = only signed ones
+    PROFILE_SECRET = os.environ.get('PROFILE_SECRET')  # signs X-Profile headers; unset turns them off
+    PROFILE_MODE = os.environ.get('PROFILE_MODE') or 'sample'  # 'sample' (collapsed stacks) or 'cprofile' (pstats)
+    PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS') or 5)  # stack sampling period
+    PROFILE_DIR = os.environ.get('PROFILE_DIR') or 'profiles'
+    PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP') or 500)  # profile files kept; the oldest go first
     
     # Application
     MAX_CONTENT_LENGTH = 16 * 1024  # 16KB max request size
     TABLE_MIN_MEMBERS = 2
-    TABLE_MAX_MEMBERS = 10
+    TABLE_MAX_MEMBERS = 10  # default member limit; owners can change it per table
+    TABLE_MEMBER_LIMIT = int(os.environ.get('TABLE_MEMBER_LIMIT') or 1000)  # highest limit an owner may set
     RESPONSE_MAX_LENGTH = 500
+    RESPONSE_PAGE_SIZE = 50  # responses per page of a prompt's feed
+    MEMBER_PAGE_SIZE = 50  # members per page of a table's member list
+    PAGE_SIZE_MAX = 200  # largest ?limit= the paginated listings accept
+    SEARCH_PAGE_SIZE = 20  # results per /api/search page
+    SEARCH_MAX_QUERY_LENGTH = 100
+    EXPORT_BATCH_SIZE = 500  # rows fetched (and written) per step of /api/table/export
+    STATS_TOP_DAYS = 5  # busiest days listed by /api/table/stats
+    STATS_RECENT_DAYS = 30  # daily counts returned for the stats chart
+    CACHE_ENABLED = os.environ.get('CACHE_ENABLED', 'true').lower() == 'true'
+    CACHE_CHECK_INTERVAL_MS = int(os.environ.get('CACHE_CHECK_INTERVAL_MS') or 100)  # longest a worker serves a stale entry
+    CACHE_MAX_ENTRIES = 10000  # per worker; the oldest entry goes first
+    CACHE_INVALIDATION_RETENTION = 600  # seconds invalidation rows are kept; idler workers flush everything
+    PRESENCE_HEARTBEAT = int(os.environ.get('PRESENCE_HEARTBEAT') or 60)  # seconds between a member's shared heartbeats
+    PRESENCE_TTL = int(os.environ.get('PRESENCE_TTL') or 120)  # seconds since the last request that still count as online
+    UNREAD_WINDOW_DAYS = 7  # unread badges count answers to prompts from this many days back
     DEFAULT_PROMPT_TIME = '17:00'  # 5 PM
+    # Zone for tables that don't pick one (and for tables created before zones existed)
+    DEFAULT_TIMEZONE = os.environ.get('DEFAULT_TIMEZONE') or local_timezone()
+    PROMPT_SCHEDULE_WINDOW = 60  # seconds ahead scripts/daily_prompt.py creates prompts
     APP_URL = os.environ.get('APP_URL') or 'http://localhost:5000'
     
     # Email Configuration (for password resets)
@@ -26,6 +122,28 @@ class Config:
     SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD')  # Gmail app password
     SMTP_FROM_EMAIL = os.environ.get('SMTP_FROM_EMAIL') or SMTP_USERNAME
     
+    # Backups (scripts/backup_db.py)
+    BACKUP_DIR = os.environ.get('BACKUP_DIR') or 'backups'
+    BACKUP_KEEP = int(os.environ.get('BACKUP_KEEP') or 30)  # scheduled snapshots to keep
+    BACKUP_STEP_PAGES = 256  # pages copied per online backup step
+    BACKUP_STEP_SLEEP = 0.05  # seconds between steps so writers aren't stalled
+    BACKUP_MAX_RESTARTS = 3  # step-by-step copies restarted by app writes before copying in one step
+    # Archive WAL frames from the app's checkpointer right before each checkpoint (and
+    # turn autocheckpoint off), so the WAL never restarts past frames the backups lack
+    BACKUP_WAL_ARCHIVE = os.environ.get('BACKUP_WAL_ARCHIVE', 'true').lower() == 'true'
+    
+    # Cold storage for old prompts and responses (scripts/archive_db.py)
+    ARCHIVE_DATABASE_PATH = os.environ.get('ARCHIVE_DATABASE_PATH') or 'kitchen_table_archive.db'
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS') or 90)  # must exceed the 7-day history view
+    ARCHIVE_BATCH_SIZE = 500  # prompts moved per transaction
+    
+    # Response compression (gzip, or brotli when installed)
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'true').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE') or 500)  # bytes
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL') or 6)  # gzip 1-9
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY') or 4)  # brotli 0-11
+    COMPRESS_MIMETYPES = ['application/json', 'text/html']
+    
     # Logging
     LOG_FILE = 'kitchen_table.log'
     LOG_LEVEL = os.environ.get('LOG_LEVEL') or 'INFO'
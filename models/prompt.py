@@ -1,37 +1,73 @@
 import logging
-from datetime import date, datetime
-from utils.db import get_db_context, dict_from_row
+from utils.db import table_db_context, shard_for, dict_from_row
+from utils.writer import run_write
+from utils.singleflight import singleflight, forget
+from utils.prompts import is_editable, format_utc, utc_now
+from utils.streaks import extend_streak
+from utils.pagination import keyset_page
 from config import Config
 
 logger = logging.getLogger(__name__)
 
 class Prompt:
     @staticmethod
-    def get_responses(prompt_id, table_id):
-        """Get all responses for a prompt with table-specific display names"""
+    def get_responses(prompt_id, table_id, after=None, limit=None):
+        """One page of a prompt's responses, oldest first, with table-specific display names.
+        
+        Returns {'responses', 'next_cursor', 'has_more'}; pass next_cursor's values
+        back as `after` for the next page (or to poll for newer responses).
+        """
+        limit = limit or Config.RESPONSE_PAGE_SIZE
+        if after is None and limit == Config.RESPONSE_PAGE_SIZE:
+            # The first page is identical for every member, so concurrent polls share one query
+            return singleflight(('responses', prompt_id), Prompt._get_responses, prompt_id, table_id, after, limit)
+        return Prompt._get_responses(prompt_id, table_id, after, limit)
+
+    @staticmethod
+    def _get_responses(prompt_id, table_id, after, limit):
+        created_at, response_id = after or ('', 0)
         try:
-            with get_db_context() as conn:
+            with table_db_context(table_id, query_only=True) as conn:
+                # Keyset on (created_at, id): the row value lets each page start with an
+                # index seek on idx_responses_prompt_created, however deep it is
                 cursor = conn.execute('''
                     SELECT r.*, tm.display_name, u.username
                     FROM responses r
                     JOIN users u ON r.user_id = u.id
                     JOIN table_members tm ON r.user_id = tm.user_id 
                     JOIN prompts p ON r.prompt_id = p.id
-                    WHERE r.prompt_id = ? AND tm.table_id = p.table_id
-                    ORDER BY r.created_at ASC
-                ''', (prompt_id,))
-                
-                responses = cursor.fetchall()
-                return [dict_from_row(r) for r in responses]
+                    WHERE r.prompt_id = ? AND p.table_id = ? AND tm.table_id = p.table_id
+                      AND (r.created_at, r.id) > (?, ?)
+                    ORDER BY r.created_at, r.id
+                    LIMIT ?
+                ''', (prompt_id, table_id, created_at, response_id, limit + 1))
+                
+                # Rows are serialized directly by the JSON provider
+                return keyset_page('responses', cursor.fetchall(), limit, after,
+                                   lambda row: (row['created_at'], row['id']))
         except Exception as e:
             logger.error(f"Error getting responses: {str(e)}")
-            return []
+            return keyset_page('responses', [], limit, after, None)
+
+    @staticmethod
+    def get_prompt(prompt_id, table_id):
+        """A prompt by id, or None if it isn't one of this table's"""
+        try:
+            with table_db_context(table_id, query_only=True) as conn:
+                cursor = conn.execute(
+                    'SELECT * FROM prompts WHERE id = ? AND table_id = ?',
+                    (prompt_id, table_id)
+                )
+                return cursor.fetchone()
+        except Exception as e:
+            logger.error(f"Error getting prompt: {str(e)}")
+            return None
 
     @staticmethod
-    def user_has_responded(prompt_id, user_id):
+    def user_has_responded(prompt_id, user_id, table_id):
         """Check if user has responded to prompt"""
         try:
-            with get_db_context() as conn:
+            with table_db_context(table_id, query_only=True) as conn:
                 cursor = conn.execute('''
                     SELECT id FROM responses 
                     WHERE prompt_id = ? AND user_id = ?
@@ -42,7 +78,7 @@ class Prompt:
             return False
 
     @staticmethod
-    def submit_response(prompt_id, user_id, response_text):
+    def submit_response(prompt_id, user_id, response_text, table_id):
         """Submit a response to a prompt"""
         try:
             # Validate length
@@ -52,24 +88,26 @@ class Prompt:
             if len(response_text.strip()) == 0:
                 return False, "Response cannot be empty"
             
-            with get_db_context() as conn:
-                # Check if already responded
+            def write(conn):
+                # One statement, so simultaneous submits can't both pass an existence check
                 cursor = conn.execute('''
-                    SELECT id FROM responses 
-                    WHERE prompt_id = ? AND user_id = ?
-                ''', (prompt_id, user_id))
-                
-                if cursor.fetchone():
-                    return False, "You've already responded to this prompt"
-                
-                # Insert response
-                conn.execute('''
                     INSERT INTO responses (prompt_id, user_id, response_text)
                     VALUES (?, ?, ?)
+                    ON CONFLICT(prompt_id, user_id) DO NOTHING
+                    RETURNING id
                 ''', (prompt_id, user_id, response_text.strip()))
                 
+                if cursor.fetchone() is None:
+                    return False, "You've already responded to this prompt"
+                
+                extend_streak(conn, prompt_id, user_id)
                 logger.info(f"User {user_id} responded to prompt {prompt_id}")
                 return True, "Response submitted successfully"
+            
+            result = run_write(write, shard=shard_for(table_id))
+            # A query already in flight may not include this response
+            forget(('responses', prompt_id))
+            return result
         except Exception as e:
             logger.error(f"Error submitting response: {str(e)}")
             return False, "Error submitting response"
@@ -85,51 +123,18 @@ class Prompt:
             if len(response_text.strip()) == 0:
                 return False, "Response cannot be empty"
             
-            with get_db_context() as conn:
+            def write(conn):
                 # Get prompt info
-                cursor = conn.execute('''
-                    SELECT p.prompt_date, t.prompt_time 
-                    FROM prompts p
-                    JOIN tables t ON p.table_id = t.id
-                    WHERE p.id = ?
-                ''', (prompt_id,))
+                cursor = conn.execute(
+                    'SELECT editable_from, editable_until FROM prompts WHERE id = ?',
+                    (prompt_id,)
+                )
                 
                 prompt = cursor.fetchone()
                 if not prompt:
                     return False, "Prompt not found"
                 
-                # Check if prompt is still active
-                prompt_date = datetime.strptime(prompt['prompt_date'], '%Y-%m-%d').date()
-                prompt_time = datetime.strptime(prompt['prompt_time'], '%H:%M').time()
-                
-                now = datetime.now()
-                today = now.date()
-                current_time = now.time()
-                
-                # Determine if we're still in the same prompt period
-                if today == prompt_date:
-                    # Same day, check if we've passed the prompt time yet
-                    if current_time < prompt_time:
-                        # We haven't reached the prompt time yet, so this is still yesterday's prompt
-                        is_active = False
-                    else:
-                        # We've passed the prompt time, so this is today's active prompt
-                        is_active = True
-                elif today > prompt_date:
-                    # Check if we're before today's prompt time
-                    next_day = prompt_date
-                    while next_day < today:
-                        next_day = date.fromordinal(next_day.toordinal() + 1)
-                    
-                    if today == next_day and current_time < prompt_time:
-                        # We're on the next day but before the prompt time
-                        is_active = True
-                    else:
-                        is_active = False
-                else:
-                    is_active = False
-                
-                if not is_active:
+                if not is_editable(prompt):
                     return False, "Cannot edit responses from previous days"
                 
                 # Update response
@@ -141,6 +146,10 @@ class Prompt:
                 
                 logger.info(f"User {user_id} edited response to prompt {prompt_id}")
                 return True, "Response updated successfully"
+            
+            result = run_write(write, shard=shard_for(table_id))
+            forget(('responses', prompt_id))
+            return result
         except Exception as e:
             logger.error(f"Error editing response: {str(e)}")
             return False, "Error editing response"
@@ -149,7 +158,7 @@ class Prompt:
     def get_prompt_with_responses(prompt_id, user_id, table_id):
         """Get prompt with responses (only if user has responded)"""
         try:
-            with get_db_context() as conn:
+            with table_db_context(table_id, query_only=True) as conn:
                 # Get prompt
                 cursor = conn.execute('SELECT * FROM prompts WHERE id = ?', (prompt_id,))
                 prompt = cursor.fetchone()
@@ -160,14 +169,14 @@ class Prompt:
                 prompt_dict = dict_from_row(prompt)
                 
                 # Check if user has responded
-                user_responded = Prompt.user_has_responded(prompt_id, user_id)
+                user_responded = Prompt.user_has_responded(prompt_id, user_id, table_id)
                 prompt_dict['user_has_responded'] = user_responded
                 
-                # Get responses only if user has responded
+                # Get responses only if user has responded (first page; the rest via next_cursor)
                 if user_responded:
-                    prompt_dict['responses'] = Prompt.get_responses(prompt_id, table_id)
+                    prompt_dict.update(Prompt.get_responses(prompt_id, table_id))
                 else:
-                    prompt_dict['responses'] = []
+                    prompt_dict.update(responses=[], next_cursor=None, has_more=False)
                 
                 # Get response count
                 cursor = conn.execute(
@@ -177,7 +186,7 @@ class Prompt:
                 prompt_dict['response_count'] = cursor.fetchone()['count']
                 
                 # Check if prompt is still editable
-                prompt_dict['is_editable'] = Prompt.is_prompt_active(prompt_dict['prompt_date'], prompt_dict['table_id'])
+                prompt_dict['is_editable'] = is_editable(prompt_dict)
                 
                 return prompt_dict
         except Exception as e:
@@ -185,10 +194,10 @@ class Prompt:
             return None
 
     @staticmethod
-    def get_user_response(prompt_id, user_id):
+    def get_user_response(prompt_id, user_id, table_id):
         """Get user's response to a prompt"""
         try:
-            with get_db_context() as conn:
+            with table_db_context(table_id, query_only=True) as conn:
                 cursor = conn.execute('''
                     SELECT * FROM responses 
                     WHERE prompt_id = ? AND user_id = ?
@@ -204,31 +213,14 @@ class Prompt:
     def is_prompt_active(prompt_date_str, table_id):
         """Check if a prompt is still active (editable)"""
         try:
-            with get_db_context() as conn:
-                cursor = conn.execute('SELECT prompt_time FROM tables WHERE id = ?', (table_id,))
-                table = cursor.fetchone()
-                
-                if not table:
-                    return False
-                
-                prompt_date = datetime.strptime(prompt_date_str, '%Y-%m-%d').date()
-                prompt_time = datetime.strptime(table['prompt_time'], '%H:%M').time()
-                
-                now = datetime.now()
-                today = now.date()
-                current_time = now.time()
-                
-                # Check if we're in the same prompt period
-                if today == prompt_date:
-                    return current_time >= prompt_time
-                elif today > prompt_date:
-                    # Check if we're still before today's prompt time
-                    days_diff = (today - prompt_date).days
-                    if days_diff == 1 and current_time < prompt_time:
-                        return True
-                    return False
-                else:
-                    return False
+            with table_db_context(table_id, query_only=True) as conn:
+                now = format_utc(utc_now())
+                cursor = conn.execute('''
+                    SELECT 1 FROM prompts 
+                    WHERE table_id = ? AND prompt_date = ?
+                      AND editable_from <= ? AND editable_until > ?
+                ''', (table_id, prompt_date_str, now, now))
+                return cursor.fetchone() is not None
         except Exception as e:
             logger.error(f"Error checking if prompt is active: {str(e)}")
             return False
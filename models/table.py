@@ -1,29 +1,44 @@
 import logging
-from utils.db import get_db_context, dict_from_row
+from utils.db import get_db_context, table_db_context, shard_for, all_shards, dict_from_row
+from utils.writer import run_write
+from utils.purge import queue_deletion, wake_purger
+from utils.prompts import edit_window, next_boundary, get_zone, format_utc, utc_now
+from datetime import timedelta
 from utils.auth import generate_invite_code
+from utils.pagination import keyset_page
+from utils.cache import cached, cache_key, invalidate
 from config import Config
 
 logger = logging.getLogger(__name__)
 
 class Table:
     @staticmethod
-    def create(name, created_by, prompt_time='17:00'):
+    def create(name, created_by, prompt_time='17:00', timezone=None):
         """Create a new table"""
         try:
+            timezone = timezone or Config.DEFAULT_TIMEZONE
+            boundary = format_utc(next_boundary(prompt_time, get_zone(timezone)))
             invite_code = generate_invite_code()
             
             # Ensure unique invite code
             while Table.get_by_invite_code(invite_code):
                 invite_code = generate_invite_code()
             
-            with get_db_context() as conn:
+            def write(conn):
                 cursor = conn.execute('''
-                    INSERT INTO tables (name, invite_code, created_by, prompt_time)
-                    VALUES (?, ?, ?, ?)
-                ''', (name, invite_code, created_by, prompt_time))
+                    INSERT INTO tables (name, invite_code, created_by, prompt_time, timezone,
+                                        next_boundary_utc, member_count)
+                    VALUES (?, ?, ?, ?, ?, ?, 1)
+                ''', (name, invite_code, created_by, prompt_time, timezone, boundary))
                 
                 table_id = cursor.lastrowid
                 
+                # New tables are spread round-robin over the shards
+                conn.execute('UPDATE tables SET shard = ? WHERE id = ?',
+                             (table_id % Config.DB_SHARDS, table_id))
+                return table_id
+            
+            def add_owner(conn, table_id):
                 # Get user's display name
                 user_cursor = conn.execute('SELECT display_name FROM users WHERE id = ?', (created_by,))
                 user = user_cursor.fetchone()
@@ -34,19 +49,32 @@ class Table:
                     INSERT INTO table_members (table_id, user_id, role, display_name)
                     VALUES (?, ?, 'owner', ?)
                 ''', (table_id, created_by, display_name))
-                
-                logger.info(f"Created table: {name} (ID: {table_id}, Code: {invite_code})")
-                return table_id, invite_code
+            
+            table_id = run_write(write)
+            try:
+                run_write(add_owner, table_id, shard=shard_for(table_id))
+            except Exception:
+                # The shard is a separate file, so undo the table row by hand
+                run_write(lambda conn: conn.execute('DELETE FROM tables WHERE id = ?', (table_id,)))
+                raise
+            
+            logger.info(f"Created table: {name} (ID: {table_id}, Code: {invite_code})")
+            return table_id, invite_code
         except Exception as e:
             logger.error(f"Error creating table: {str(e)}")
             raise
 
     @staticmethod
     def get_by_id(table_id):
-        """Get table by ID"""
+        """Get table by ID (cached per worker; writes to the row call invalidate)"""
+        table = cached(cache_key('table', table_id), Table._get_by_id, table_id)
+        return dict(table) if table else None
+
+    @staticmethod
+    def _get_by_id(table_id):
         try:
             with get_db_context() as conn:
-                cursor = conn.execute('SELECT * FROM tables WHERE id = ?', (table_id,))
+                cursor = conn.execute('SELECT * FROM tables WHERE id = ? AND deleted_at IS NULL', (table_id,))
                 table = cursor.fetchone()
                 return dict_from_row(table) if table else None
         except Exception as e:
@@ -59,7 +87,7 @@ class Table:
         try:
             with get_db_context() as conn:
                 cursor = conn.execute(
-                    'SELECT * FROM tables WHERE invite_code = ?',
+                    'SELECT * FROM tables WHERE invite_code = ? AND deleted_at IS NULL',
                     (invite_code.upper(),)
                 )
                 table = cursor.fetchone()
@@ -76,28 +104,68 @@ class Table:
 
     @staticmethod
     def get_user_tables(user_id):
-        """Get all tables a user belongs to"""
+        """Get all tables a user belongs to, with unread answers and whether they've answered today.
+        
+        "Unread" is other members' responses past the member's (created_at, id) read
+        cursor, on prompts from the last UNREAD_WINDOW_DAYS. Ids alone won't do: a
+        table moved to another shard keeps its ids and gets new ones from that
+        shard's range, which may be lower.
+        """
         try:
-            with get_db_context() as conn:
-                cursor = conn.execute('''
-                    SELECT t.*, tm.role 
-                    FROM tables t
-                    JOIN table_members tm ON t.id = tm.table_id
-                    WHERE tm.user_id = ?
-                    ORDER BY tm.joined_at DESC
-                ''', (user_id,))
-                
-                tables = cursor.fetchall()
-                return [dict_from_row(t) for t in tables]
+            now = utc_now()
+            # Memberships live on each table's shard, so ask every shard and merge
+            tables = []
+            for shard in all_shards():
+                with get_db_context(shard=shard) as conn:
+                    cursor = conn.execute('''
+                        SELECT t.*, tm.role, tm.joined_at,
+                               (SELECT COUNT(*) FROM prompts p
+                                JOIN responses r ON r.prompt_id = p.id
+                                WHERE p.table_id = t.id AND p.editable_until > ?
+                                  AND (r.created_at, r.id) > (COALESCE(tm.last_seen_response_at, ''), tm.last_seen_response_seq)
+                                  AND r.user_id != tm.user_id
+                               ) AS unread_count,
+                               EXISTS (SELECT 1 FROM prompts p
+                                       JOIN responses r ON r.prompt_id = p.id AND r.user_id = tm.user_id
+                                       WHERE p.table_id = t.id AND p.editable_until > ?
+                                         AND p.editable_from <= ?
+                               ) AS answered_today
+                        FROM tables t
+                        JOIN table_members tm ON t.id = tm.table_id
+                        WHERE tm.user_id = ?
+                        ORDER BY tm.joined_at DESC
+                    ''', (format_utc(now - timedelta(days=Config.UNREAD_WINDOW_DAYS)),
+                          format_utc(now), format_utc(now), user_id))
+                    tables.extend(cursor.fetchall())
+            
+            if len(all_shards()) > 1:
+                tables.sort(key=lambda table: (table['joined_at'], table['id']), reverse=True)
+            return tables
         except Exception as e:
             logger.error(f"Error getting user tables: {str(e)}")
             return []
 
+    @staticmethod
+    def mark_seen(table_id, user_id, created_at, response_id):
+        """Move a member's read cursor up to the response (created_at, response_id) (never back)"""
+        try:
+            run_write(
+                lambda conn: conn.execute('''
+                    UPDATE table_members SET last_seen_response_at = ?, last_seen_response_seq = ?
+                    WHERE table_id = ? AND user_id = ?
+                      AND (COALESCE(last_seen_response_at, ''), last_seen_response_seq) < (?, ?)
+                ''', (created_at, response_id, table_id, user_id, created_at, response_id)),
+                wait=False,
+                shard=shard_for(table_id)
+            )
+        except Exception as e:
+            logger.error(f"Error updating read cursor: {str(e)}")
+
     @staticmethod
     def add_member(table_id, user_id):
         """Add a member to a table"""
         try:
-            with get_db_context() as conn:
+            def write(conn):
                 # Check if user is already in THIS table
                 cursor = conn.execute(
                     'SELECT id FROM table_members WHERE table_id = ? AND user_id = ?',
@@ -107,16 +175,17 @@ class Table:
                     logger.warning(f"User {user_id} already in table {table_id}")
                     return False, "You're already in this kitchen table"
                 
-                # Check member count
+                # Check member count against the table's own limit
                 cursor = conn.execute(
                     'SELECT COUNT(*) as count FROM table_members WHERE table_id = ?',
                     (table_id,)
                 )
                 count = cursor.fetchone()['count']
+                limit = Table.member_limit(conn, table_id)
                 
-                if count >= Config.TABLE_MAX_MEMBERS:
+                if count >= limit:
                     logger.warning(f"Table {table_id} is full")
-                    return False, f"This table is full (max {Config.TABLE_MAX_MEMBERS} members)"
+                    return False, f"This table is full (max {limit} members)"
                 
                 # Get user's default display name
                 user_cursor = conn.execute('SELECT display_name FROM users WHERE id = ?', (user_id,))
@@ -128,38 +197,78 @@ class Table:
                     INSERT INTO table_members (table_id, user_id, role, display_name)
                     VALUES (?, ?, 'member', ?)
                 ''', (table_id, user_id, display_name))
+                invalidate(conn, cache_key('members', table_id))
                 
                 logger.info(f"Added user {user_id} to table {table_id}")
                 return True, "Successfully joined table"
+            
+            success, message = run_write(write, shard=shard_for(table_id))
+            if success:
+                Table.sync_member_count(table_id)
+            return success, message
         except Exception as e:
             logger.error(f"Error adding member: {str(e)}")
             return False, "Error joining table"
 
     @staticmethod
-    def get_members(table_id):
-        """Get all members of a table"""
+    def member_limit(conn, table_id):
+        """How many members a table may have (works on any shard's connection)"""
+        row = conn.execute('SELECT max_members FROM tables WHERE id = ?', (table_id,)).fetchone()
+        return row['max_members'] if row and row['max_members'] else Config.TABLE_MAX_MEMBERS
+
+    @staticmethod
+    def sync_member_count(table_id):
+        """Copy the membership count from the table's shard into tables.member_count.
+        
+        Counting inside the core write (rather than passing a number along) means
+        the last sync to commit always stores the latest count, even when joins
+        and leaves race.
+        """
         try:
-            with get_db_context() as conn:
+            def write(conn):
+                with table_db_context(table_id, query_only=True) as shard_conn:
+                    count = shard_conn.execute(
+                        'SELECT COUNT(*) as count FROM table_members WHERE table_id = ?', (table_id,)
+                    ).fetchone()['count']
+                conn.execute('UPDATE tables SET member_count = ? WHERE id = ?', (count, table_id))
+                invalidate(conn, cache_key('table', table_id))
+            
+            run_write(write)
+        except Exception as e:
+            logger.error(f"Error syncing member count: {str(e)}")
+
+    @staticmethod
+    def get_members(table_id, after=None, limit=None):
+        """One page of a table's members in join order: {'members', 'next_cursor', 'has_more'}"""
+        limit = limit or Config.MEMBER_PAGE_SIZE
+        joined_at, member_id = after or ('', 0)
+        try:
+            with table_db_context(table_id) as conn:
+                # Keyset on (joined_at, membership id): a seek on idx_table_members_joined
                 cursor = conn.execute('''
                     SELECT u.id, u.username, tm.display_name, u.last_active,
-                           tm.role, tm.joined_at
-                    FROM users u
-                    JOIN table_members tm ON u.id = tm.user_id
+                           tm.role, tm.joined_at, tm.streak_current, tm.streak_best,
+                           tm.id AS member_id
+                    FROM table_members tm
+                    JOIN users u ON u.id = tm.user_id
                     WHERE tm.table_id = ?
-                    ORDER BY tm.joined_at ASC
-                ''', (table_id,))
+                      AND (tm.joined_at, tm.id) > (?, ?)
+                    ORDER BY tm.joined_at, tm.id
+                    LIMIT ?
+                ''', (table_id, joined_at, member_id, limit + 1))
                 
-                members = cursor.fetchall()
-                return [dict_from_row(m) for m in members]
+                # Rows are serialized directly by the JSON provider
+                return keyset_page('members', cursor.fetchall(), limit, after,
+                                   lambda row: (row['joined_at'], row['member_id']))
         except Exception as e:
             logger.error(f"Error getting table members: {str(e)}")
-            return []
+            return keyset_page('members', [], limit, after, None)
 
     @staticmethod
     def get_member_display_name(table_id, user_id):
         """Get member's display name for a specific table"""
         try:
-            with get_db_context() as conn:
+            with table_db_context(table_id) as conn:
                 cursor = conn.execute('''
                     SELECT display_name FROM table_members 
                     WHERE table_id = ? AND user_id = ?
@@ -175,7 +284,7 @@ class Table:
     def update_member_display_name(table_id, user_id, display_name):
         """Update member's display name for a specific table"""
         try:
-            with get_db_context() as conn:
+            def write(conn):
                 conn.execute('''
                     UPDATE table_members 
                     SET display_name = ? 
@@ -184,6 +293,8 @@ class Table:
                 
                 logger.info(f"Updated display name for user {user_id} in table {table_id}")
                 return True
+            
+            return run_write(write, shard=shard_for(table_id))
         except Exception as e:
             logger.error(f"Error updating member display name: {str(e)}")
             return False
@@ -191,22 +302,25 @@ class Table:
     @staticmethod
     def is_member(table_id, user_id):
         """Check if user is a member of table"""
+        # Checked on every table request: the member ids are cached per worker,
+        # and joins and leaves invalidate them
+        return user_id in cached(cache_key('members', table_id), Table._member_ids, table_id)
+
+    @staticmethod
+    def _member_ids(table_id):
         try:
-            with get_db_context() as conn:
-                cursor = conn.execute('''
-                    SELECT id FROM table_members 
-                    WHERE table_id = ? AND user_id = ?
-                ''', (table_id, user_id))
-                return cursor.fetchone() is not None
+            with table_db_context(table_id) as conn:
+                cursor = conn.execute('SELECT user_id FROM table_members WHERE table_id = ?', (table_id,))
+                return frozenset(row['user_id'] for row in cursor)
         except Exception as e:
             logger.error(f"Error checking membership: {str(e)}")
-            return False
+            return frozenset()
 
     @staticmethod
     def is_owner(table_id, user_id):
         """Check if user is owner of table"""
         try:
-            with get_db_context() as conn:
+            with table_db_context(table_id) as conn:
                 cursor = conn.execute('''
                     SELECT id FROM table_members 
                     WHERE table_id = ? AND user_id = ? AND role = 'owner'
@@ -217,10 +331,18 @@ class Table:
             return False
 
     @staticmethod
-    def update_settings(table_id, name=None, prompt_time=None):
+    def update_settings(table_id, name=None, prompt_time=None, timezone=None, max_members=None):
         """Update table settings"""
         try:
-            with get_db_context() as conn:
+            def write(conn):
+                invalidate(conn, cache_key('table', table_id))
+                
+                if max_members:
+                    conn.execute(
+                        'UPDATE tables SET max_members = ? WHERE id = ?',
+                        (max_members, table_id)
+                    )
+                
                 if name:
                     conn.execute(
                         'UPDATE tables SET name = ? WHERE id = ?',
@@ -233,8 +355,42 @@ class Table:
                         (prompt_time, table_id)
                     )
                 
-                logger.info(f"Updated settings for table {table_id}")
-                return True
+                if timezone:
+                    conn.execute(
+                        'UPDATE tables SET timezone = ? WHERE id = ?',
+                        (timezone, table_id)
+                    )
+                
+                if prompt_time or timezone:
+                    table = conn.execute(
+                        'SELECT prompt_time, timezone FROM tables WHERE id = ?', (table_id,)
+                    ).fetchone()
+                    conn.execute(
+                        'UPDATE tables SET next_boundary_utc = ? WHERE id = ?',
+                        (format_utc(next_boundary(table['prompt_time'], get_zone(table['timezone']))), table_id)
+                    )
+                    return table['prompt_time'], table['timezone']
+                return None
+            
+            def move_windows(conn, prompt_time, timezone):
+                # Move the edit windows of prompts that haven't closed yet
+                zone = get_zone(timezone)
+                cursor = conn.execute(
+                    'SELECT id, prompt_date FROM prompts WHERE table_id = ? AND editable_until > ?',
+                    (table_id, format_utc(utc_now()))
+                )
+                for prompt in cursor.fetchall():
+                    conn.execute(
+                        'UPDATE prompts SET editable_from = ?, editable_until = ? WHERE id = ?',
+                        edit_window(prompt['prompt_date'], prompt_time, zone) + (prompt['id'],)
+                    )
+            
+            clock = run_write(write)
+            if clock:
+                run_write(move_windows, *clock, shard=shard_for(table_id))
+            
+            logger.info(f"Updated settings for table {table_id}")
+            return True
         except Exception as e:
             logger.error(f"Error updating table settings: {str(e)}")
             return False
@@ -243,7 +399,7 @@ class Table:
     def leave_table(table_id, user_id):
         """Remove user from table"""
         try:
-            with get_db_context() as conn:
+            def write(conn):
                 # Check if user is owner
                 if Table.is_owner(table_id, user_id):
                     # Count remaining members
@@ -254,16 +410,90 @@ class Table:
                     count = cursor.fetchone()['count']
                     
                     if count > 1:
-                        return False, "Owner cannot leave while others are in the table"
+                        return False, "Owner cannot leave while others are in the table", count
                 
                 # Remove member
-                conn.execute(
-                    'DELETE FROM table_members WHERE table_id = ? AND user_id = ?',
-                    (table_id, user_id)
-                )
+                remaining = Table._remove_member(conn, table_id, user_id)
                 
                 logger.info(f"User {user_id} left table {table_id}")
-                return True, "Successfully left table"
+                return True, "Successfully left table", remaining
+            
+            success, message, remaining = run_write(write, shard=shard_for(table_id))
+            if success and remaining == 0:
+                # Last one out: hide the table now, delete its history in the background
+                Table.delete(table_id)
+            elif success:
+                Table.sync_member_count(table_id)
+            return success, message
         except Exception as e:
             logger.error(f"Error leaving table: {str(e)}")
             return False, "Error leaving table"
+
+    @staticmethod
+    def _remove_member(conn, table_id, user_id):
+        """Delete a membership and return how many members are left.
+        An owner's role passes to the earliest-joined remaining member."""
+        member = conn.execute(
+            'SELECT role FROM table_members WHERE table_id = ? AND user_id = ?',
+            (table_id, user_id)
+        ).fetchone()
+        conn.execute(
+            'DELETE FROM table_members WHERE table_id = ? AND user_id = ?',
+            (table_id, user_id)
+        )
+        if member and member['role'] == 'owner':
+            # idx_table_members_joined: the first row in join order
+            cursor = conn.execute('''
+                UPDATE table_members SET role = 'owner'
+                WHERE id = (
+                    SELECT id FROM table_members WHERE table_id = ?
+                    ORDER BY joined_at, id LIMIT 1
+                )
+            ''', (table_id,))
+            if cursor.rowcount:
+                logger.info(f"Passed ownership of table {table_id} on from user {user_id}")
+        invalidate(conn, cache_key('members', table_id))
+        cursor = conn.execute(
+            'SELECT COUNT(*) as count FROM table_members WHERE table_id = ?',
+            (table_id,)
+        )
+        return cursor.fetchone()['count']
+
+    @staticmethod
+    def remove_member(table_id, user_id):
+        """Remove a member regardless of role, deleting the table if it is left empty
+        and otherwise handing an owner's role on"""
+        try:
+            remaining = run_write(Table._remove_member, table_id, user_id, shard=shard_for(table_id))
+            if remaining == 0:
+                Table.delete(table_id)
+            else:
+                Table.sync_member_count(table_id)
+            return True
+        except Exception as e:
+            logger.error(f"Error removing member: {str(e)}")
+            return False
+
+    @staticmethod
+    def delete(table_id):
+        """Tombstone a table; its prompts and responses are deleted in the background"""
+        try:
+            def write(conn):
+                # No boundary keeps it out of the rollover scan
+                cursor = conn.execute('''
+                    UPDATE tables SET deleted_at = ?, next_boundary_utc = NULL
+                    WHERE id = ? AND deleted_at IS NULL
+                ''', (format_utc(utc_now()), table_id))
+                if cursor.rowcount:
+                    queue_deletion(conn, 'table', table_id)
+                    invalidate(conn, cache_key('table', table_id))
+                return cursor.rowcount > 0
+            
+            deleted = run_write(write)
+            if deleted:
+                wake_purger()
+                logger.info(f"Deleted table {table_id}")
+            return deleted
+        except Exception as e:
+            logger.error(f"Error deleting table: {str(e)}")
+            return False
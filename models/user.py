@@ -2,6 +2,11 @@ import logging
 from datetime import datetime, timedelta
 from utils.db import get_db_context, dict_from_row
 from utils.auth import hash_password, verify_password, generate_reset_token
+from utils.writer import run_write
+from utils.purge import queue_deletion, wake_purger
+from utils.prompts import format_utc, utc_now
+from utils.cache import cache_key, invalidate
+from models.table import Table
 
 logger = logging.getLogger(__name__)
 
@@ -31,7 +36,7 @@ class User:
         try:
             with get_db_context() as conn:
                 cursor = conn.execute(
-                    'SELECT * FROM users WHERE id = ?',
+                    'SELECT * FROM users WHERE id = ? AND deleted_at IS NULL',
                     (user_id,)
                 )
                 user = cursor.fetchone()
@@ -77,7 +82,7 @@ class User:
             with get_db_context() as conn:
                 cursor = conn.execute('''
                     SELECT * FROM users 
-                    WHERE username = ? OR email = ?
+                    WHERE (username = ? OR email = ?) AND deleted_at IS NULL
                 ''', (username_or_email.lower(), username_or_email.lower()))
                 
                 user = cursor.fetchone()
@@ -100,11 +105,13 @@ class User:
             expires = datetime.utcnow() + timedelta(hours=1)
             
             with get_db_context() as conn:
-                conn.execute('''
+                cursor = conn.execute('''
                     UPDATE users 
                     SET reset_token = ?, reset_token_expires = ?
                     WHERE email = ?
+                    RETURNING id
                 ''', (token, expires, email.lower()))
+                invalidate(conn, *(cache_key('user', row['id']) for row in cursor.fetchall()))
                 
                 logger.info(f"Created reset token for: {email}")
                 return token
@@ -144,6 +151,7 @@ class User:
                     SET password_hash = ?, reset_token = NULL, reset_token_expires = NULL
                     WHERE id = ?
                 ''', (password_hash, user['id']))
+                invalidate(conn, cache_key('user', user['id']))
                 
                 logger.info(f"Password reset for user: {user['username']}")
                 return True
@@ -160,6 +168,7 @@ class User:
                     'UPDATE users SET display_name = ? WHERE id = ?',
                     (display_name, user_id)
                 )
+                invalidate(conn, cache_key('user', user_id))
                 logger.info(f"Updated display name for user {user_id}")
                 return True
         except Exception as e:
@@ -175,18 +184,29 @@ class User:
             if not user or not verify_password(password, user['password_hash']):
                 return False, "Incorrect password"
             
-            with get_db_context() as conn:
-                # Delete user's responses
-                conn.execute('DELETE FROM responses WHERE user_id = ?', (user_id,))
-                
-                # Remove from tables
-                conn.execute('DELETE FROM table_members WHERE user_id = ?', (user_id,))
-                
-                # Delete user
-                conn.execute('DELETE FROM users WHERE id = ?', (user_id,))
-                
-                logger.info(f"Deleted user account: {user_id}")
-                return True, "Account deleted successfully"
+            # Leave every table now (deleting any left empty, handing owned
+            # ones to their earliest-joined member), so their responses drop
+            # out of what other members see straight away
+            for table in Table.get_user_tables(user_id):
+                Table.remove_member(table['id'], user_id)
+            
+            def write(conn):
+                # Tombstone: frees the username and email and stops logins; the
+                # responses and the row itself are deleted in the background
+                conn.execute('''
+                    UPDATE users
+                    SET deleted_at = ?, username = ?, email = ?, password_hash = '!',
+                        display_name = 'Deleted user', reset_token = NULL, reset_token_expires = NULL
+                    WHERE id = ?
+                ''', (format_utc(utc_now()), f'deleted-{user_id}', f'deleted-{user_id}@deleted.invalid', user_id))
+                queue_deletion(conn, 'user', user_id)
+                invalidate(conn, cache_key('user', user_id))
+            
+            run_write(write)
+            wake_purger()
+            
+            logger.info(f"Deleted user account: {user_id}")
+            return True, "Account deleted successfully"
         except Exception as e:
             logger.error(f"Error deleting account: {str(e)}")
             return False, "Error deleting account"
@@ -3,7 +3,13 @@ from flask import Blueprint, jsonify, request, session, make_response
 from models.table import Table
 from models.prompt import Prompt
 from utils.auth import login_required
-from utils.prompts import ensure_prompt_exists, get_prompt_for_date, get_current_prompt_date, get_time_until_next_prompt
+from utils.db import shared_db_context
+from utils.prompts import ensure_prompt_exists, get_prompt_for_date, get_current_prompt_date, get_time_until_next_prompt, is_editable, prompt_summary
+from utils.archive import get_archived_prompt
+from utils.search import search_responses
+from utils.pagination import page_args
+from utils import presence
+from config import Config
 from datetime import date, timedelta, datetime
 
 logger = logging.getLogger(__name__)
@@ -14,6 +20,7 @@ def get_current_table_id(user):
     table_id = session.get('current_table_id')
     
     if table_id and Table.is_member(table_id, user['id']):
+        presence.touch(table_id, user['id'])
         return table_id
     
     # Get user's first table
@@ -21,10 +28,114 @@ def get_current_table_id(user):
     if tables:
         table_id = tables[0]['id']
         session['current_table_id'] = table_id
+        presence.touch(table_id, user['id'])
         return table_id
     
     return None
 
+def mark_responses_seen(user, table_id, responses):
+    """Advance the read cursor past responses just shown to the user.
+    
+    The session remembers the last cursor sent, so polls that show nothing new
+    don't queue a write.
+    """
+    if not responses:
+        return
+    cursor = max((str(r['created_at']), r['id']) for r in responses)
+    seen = session.get('seen_response_cursor', {})
+    if cursor <= tuple(seen.get(str(table_id), ('', 0))):
+        return
+    Table.mark_seen(table_id, user['id'], *cursor)
+    session['seen_response_cursor'] = {**seen, str(table_id): list(cursor)}
+
+def get_today_data(user, table_id):
+    """Build today's prompt payload for a table (None if the prompt can't be loaded)"""
+    # Get current prompt date (respects prompt time)
+    current_date = get_current_prompt_date(table_id)
+    prompt = ensure_prompt_exists(table_id, current_date)
+    
+    if not prompt:
+        return None
+    
+    # Get prompt with responses
+    prompt_data = Prompt.get_prompt_with_responses(prompt['id'], user['id'], table_id)
+    if prompt_data:
+        mark_responses_seen(user, table_id, prompt_data['responses'])
+    
+    # Get user's response if exists
+    user_response = Prompt.get_user_response(prompt['id'], user['id'], table_id)
+    
+    # Get time until next prompt
+    seconds_until_next = get_time_until_next_prompt(table_id)
+    
+    return {
+        'prompt': prompt_data,
+        'user_response': user_response,
+        'date': current_date.isoformat(),
+        'seconds_until_next_prompt': seconds_until_next
+    }
+
+def build_bootstrap(user):
+    """Gather everything the table page needs for first paint on one connection"""
+    with shared_db_context(query_only=True):
+        tables = Table.get_user_tables(user['id'])
+        if not tables:
+            return None
+        
+        # Resolve the current table from the list we already have
+        table_id = session.get('current_table_id')
+        if table_id not in [t['id'] for t in tables]:
+            table_id = tables[0]['id']
+            session['current_table_id'] = table_id
+        
+        table = next(t for t in tables if t['id'] == table_id)
+        members = Table.get_members(table_id)
+        display_name = Table.get_member_display_name(table_id, user['id']) or user['display_name']
+        
+        return {
+            'user': {
+                'id': user['id'],
+                'username': user['username'],
+                'display_name': display_name
+            },
+            'tables': [{
+                'id': t['id'],
+                'name': t['name'],
+                'role': t['role'],
+                'is_current': t['id'] == table_id,
+                'unread_count': t['unread_count'],
+                'answered_today': bool(t['answered_today'])
+            } for t in tables],
+            'current_table_id': table_id,
+            'table': {
+                'id': table['id'],
+                'name': table['name'],
+                'invite_code': table['invite_code'],
+                'prompt_time': table['prompt_time'],
+                'timezone': table['timezone'],
+                'is_owner': table['role'] == 'owner',
+                'member_count': table['member_count']
+            },
+            'members': members['members'],
+            'members_next_cursor': members['next_cursor'] if members['has_more'] else None,
+            'today': get_today_data(user, table_id)
+        }
+
+@api_bp.route('/api/bootstrap', methods=['GET'])
+@login_required
+def get_bootstrap(user):
+    """Get user, tables, members and today's prompt in one round-trip"""
+    try:
+        data = build_bootstrap(user)
+        if not data:
+            return jsonify({'error': 'Not in a table'}), 404
+        
+        return jsonify(data)
+    
+    except Exception as e:
+        logger.error(f"Bootstrap error: {str(e)}")
+        return jsonify({'error': 'An error occurred'}), 500
+
 @api_bp.route('/api/prompt/today', methods=['GET'])
 @login_required
 def get_today_prompt(user):
@@ -34,28 +145,11 @@ def get_today_prompt(user):
         if not table_id:
             return jsonify({'error': 'Not in a table'}), 404
         
-        # Get current prompt date (respects prompt time)
-        current_date = get_current_prompt_date(table_id)
-        prompt = ensure_prompt_exists(table_id, current_date)
-        
-        if not prompt:
+        data = get_today_data(user, table_id)
+        if not data:
             return jsonify({'error': 'Could not load prompt'}), 500
         
-        # Get prompt with responses
-        prompt_data = Prompt.get_prompt_with_responses(prompt['id'], user['id'], table_id)
-        
-        # Get user's response if exists
-        user_response = Prompt.get_user_response(prompt['id'], user['id'])
-        
-        # Get time until next prompt
-        seconds_until_next = get_time_until_next_prompt(table_id)
-        
-        return jsonify({
-            'prompt': prompt_data,
-            'user_response': user_response,
-            'date': current_date.isoformat(),
-            'seconds_until_next_prompt': seconds_until_next
-        })
+        return jsonify(data)
     
     except Exception as e:
         logger.error(f"Get today prompt error: {str(e)}")
@@ -89,14 +183,31 @@ def get_prompt_by_date(user, date_str):
         prompt = get_prompt_for_date(table_id, prompt_date)
         
         if not prompt:
-            return jsonify({'error': 'No prompt for that date'}), 404
-        
-        # Get all responses (regardless of whether user responded)
-        responses = Prompt.get_responses(prompt['id'], table_id)
-        user_response = Prompt.get_user_response(prompt['id'], user['id'])
+            # Only reachable if ARCHIVE_AFTER_DAYS is shorter than the history window
+            archived = get_archived_prompt(table_id, prompt_date)
+            if not archived:
+                return jsonify({'error': 'No prompt for that date'}), 404
+            prompt, responses = prompt_summary(archived['prompt']), archived['responses']
+            user_response = next((r for r in responses if r['user_id'] == user['id']), None)
+            return jsonify({
+                'prompt': {
+                    'id': prompt['id'],
+                    'prompt_text': prompt['prompt_text'],
+                    'prompt_date': prompt['prompt_date'],
+                    'is_custom': prompt['is_custom'],
+                    'is_editable': False
+                },
+                'responses': responses,
+                'user_response': user_response,
+                'date': prompt_date.isoformat()
+            })
+        
+        # First page of responses (regardless of whether user responded)
+        page = Prompt.get_responses(prompt['id'], table_id)
+        user_response = Prompt.get_user_response(prompt['id'], user['id'], table_id)
         
         # Check if prompt is still editable
-        is_editable = Prompt.is_prompt_active(prompt['prompt_date'], table_id)
+        editable = is_editable(prompt)
         
         return jsonify({
             'prompt': {
@@ -104,9 +215,11 @@ def get_prompt_by_date(user, date_str):
                 'prompt_text': prompt['prompt_text'],
                 'prompt_date': prompt['prompt_date'],
                 'is_custom': prompt['is_custom'],
-                'is_editable': is_editable
+                'is_editable': editable
             },
-            'responses': responses,
+            'responses': page['responses'],
+            'next_cursor': page['next_cursor'],
+            'has_more': page['has_more'],
             'user_response': user_response,
             'date': prompt_date.isoformat()
         })
@@ -132,9 +245,10 @@ def get_yesterday_prompt(user):
         if not prompt:
             return jsonify({'error': 'No prompt for yesterday'}), 404
         
-        # Get all responses (regardless of whether user responded)
-        responses = Prompt.get_responses(prompt['id'], table_id)
-        user_response = Prompt.get_user_response(prompt['id'], user['id'])
+        # First page of responses (regardless of whether user responded)
+        page = Prompt.get_responses(prompt['id'], table_id)
+        mark_responses_seen(user, table_id, page['responses'])
+        user_response = Prompt.get_user_response(prompt['id'], user['id'], table_id)
         
         return jsonify({
             'prompt': {
@@ -143,7 +257,9 @@ def get_yesterday_prompt(user):
                 'prompt_date': prompt['prompt_date'],
                 'is_custom': prompt['is_custom']
             },
-            'responses': responses,
+            'responses': page['responses'],
+            'next_cursor': page['next_cursor'],
+            'has_more': page['has_more'],
             'user_response': user_response,
             'date': yesterday.isoformat()
         })
@@ -175,7 +291,7 @@ def submit_response(user):
             return jsonify({'error': 'Could not load prompt'}), 500
         
         # Submit response
-        success, message = Prompt.submit_response(prompt['id'], user['id'], response_text)
+        success, message = Prompt.submit_response(prompt['id'], user['id'], response_text, table_id)
         
         if not success:
             return jsonify({'error': message}), 400
@@ -184,6 +300,8 @@ def submit_response(user):
         
         # Return updated prompt data with all responses
         prompt_data = Prompt.get_prompt_with_responses(prompt['id'], user['id'], table_id)
+        if prompt_data:
+            mark_responses_seen(user, table_id, prompt_data['responses'])
         
         return jsonify({
             'message': message,
@@ -220,6 +338,8 @@ def edit_response(user):
         
         # Return updated prompt data
         prompt_data = Prompt.get_prompt_with_responses(prompt_id, user['id'], table_id)
+        if prompt_data:
+            mark_responses_seen(user, table_id, prompt_data['responses'])
         
         return jsonify({
             'message': message,
@@ -247,10 +367,10 @@ def poll_responses(user):
             return jsonify({'new_responses': []})
         
         # Check if user has responded
-        if not Prompt.user_has_responded(prompt['id'], user['id']):
+        if not Prompt.user_has_responded(prompt['id'], user['id'], table_id):
             # Return response count even if user hasn't responded
-            from utils.db import get_db_context
-            with get_db_context() as conn:
+            from utils.db import table_db_context
+            with table_db_context(table_id) as conn:
                 cursor = conn.execute(
                     'SELECT COUNT(*) as count FROM responses WHERE prompt_id = ?',
                     (prompt['id'],)
@@ -258,18 +378,87 @@ def poll_responses(user):
                 count = cursor.fetchone()['count']
                 return jsonify({'response_count': count, 'responses': []})
         
-        # Get all responses
-        responses = Prompt.get_responses(prompt['id'], table_id)
+        # Responses after the client's cursor (the first page without one)
+        try:
+            after, limit = page_args(request.args, Config.RESPONSE_PAGE_SIZE)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        page = Prompt.get_responses(prompt['id'], table_id, after, limit)
+        mark_responses_seen(user, table_id, page['responses'])
         
         return jsonify({
-            'responses': responses,
-            'count': len(responses)
+            **page,
+            'prompt_id': prompt['id'],
+            'count': len(page['responses'])
         })
     
     except Exception as e:
         logger.error(f"Poll responses error: {str(e)}")
         return jsonify({'error': 'An error occurred'}), 500
 
+@api_bp.route('/api/response/list', methods=['GET'])
+@login_required
+def list_responses(user):
+    """Further pages of a prompt's responses (?prompt_id=&after=&limit=)"""
+    try:
+        table_id = get_current_table_id(user)
+        if not table_id:
+            return jsonify({'error': 'Not in a table'}), 404
+        
+        prompt_id = request.args.get('prompt_id', type=int)
+        if not prompt_id:
+            return jsonify({'error': 'Prompt ID required'}), 400
+        
+        try:
+            after, limit = page_args(request.args, Config.RESPONSE_PAGE_SIZE)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        prompt = Prompt.get_prompt(prompt_id, table_id)
+        if not prompt:
+            return jsonify({'error': 'Prompt not found'}), 404
+        
+        # Same rule as the table page: an open prompt's answers show once you've answered
+        if is_editable(prompt) and not Prompt.user_has_responded(prompt_id, user['id'], table_id):
+            return jsonify({'error': 'Answer first to see the other responses'}), 403
+        
+        page = Prompt.get_responses(prompt_id, table_id, after, limit)
+        mark_responses_seen(user, table_id, page['responses'])
+        return jsonify(page)
+    
+    except Exception as e:
+        logger.error(f"List responses error: {str(e)}")
+        return jsonify({'error': 'An error occurred'}), 500
+
+@api_bp.route('/api/search', methods=['GET'])
+@login_required
+def search(user):
+    """Search the current table's responses and prompts"""
+    try:
+        table_id = get_current_table_id(user)
+        if not table_id:
+            return jsonify({'error': 'Not in a table'}), 404
+        
+        query = request.args.get('q', '').strip()
+        page = request.args.get('page', 1, type=int)
+        
+        if not query:
+            return jsonify({'error': 'Search text required'}), 400
+        
+        if len(query) > Config.SEARCH_MAX_QUERY_LENGTH:
+            return jsonify({'error': f'Search text too long (max {Config.SEARCH_MAX_QUERY_LENGTH} characters)'}), 400
+        
+        if not page or page < 1:
+            return jsonify({'error': 'Invalid page'}), 400
+        
+        results = search_responses(table_id, query, page)
+        results['query'] = query
+        return jsonify(results)
+    
+    except Exception as e:
+        logger.error(f"Search error: {str(e)}")
+        return jsonify({'error': 'An error occurred'}), 500
+
 @api_bp.route('/api/user/profile', methods=['PUT'])
 @login_required
 def update_profile(user):
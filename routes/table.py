@@ -1,9 +1,16 @@
 import logging
-from flask import Blueprint, render_template, request, jsonify, session
+import re
+from flask import Blueprint, Response, render_template, request, jsonify, session
 from models.table import Table
 from models.prompt import Prompt
 from utils.auth import login_required
-from utils.prompts import ensure_prompt_exists, get_current_prompt_date
+from utils.prompts import ensure_prompt_exists, get_current_prompt_date, is_valid_timezone, is_valid_prompt_time
+from utils.export import export_chunks, EXPORT_FORMATS
+from utils.stats import get_table_stats
+from utils.pagination import page_args
+from utils import presence
+from config import Config
+from routes.api import build_bootstrap
 from datetime import date, timedelta
 
 logger = logging.getLogger(__name__)
@@ -17,6 +24,7 @@ def get_current_table_id(user):
     if table_id:
         # Verify user is still a member of this table
         if Table.is_member(table_id, user['id']):
+            presence.touch(table_id, user['id'])
             return table_id
     
     # If no valid table in session, get user's first table
@@ -24,6 +32,7 @@ def get_current_table_id(user):
     if tables:
         table_id = tables[0]['id']
         session['current_table_id'] = table_id
+        presence.touch(table_id, user['id'])
         return table_id
     
     return None
@@ -44,15 +53,12 @@ def join_table_page(user):
 @login_required
 def table_page(user):
     """Main table page"""
-    # Check if user has any tables
-    tables = Table.get_user_tables(user['id'])
-    if not tables:
+    # Embed first-paint data so the page renders without further API calls
+    bootstrap = build_bootstrap(user)
+    if not bootstrap:
         return render_template('redirect.html', url='/create-table')
     
-    # Ensure we have a current table set
-    get_current_table_id(user)
-    
-    return render_template('table.html')
+    return render_template('table.html', bootstrap=bootstrap)
 
 @table_bp.route('/table/history', methods=['GET'])
 @login_required
@@ -108,6 +114,7 @@ def create_table(user):
         data = request.get_json()
         name = data.get('name', '').strip()
         prompt_time = data.get('prompt_time', '17:00')
+        timezone = data.get('timezone')
         
         if not name:
             return jsonify({'error': 'Table name required'}), 400
@@ -115,8 +122,14 @@ def create_table(user):
         if len(name) < 3 or len(name) > 50:
             return jsonify({'error': 'Table name must be 3-50 characters'}), 400
         
+        if timezone and not is_valid_timezone(timezone):
+            return jsonify({'error': 'Unknown timezone'}), 400
+        
+        if not is_valid_prompt_time(prompt_time):
+            return jsonify({'error': 'Prompt time must be HH:MM between 00:00 and 23:59'}), 400
+        
         # Create table
-        table_id, invite_code = Table.create(name, user['id'], prompt_time)
+        table_id, invite_code = Table.create(name, user['id'], prompt_time, timezone)
         
         # Set as current table
         session['current_table_id'] = table_id
@@ -203,8 +216,9 @@ def switch_table(user):
 @table_bp.route('/api/table/list', methods=['GET'])
 @login_required
 def list_tables(user):
-    """Get all tables user belongs to"""
+    """Get all tables user belongs to, with unread counts and answered-today flags"""
     try:
+        # One query per database file covers every table, activity included
         tables = Table.get_user_tables(user['id'])
         current_table_id = get_current_table_id(user)
         
@@ -214,7 +228,9 @@ def list_tables(user):
                 'id': table['id'],
                 'name': table['name'],
                 'role': table['role'],
-                'is_current': table['id'] == current_table_id
+                'is_current': table['id'] == current_table_id,
+                'unread_count': table['unread_count'],
+                'answered_today': bool(table['answered_today'])
             })
         
         return jsonify({
@@ -251,9 +267,14 @@ def get_table_info(user):
                 'name': table['name'],
                 'invite_code': table['invite_code'],
                 'prompt_time': table['prompt_time'],
-                'is_owner': is_owner
+                'timezone': table['timezone'],
+                'is_owner': is_owner,
+                'member_count': table['member_count'],
+                'max_members': table['max_members'] or Config.TABLE_MAX_MEMBERS,
+                'online_user_ids': presence.online_user_ids(table_id)
             },
-            'members': members,
+            'members': members['members'],
+            'members_next_cursor': members['next_cursor'] if members['has_more'] else None,
             'user': {
                 'username': user['username'],
                 'display_name': display_name
@@ -264,6 +285,81 @@ def get_table_info(user):
         logger.error(f"Get table info error: {str(e)}")
         return jsonify({'error': 'An error occurred'}), 500
 
+@table_bp.route('/api/table/members', methods=['GET'])
+@login_required
+def list_members(user):
+    """Members of the current table in join order, a page at a time (?after=&limit=)"""
+    try:
+        table_id = get_current_table_id(user)
+        if not table_id:
+            return jsonify({'error': 'Not in a table'}), 404
+        
+        try:
+            after, limit = page_args(request.args, Config.MEMBER_PAGE_SIZE)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify(Table.get_members(table_id, after, limit))
+    
+    except Exception as e:
+        logger.error(f"List members error: {str(e)}")
+        return jsonify({'error': 'An error occurred'}), 500
+
+@table_bp.route('/api/table/export', methods=['GET'])
+@login_required
+def export_table(user):
+    """Download the current table's history (up to yesterday) as JSON Lines, CSV or ZIP"""
+    try:
+        table_id = get_current_table_id(user)
+        if not table_id:
+            return jsonify({'error': 'Not in a table'}), 404
+        
+        export_format = request.args.get('format', 'jsonl')
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': f"Format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+        
+        table = Table.get_by_id(table_id)
+        if not table:
+            return jsonify({'error': 'Table not found'}), 404
+        
+        # Today's answers stay hidden until you've answered, so stop at yesterday
+        current_date = get_current_prompt_date(table_id)
+        slug = re.sub(r'[^a-z0-9]+', '-', table['name'].lower()).strip('-') or 'table'
+        name = f"kitchen-table-{slug}-{current_date.isoformat()}"
+        mimetype, extension = EXPORT_FORMATS[export_format]
+        
+        logger.info(f"User {user['username']} exported table {table_id} as {export_format}")
+        
+        # Rows are read in batches while the body is sent, so memory use doesn't grow with history
+        return Response(
+            export_chunks(table_id, current_date, export_format, name),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename="{name}.{extension}"'}
+        )
+    
+    except Exception as e:
+        logger.error(f"Export table error: {str(e)}")
+        return jsonify({'error': 'An error occurred'}), 500
+
+@table_bp.route('/api/table/stats', methods=['GET'])
+@login_required
+def table_stats(user):
+    """Engagement stats for the current table (owner only)"""
+    try:
+        table_id = get_current_table_id(user)
+        if not table_id:
+            return jsonify({'error': 'Not in a table'}), 404
+        
+        if not Table.is_owner(table_id, user['id']):
+            return jsonify({'error': 'Only the table owner can view stats'}), 403
+        
+        # Reads the daily rollups, never the responses, so this stays cheap as history grows
+        return jsonify(get_table_stats(table_id, get_current_prompt_date(table_id)))
+    
+    except Exception as e:
+        logger.error(f"Table stats error: {str(e)}")
+        return jsonify({'error': 'An error occurred'}), 500
+
 @table_bp.route('/api/table/settings', methods=['PUT'])
 @login_required
 def update_table_settings(user):
@@ -279,12 +375,28 @@ def update_table_settings(user):
         data = request.get_json()
         name = data.get('name')
         prompt_time = data.get('prompt_time')
+        timezone = data.get('timezone')
+        max_members = data.get('max_members')
+        
+        if max_members is not None:
+            # Never below the current membership, so nobody has to be removed
+            table = Table.get_by_id(table_id)
+            lowest = max(Config.TABLE_MIN_MEMBERS, table['member_count'])
+            if (not isinstance(max_members, int) or isinstance(max_members, bool)
+                    or not lowest <= max_members <= Config.TABLE_MEMBER_LIMIT):
+                return jsonify({'error': f'Member limit must be between {lowest} and {Config.TABLE_MEMBER_LIMIT}'}), 400
         
         if name:
             if len(name.strip()) < 3 or len(name.strip()) > 50:
                 return jsonify({'error': 'Table name must be 3-50 characters'}), 400
         
-        if Table.update_settings(table_id, name, prompt_time):
+        if timezone and not is_valid_timezone(timezone):
+            return jsonify({'error': 'Unknown timezone'}), 400
+        
+        if prompt_time and not is_valid_prompt_time(prompt_time):
+            return jsonify({'error': 'Prompt time must be HH:MM between 00:00 and 23:59'}), 400
+        
+        if Table.update_settings(table_id, name, prompt_time, timezone, max_members):
             return jsonify({'message': 'Settings updated successfully'})
         else:
             return jsonify({'error': 'Failed to update settings'}), 500
@@ -8,7 +8,8 @@ CREATE TABLE IF NOT EXISTS users (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     last_active TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     reset_token TEXT,
-    reset_token_expires TIMESTAMP
+    reset_token_expires TIMESTAMP,
+    deleted_at TIMESTAMP
 );
 
 -- Tables (groups) table
@@ -18,6 +19,12 @@ CREATE TABLE IF NOT EXISTS tables (
     invite_code TEXT UNIQUE NOT NULL,
     created_by INTEGER NOT NULL,
     prompt_time TEXT DEFAULT '00:00',
+    timezone TEXT,
+    next_boundary_utc TIMESTAMP,
+    shard INTEGER NOT NULL DEFAULT 0,
+    deleted_at TIMESTAMP,
+    member_count INTEGER NOT NULL DEFAULT 0,  -- copy of the shard's table_members count
+    max_members INTEGER,  -- NULL for Config.TABLE_MAX_MEMBERS
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (created_by) REFERENCES users(id)
 );
@@ -28,7 +35,13 @@ CREATE TABLE IF NOT EXISTS table_members (
     table_id INTEGER NOT NULL,
     user_id INTEGER NOT NULL,
     role TEXT NOT NULL DEFAULT 'member',
+    display_name TEXT,
     joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    streak_current INTEGER NOT NULL DEFAULT 0,  -- maintained by utils/streaks.py
+    streak_best INTEGER NOT NULL DEFAULT 0,
+    last_answered_prompt_date DATE,
+    last_seen_response_at TIMESTAMP,  -- read cursor: (created_at, id) of the newest response shown to them
+    last_seen_response_seq INTEGER NOT NULL DEFAULT 0,
     UNIQUE(table_id, user_id),
     FOREIGN KEY (table_id) REFERENCES tables(id) ON DELETE CASCADE,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
@@ -41,6 +54,8 @@ CREATE TABLE IF NOT EXISTS prompts (
     prompt_text TEXT NOT NULL,
     prompt_date DATE NOT NULL,
     is_custom INTEGER DEFAULT 0,
+    editable_from TIMESTAMP,
+    editable_until TIMESTAMP,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     UNIQUE(table_id, prompt_date),
     FOREIGN KEY (table_id) REFERENCES tables(id) ON DELETE CASCADE
@@ -59,6 +74,70 @@ CREATE TABLE IF NOT EXISTS responses (
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
+-- Full-text search over responses and their prompts (utils/search.py), kept in sync by triggers.
+-- table_id is indexed too, so a search matches only its own table's rows
+CREATE VIRTUAL TABLE IF NOT EXISTS table_response_search USING fts5(
+    response_text,
+    prompt_text,
+    table_id,
+    tokenize = 'porter unicode61'
+);
+
+CREATE TRIGGER IF NOT EXISTS table_response_search_insert AFTER INSERT ON responses BEGIN
+    INSERT OR REPLACE INTO table_response_search (rowid, response_text, prompt_text, table_id)
+    SELECT new.id, new.response_text, prompt_text, table_id FROM prompts WHERE id = new.prompt_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS table_response_search_update AFTER UPDATE OF response_text ON responses BEGIN
+    UPDATE table_response_search SET response_text = new.response_text WHERE rowid = new.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS table_response_search_delete AFTER DELETE ON responses BEGIN
+    DELETE FROM table_response_search WHERE rowid = old.id;
+END;
+
+-- Engagement rollups (utils/stats.py), maintained by triggers. Counts only ever
+-- go up, so archived and purged history stays in the totals
+CREATE TABLE IF NOT EXISTS table_daily_stats (
+    table_id INTEGER NOT NULL,
+    prompt_date DATE NOT NULL,
+    members INTEGER NOT NULL DEFAULT 0,
+    responses INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (table_id, prompt_date)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS member_stats (
+    table_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    responses INTEGER NOT NULL DEFAULT 0,
+    last_response_at TIMESTAMP,
+    PRIMARY KEY (table_id, user_id)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS stats_prompt_insert AFTER INSERT ON prompts BEGIN
+    INSERT INTO table_daily_stats (table_id, prompt_date, members)
+    VALUES (new.table_id, new.prompt_date,
+            (SELECT COUNT(*) FROM table_members WHERE table_id = new.table_id))
+    ON CONFLICT (table_id, prompt_date) DO NOTHING;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_member_insert AFTER INSERT ON table_members BEGIN
+    -- Someone joining mid-day can still answer that day's prompt
+    UPDATE table_daily_stats SET members = members + 1
+    WHERE table_id = new.table_id
+      AND prompt_date = (SELECT MAX(prompt_date) FROM prompts WHERE table_id = new.table_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_response_insert AFTER INSERT ON responses BEGIN
+    INSERT INTO table_daily_stats (table_id, prompt_date, responses)
+    SELECT table_id, prompt_date, 1 FROM prompts WHERE id = new.prompt_id
+    ON CONFLICT (table_id, prompt_date) DO UPDATE SET responses = responses + 1;
+    INSERT INTO member_stats (table_id, user_id, responses, last_response_at)
+    SELECT table_id, new.user_id, 1, new.created_at FROM prompts WHERE id = new.prompt_id
+    ON CONFLICT (table_id, user_id) DO UPDATE
+    SET responses = responses + 1, last_response_at = excluded.last_response_at;
+END;
+
 -- Default prompts pool
 CREATE TABLE IF NOT EXISTS default_prompts (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -67,9 +146,41 @@ CREATE TABLE IF NOT EXISTS default_prompts (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Background deletions of tombstoned users and tables (utils/purge.py)
+CREATE TABLE IF NOT EXISTS deletion_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    target_id INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    rows_deleted INTEGER NOT NULL DEFAULT 0,
+    lease_until TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+-- Who is at which table right now (utils/presence.py): heartbeats from every
+-- worker, at most one per member per PRESENCE_HEARTBEAT, pruned after PRESENCE_TTL
+CREATE TABLE IF NOT EXISTS presence (
+    table_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    seen_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (table_id, user_id)
+) WITHOUT ROWID;
+
+-- Keys of cached data changed by writes to this file (utils/cache.py); every
+-- worker evicts them when it sees new rows. Pruned after CACHE_INVALIDATION_RETENTION
+CREATE TABLE IF NOT EXISTS cache_invalidations (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    cache_key TEXT NOT NULL,
+    created_at REAL NOT NULL  -- time.time() of the write, to measure how stale reads get
+);
+
 -- Indexes for performance
+CREATE INDEX IF NOT EXISTS idx_tables_next_boundary ON tables(next_boundary_utc);
 CREATE INDEX IF NOT EXISTS idx_table_members_user ON table_members(user_id);
-CREATE INDEX IF NOT EXISTS idx_table_members_table ON table_members(table_id);
+CREATE INDEX IF NOT EXISTS idx_table_members_joined ON table_members(table_id, joined_at);
 CREATE INDEX IF NOT EXISTS idx_prompts_date ON prompts(table_id, prompt_date);
-CREATE INDEX IF NOT EXISTS idx_responses_prompt ON responses(prompt_id);
+CREATE INDEX IF NOT EXISTS idx_prompts_editable ON prompts(table_id, editable_until);
+CREATE INDEX IF NOT EXISTS idx_responses_prompt_created ON responses(prompt_id, created_at);
 CREATE INDEX IF NOT EXISTS idx_responses_user ON responses(user_id);
+CREATE INDEX IF NOT EXISTS idx_deletion_jobs_status ON deletion_jobs(status);
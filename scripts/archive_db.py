@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Archive old prompts and responses
+Moves prompts older than ARCHIVE_AFTER_DAYS (and their responses) from the
+hot database into ARCHIVE_DATABASE_PATH, keeping the hot file and its
+indexes small. Safe to run while the app is serving requests. Run via cron
+once a day.
+"""
+
+import sys
+import os
+import argparse
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Config
+from utils.db import migrate_db
+from utils.archive import archive_old_prompts
+import logging
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+# The history view reads the last 7 days from the hot database
+MIN_DAYS = 8
+
+def main():
+    parser = argparse.ArgumentParser(description='Move old prompts into the archive database')
+    parser.add_argument('--days', type=int, default=Config.ARCHIVE_AFTER_DAYS,
+                        help='Archive prompts older than this many days')
+    parser.add_argument('--archive', default=Config.ARCHIVE_DATABASE_PATH, help='Archive database file')
+    args = parser.parse_args()
+
+    if args.days < MIN_DAYS:
+        logging.error(f"--days must be at least {MIN_DAYS} so the history view stays in the hot database")
+        return 1
+
+    try:
+        if not migrate_db():
+            return 1
+        prompts, responses = archive_old_prompts(args.days, path=args.archive)
+        logging.info(f"Archive completed: {prompts} prompts, {responses} responses moved to {args.archive}")
+        return 0
+    except Exception as e:
+        logging.error(f"Archive failed: {str(e)}")
+        return 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Backfill answer streaks
+Computes streak_current, streak_best and last_answered_prompt_date for every
+table member from their prompts and responses (archive included). New
+answers keep the columns current, so this only needs to run once after
+upgrading. Safe to run while the app is serving requests.
+"""
+
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.db import migrate_db
+from utils.streaks import backfill_streaks
+import logging
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+def main():
+    try:
+        if not migrate_db():
+            return 1
+        members = backfill_streaks()
+        logging.info(f"Streak backfill completed: {members} members updated")
+        return 0
+    except Exception as e:
+        logging.error(f"Streak backfill failed: {str(e)}")
+        return 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Online database backup script
+Safe to run while the app is serving requests. Run via cron:
+  snapshot  - full compressed, checksummed snapshot (daily)
+  wal       - archive WAL frames committed since the last run (every few minutes)
+  restore   - rebuild a database from a snapshot and its WAL segments
+  verify    - check checksums and run integrity_check on a restored copy
+Without --db, snapshot, wal and verify cover every database file: the core
+into --backup-dir, each shard into <backup-dir>/shard<N> and the archive
+database into <backup-dir>/archive
+"""
+
+import sys
+import os
+import argparse
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Config
+from utils.db import all_shards, shard_path
+from utils.backup import create_snapshot, archive_wal, restore_snapshot, verify_snapshot, backup_dir_for
+import logging
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+def database_files(backup_root):
+    """[(backup_dir, db_path)] for the core, every shard and the archive database"""
+    files = [(backup_dir_for(shard, backup_root), shard_path(shard)) for shard in all_shards()]
+    files.append((os.path.join(backup_root, 'archive'), Config.ARCHIVE_DATABASE_PATH))
+    return files
+
+def back_up(command, backup_dir, db_path, snapshot=None):
+    """Run snapshot, wal or verify for one database file; returns whether it worked"""
+    if command == 'snapshot':
+        name = create_snapshot(backup_dir, db_path)
+        logging.info(f"Backup completed: {name}")
+
+    elif command == 'wal':
+        name = archive_wal(backup_dir, db_path)
+        if name:
+            logging.info(f"Backup completed: {name}")
+
+    elif command == 'verify':
+        ok, message = verify_snapshot(backup_dir, snapshot)
+        if not ok:
+            logging.error(f"Verification failed for {backup_dir}: {message}")
+            return False
+        logging.info(f"Verified {backup_dir}: {message}")
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description='Kitchen Table database backups')
+    parser.add_argument('--backup-dir', default=Config.BACKUP_DIR)
+    parser.add_argument('--db', help='Only this database file (default: the core, every shard and the archive)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('snapshot', help='Take a full snapshot')
+    commands.add_parser('wal', help='Archive new WAL frames')
+
+    restore = commands.add_parser('restore', help='Restore a snapshot to a new file')
+    restore.add_argument('target', help='Path of the database file to write')
+    restore.add_argument('--snapshot', help='Snapshot name (default: latest)')
+    restore.add_argument('--segments', type=int, help='Apply only the first N WAL segments')
+    restore.add_argument('--force', action='store_true', help='Overwrite an existing target')
+
+    verify = commands.add_parser('verify', help='Verify a snapshot and its WAL segments')
+    verify.add_argument('--snapshot', help='Snapshot name (default: latest)')
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'restore':
+            if os.path.exists(args.target) and not args.force:
+                logging.error(f"{args.target} exists, stop the app and pass --force to overwrite it")
+                return 1
+            restore_snapshot(args.backup_dir, args.target, args.snapshot, args.segments)
+            return 0
+
+        snapshot = getattr(args, 'snapshot', None)
+        if snapshot and not args.db:
+            logging.error("--snapshot names one file's snapshot, pass --db (and its --backup-dir) too")
+            return 1
+        if args.db:
+            return 0 if back_up(args.command, args.backup_dir, args.db, snapshot) else 1
+
+        failed = 0
+        for backup_dir, db_path in database_files(args.backup_dir):
+            if not os.path.exists(db_path):
+                # Shards are created on first use; the archive on the first nightly run
+                logging.info(f"Skipping {db_path}: not created yet")
+                continue
+            try:
+                if not back_up(args.command, backup_dir, db_path, snapshot):
+                    failed += 1
+            except Exception as e:
+                # Keep going so one bad file doesn't leave the others unbacked
+                logging.error(f"Backup {args.command} of {db_path} failed: {str(e)}")
+                failed += 1
+        return 1 if failed else 0
+    except Exception as e:
+        logging.error(f"Backup {args.command} failed: {str(e)}")
+        return 1
+
+if __name__ == '__main__':
+    sys.exit(main())
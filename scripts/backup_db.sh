@@ -1,14 +1,8 @@
 #!/bin/bash
-BACKUP_DIR="/home/pi/kitchentable/backups"
-DATE=$(date +%Y%m%d_%H%M%S)
-DB_PATH="/home/pi/kitchentable/kitchen_table.db"
+# Full online snapshot of every database file: the core, each shard and the
+# archive (see scripts/backup_db.py for wal/restore/verify)
+APP_DIR="/home/pi/kitchentable"
+BACKUP_DIR="$APP_DIR/backups"
 
-mkdir -p $BACKUP_DIR
-
-# Create backup
-cp $DB_PATH "$BACKUP_DIR/kitchen_table_$DATE.db"
-
-# Keep only last 30 backups
-ls -t $BACKUP_DIR/kitchen_table_*.db | tail -n +31 | xargs -r rm
-
-echo "Backup completed: kitchen_table_$DATE.db"
+cd $APP_DIR
+python3 scripts/backup_db.py --backup-dir "$BACKUP_DIR" snapshot
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Response compression benchmark
+Measures bytes saved vs CPU spent per gzip level / brotli quality for a
+full /api/prompt/today payload (10 responses of 500 characters).
+Run on the deployment host: python3 scripts/bench_compression.py
+"""
+
+import sys
+import os
+import gzip
+import json
+import time
+import random
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Config
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+WORDS = (
+    'the garden was lovely today and mum said the tomatoes are finally coming '
+    'through we walked the dog down by the river after dinner I think the best '
+    'part of the week was seeing everyone at the kitchen table again remember '
+    'when we used to bake bread on sundays it still smells like home'
+).split()
+
+def build_payload(members=Config.TABLE_MAX_MEMBERS, length=Config.RESPONSE_MAX_LENGTH):
+    """Representative /api/prompt/today body with every member answered in full"""
+    rng = random.Random(42)
+    responses = []
+    for i in range(members):
+        text = ''
+        while len(text) < length:
+            text += rng.choice(WORDS) + ' '
+        responses.append({
+            'id': i + 1,
+            'prompt_id': 1,
+            'user_id': i + 1,
+            'response_text': text[:length].strip(),
+            'created_at': '2024-06-01 17:%02d:00' % i,
+            'edited_at': None,
+            'display_name': f'Member {i + 1}',
+            'username': f'member{i + 1}'
+        })
+
+    payload = {
+        'prompt': {
+            'id': 1, 'table_id': 1, 'prompt_text': "What made you smile today?",
+            'prompt_date': '2024-06-01', 'is_custom': 0, 'created_at': '2024-06-01 17:00:00',
+            'user_has_responded': True, 'responses': responses,
+            'response_count': len(responses), 'is_editable': True
+        },
+        'user_response': responses[0],
+        'date': '2024-06-01',
+        'seconds_until_next_prompt': 0
+    }
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+def measure(name, compress, data, iterations):
+    """Compress data repeatedly and return (name, size, cpu microseconds per call)"""
+    compressed = compress(data)
+    start = time.process_time()
+    for _ in range(iterations):
+        compress(data)
+    elapsed = time.process_time() - start
+    return name, len(compressed), elapsed / iterations * 1e6
+
+def main(iterations=500):
+    data = build_payload()
+    results = []
+    for level in (1, 3, 6, 9):
+        results.append(measure(f'gzip level {level}', lambda d, l=level: gzip.compress(d, compresslevel=l), data, iterations))
+    if brotli:
+        for quality in (1, 4, 6, 11):
+            results.append(measure(f'brotli quality {quality}', lambda d, q=quality: brotli.compress(d, quality=q), data, iterations))
+
+    print(f"Payload: {len(data)} bytes uncompressed, {iterations} iterations each")
+    print(f"{'codec':<20}{'bytes':>8}{'ratio':>8}{'cpu us':>10}")
+    for name, size, micros in results:
+        print(f"{name:<20}{size:>8}{len(data) / size:>8.2f}{micros:>10.0f}")
+    print(f"Configured: gzip level {Config.COMPRESS_LEVEL}, brotli quality {Config.COMPRESS_BROTLI_QUALITY}, "
+          f"min size {Config.COMPRESS_MIN_SIZE} bytes")
+    if not brotli:
+        print("brotli not installed, only gzip was measured")
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+JSON serialization benchmark
+Compares Flask's default provider (with dict_from_row copies) against
+FastJSONProvider on sqlite3.Row results (copied to dicts by its default
+hook while encoding), with and without orjson, for
+the largest payload: a prompt with every member's full-length response.
+Run on the deployment host: python3 scripts/bench_json.py
+"""
+
+import sys
+import os
+import time
+import sqlite3
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from config import Config
+from utils.db import dict_from_row
+import utils.json_provider as json_provider
+
+def build_rows(members=Config.TABLE_MAX_MEMBERS, length=Config.RESPONSE_MAX_LENGTH):
+    """Response rows shaped like Prompt.get_responses, from an in-memory database"""
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    conn.execute('''
+        CREATE TABLE responses (
+            id INTEGER PRIMARY KEY, prompt_id INTEGER, user_id INTEGER, response_text TEXT,
+            created_at TIMESTAMP, edited_at TIMESTAMP, display_name TEXT, username TEXT
+        )
+    ''')
+    for i in range(members):
+        conn.execute(
+            'INSERT INTO responses VALUES (?, 1, ?, ?, CURRENT_TIMESTAMP, NULL, ?, ?)',
+            (i + 1, i + 1, ('Something lovely happened today. ' * 20)[:length], f'Member {i + 1}', f'member{i + 1}')
+        )
+    rows = conn.execute('SELECT * FROM responses ORDER BY id').fetchall()
+    conn.close()
+    return rows
+
+def payload(responses):
+    return {
+        'prompt': {'id': 1, 'prompt_text': "What made you smile today?", 'responses': responses,
+                   'response_count': len(responses), 'is_editable': True},
+        'user_response': responses[0],
+        'date': '2024-06-01',
+        'seconds_until_next_prompt': 0
+    }
+
+def measure(name, serialize, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        body = serialize()
+    elapsed = time.perf_counter() - start
+    return name, len(body), elapsed / iterations * 1e6
+
+def main(iterations=2000):
+    app = Flask('bench')
+    rows = build_rows()
+    results = []
+
+    default_provider = DefaultJSONProvider(app)
+    results.append(measure(
+        'flask default + dict_from_row',
+        lambda: default_provider.response(payload([dict_from_row(r) for r in rows])).get_data(),
+        iterations
+    ))
+
+    fast_provider = json_provider.FastJSONProvider(app)
+    orjson = json_provider.orjson
+    try:
+        json_provider.orjson = None
+        results.append(measure('fast provider (stdlib)', lambda: fast_provider.response(payload(rows)).get_data(), iterations))
+    finally:
+        json_provider.orjson = orjson
+
+    if orjson:
+        results.append(measure('fast provider (orjson)', lambda: fast_provider.response(payload(rows)).get_data(), iterations))
+
+    print(f"{len(rows)} responses of {Config.RESPONSE_MAX_LENGTH} characters, {iterations} iterations each")
+    print(f"{'provider':<32}{'bytes':>8}{'us/response':>14}")
+    for name, size, micros in results:
+        print(f"{name:<32}{size:>8}{micros:>14.1f}")
+    if not orjson:
+        print("orjson not installed, only the stdlib fallback was measured")
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Large table benchmark
+Builds a throwaway database with one table of 1,000 members and a year of
+daily prompts, most of them answered, then times the listing queries the
+app serves at that size: response and member pages (first and deepest,
+keyset against the OFFSET paging they replace), the table list, stats and
+a join against the member limit. Prints the query plans for the keyset
+queries so a missing index shows up as a SCAN or a TEMP B-TREE.
+Run: python3 scripts/bench_large_table.py [--members 1000] [--days 365]
+"""
+
+import sys
+import os
+import time
+import random
+import argparse
+import tempfile
+from datetime import date, datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Point the app at a scratch database before anything reads Config
+scratch = tempfile.mkdtemp()
+os.environ['DATABASE_PATH'] = os.path.join(scratch, 'bench.db')
+os.environ['ARCHIVE_DATABASE_PATH'] = os.path.join(scratch, 'bench_archive.db')
+os.environ['METRICS_DATABASE_PATH'] = os.path.join(scratch, 'bench_metrics.db')
+
+from config import Config
+from utils.db import init_db, get_db, shard_for
+from utils.stats import get_table_stats
+from models.user import User
+from models.table import Table
+from models.prompt import Prompt
+from utils.pagination import decode_cursor
+import logging
+
+# Setup logging
+logging.basicConfig(
+    level=logging.ERROR,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+def seed(members, days, answer_rate):
+    """One table with `members` members and `days` daily prompts; returns (table_id, user_ids, prompt_ids)"""
+    init_db()
+    owner_id = User.create('owner', 'owner@example.com', 'password123', 'Owner')
+    table_id, _ = Table.create('Bench', owner_id, prompt_time='00:00')
+    Table.update_settings(table_id, max_members=Config.TABLE_MEMBER_LIMIT)
+
+    start = date.today() - timedelta(days=days - 1)
+    joined = datetime.combine(start, datetime.min.time()) - timedelta(days=1)
+    random.seed(1)
+
+    conn = get_db()
+    try:
+        conn.executemany(
+            "INSERT INTO users (username, email, password_hash, display_name) VALUES (?, ?, '!', ?)",
+            [(f'member{i}', f'member{i}@example.com', f'Member {i}') for i in range(1, members)]
+        )
+        user_ids = [owner_id] + [row['id'] for row in conn.execute('SELECT id FROM users WHERE id != ? ORDER BY id', (owner_id,))]
+        conn.commit()
+    finally:
+        conn.close()
+
+    conn = get_db(shard=shard_for(table_id))
+    try:
+        # Members joining in bursts share a joined_at, which the (joined_at, id) keyset has to handle
+        conn.executemany(
+            'INSERT INTO table_members (table_id, user_id, display_name, joined_at) VALUES (?, ?, ?, ?)',
+            [(table_id, user_id, f'Member {i}', (joined + timedelta(seconds=i // 10)).strftime('%Y-%m-%d %H:%M:%S'))
+             for i, user_id in enumerate(user_ids[1:], start=1)]
+        )
+        prompt_ids = []
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            opens = datetime.combine(day, datetime.min.time())
+            prompt_ids.append(conn.execute('''
+                INSERT INTO prompts (table_id, prompt_text, prompt_date, editable_from, editable_until)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (table_id, f'Question for {day}', str(day), opens.strftime('%Y-%m-%d %H:%M:%S'),
+                  (opens + timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S'))).lastrowid)
+            conn.executemany(
+                'INSERT INTO responses (prompt_id, user_id, response_text, created_at) VALUES (?, ?, ?, ?)',
+                [(prompt_ids[-1], user_id, f'Answer from {user_id} on {day}',
+                  (opens + timedelta(seconds=random.randrange(86400))).strftime('%Y-%m-%d %H:%M:%S'))
+                 for user_id in user_ids if random.random() < answer_rate]
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+    Table.sync_member_count(table_id)
+    return table_id, user_ids, prompt_ids
+
+def measure(name, fn, iterations):
+    """(name, rows, median milliseconds) of `iterations` calls"""
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return name, result, timings[len(timings) // 2] * 1000
+
+def last_cursor(fetch):
+    """The cursor the deepest page starts after, found by paging through once"""
+    after = None
+    page = fetch(None)
+    while page['has_more']:
+        after = page['next_cursor']
+        page = fetch(after)
+    return decode_cursor(after)
+
+def offset_page(sql, params, page_size, offset):
+    """The OFFSET query the keyset pages replace, for comparison"""
+    def run():
+        conn = get_db()
+        try:
+            return len(conn.execute(f'{sql} LIMIT ? OFFSET ?', (*params, page_size, offset)).fetchall())
+        finally:
+            conn.close()
+    return run
+
+def explain(title, sql, params):
+    conn = get_db()
+    try:
+        print(f"\n{title}")
+        for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params):
+            print(f"  {row['detail']}")
+    finally:
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Time listing queries on one very large table')
+    parser.add_argument('--members', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--answer-rate', type=float, default=0.7)
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    table_id, user_ids, prompt_ids = seed(args.members, args.days, args.answer_rate)
+    print(f"Seeded {args.members} members x {args.days} days in {time.perf_counter() - started:.1f}s")
+
+    busiest = prompt_ids[-1]
+    response_size = Config.RESPONSE_PAGE_SIZE
+    member_size = Config.MEMBER_PAGE_SIZE
+
+    def responses(after_text):
+        return Prompt.get_responses(busiest, table_id, decode_cursor(after_text) if after_text else None, response_size)
+
+    def members(after_text):
+        return Table.get_members(table_id, decode_cursor(after_text) if after_text else None, member_size)
+
+    conn = get_db()
+    try:
+        response_count = conn.execute('SELECT COUNT(*) AS count FROM responses WHERE prompt_id = ?', (busiest,)).fetchone()['count']
+    finally:
+        conn.close()
+    deep_responses = last_cursor(responses)
+    deep_members = last_cursor(members)
+    newcomer = User.create('newcomer', 'newcomer@example.com', 'password123', 'Newcomer')
+
+    responses_sql = '''
+        SELECT r.*, tm.display_name, u.username
+        FROM responses r
+        JOIN users u ON r.user_id = u.id
+        JOIN table_members tm ON r.user_id = tm.user_id
+        JOIN prompts p ON r.prompt_id = p.id
+        WHERE r.prompt_id = ? AND p.table_id = ? AND tm.table_id = p.table_id
+    '''
+    members_sql = '''
+        SELECT u.id, u.username, tm.display_name, tm.role, tm.joined_at
+        FROM table_members tm
+        JOIN users u ON u.id = tm.user_id
+        WHERE tm.table_id = ?
+    '''
+
+    results = [
+        measure('responses: first page', lambda: len(Prompt.get_responses(busiest, table_id, None, response_size)['responses']), args.iterations),
+        measure('responses: last page (keyset)', lambda: len(Prompt.get_responses(busiest, table_id, deep_responses, response_size)['responses']), args.iterations),
+        measure('responses: last page (OFFSET)', offset_page(responses_sql + ' ORDER BY r.created_at, r.id', (busiest, table_id),
+                                                             response_size, (response_count - 1) // response_size * response_size), args.iterations),
+        measure('members: first page', lambda: len(Table.get_members(table_id, None, member_size)['members']), args.iterations),
+        measure('members: last page (keyset)', lambda: len(Table.get_members(table_id, deep_members, member_size)['members']), args.iterations),
+        measure('members: last page (OFFSET)', offset_page(members_sql + ' ORDER BY tm.joined_at, tm.id', (table_id,),
+                                                           member_size, (args.members - 1) // member_size * member_size), args.iterations),
+        measure('table list (stored member_count)', lambda: len(Table.get_user_tables(user_ids[-1])), args.iterations),
+        measure('stats (rollups)', lambda: len(get_table_stats(table_id, date.today())['members']), max(1, args.iterations // 4)),
+        measure('join attempt at the member limit', lambda: int(Table.add_member(table_id, newcomer)[0]), args.iterations),
+    ]
+
+    print(f"{response_count} responses on the latest prompt; pages of {response_size} responses, {member_size} members")
+    print(f"{'query':<40}{'rows':>6}{'median ms':>12}")
+    for name, rows, millis in results:
+        print(f"{name:<40}{rows:>6}{millis:>12.2f}")
+
+    explain('Plan: responses page after a cursor',
+            responses_sql + ' AND (r.created_at, r.id) > (?, ?) ORDER BY r.created_at, r.id LIMIT ?',
+            (busiest, table_id, *deep_responses, response_size + 1))
+    explain('Plan: members page after a cursor',
+            members_sql + ' AND (tm.joined_at, tm.id) > (?, ?) ORDER BY tm.joined_at, tm.id LIMIT ?',
+            (table_id, *deep_members, member_size + 1))
+
+if __name__ == '__main__':
+    main()
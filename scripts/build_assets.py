@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Static asset build script
+Minifies CSS/JS, fingerprints them with a content hash and writes
+gzip (and brotli, if installed) variants plus static/dist/manifest.json.
+Relative ES module imports are rewritten to the fingerprinted names.
+New files are written next to the current build and the manifest is
+switched last, so running workers and cached pages keep working; files
+of builds older than the previous one are removed afterwards.
+Run after every deploy: python3 scripts/build_assets.py
+"""
+
+import sys
+import os
+import re
+import gzip
+import json
+import hashlib
+import logging
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.assets import STATIC_DIR, DIST_DIR, MANIFEST_PATH
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+SOURCE_DIRS = {'css': '.css', 'js': '.js'}
+
+# Static and dynamic relative imports, e.g. from './core.js' or import('./switcher.js')
+IMPORT_PATTERN = re.compile(r"""(\bfrom\s*|\bimport\s*\(\s*)(['"])(\./[^'"]+)\2""")
+
+def minify_css(source):
+    """Strip comments and collapse whitespace in a stylesheet"""
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    source = re.sub(r'\s+', ' ', source)
+    source = re.sub(r'\s*([{};,>])\s*', r'\1', source)
+    source = re.sub(r':\s+', ':', source)
+    return source.replace(';}', '}').strip()
+
+# Characters after which a '/' starts a regex literal rather than a division
+REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+
+def scan_js(source):
+    """(starts_in_template, ends_in_template) for each line of a script.
+
+    A small scanner over strings, comments, regex literals and template literals
+    (with ${} nesting). It can't tell a regex after a keyword (`return /x/`) from
+    a division; a source it loses track of ends inside a literal or comment and
+    raises ValueError, so the build fails instead of emitting a broken bundle.
+    """
+    states = []
+    mode = 'code'
+    line_start = 'code'
+    # Open braces inside each ${ } we are in, innermost last
+    braces = []
+    last = ''
+    i = 0
+    while i < len(source):
+        c = source[i]
+        following = source[i + 1:i + 2]
+        if c == '\n':
+            continued = source[i - 1:i] == '\\'
+            if mode == 'line_comment':
+                mode = 'code'
+            elif mode in ('single', 'double') and not continued or mode in ('regex', 'regex_class'):
+                raise ValueError(f"Unterminated string or regex on line {len(states) + 1}")
+            states.append((line_start == 'template', mode == 'template'))
+            line_start = mode
+        elif mode == 'code':
+            if c in '\'"':
+                mode = 'single' if c == "'" else 'double'
+            elif c == '`':
+                mode = 'template'
+            elif c == '/' and following == '/':
+                mode = 'line_comment'
+            elif c == '/' and following == '*':
+                mode = 'block_comment'
+                i += 1
+            elif c == '/' and (not last or last in REGEX_PRECEDERS):
+                mode = 'regex'
+            elif c == '{' and braces:
+                braces[-1] += 1
+            elif c == '}' and braces:
+                if braces[-1]:
+                    braces[-1] -= 1
+                else:
+                    braces.pop()
+                    mode = 'template'
+            if not c.isspace() and mode in ('code', 'single', 'double'):
+                last = c
+        elif mode in ('single', 'double', 'template', 'regex', 'regex_class') and c == '\\':
+            # Skip the escaped character (a line continuation's newline is still counted)
+            if following != '\n':
+                i += 1
+        elif mode in ('single', 'double'):
+            if c == ("'" if mode == 'single' else '"'):
+                mode = 'code'
+        elif mode == 'template':
+            if c == '`':
+                mode = 'code'
+                last = c
+            elif c == '$' and following == '{':
+                braces.append(0)
+                mode = 'code'
+                last = '{'
+                i += 1
+        elif mode == 'block_comment':
+            if c == '*' and following == '/':
+                mode = 'code'
+                i += 1
+        elif mode == 'regex':
+            if c == '[':
+                mode = 'regex_class'
+            elif c == '/':
+                mode = 'code'
+                last = c
+        elif mode == 'regex_class':
+            if c == ']':
+                mode = 'regex'
+        i += 1
+
+    if mode not in ('code', 'line_comment') or braces:
+        unterminated = {'single': 'string', 'double': 'string', 'template': 'template literal',
+                        'block_comment': 'comment', 'regex': 'regex', 'regex_class': 'regex'}
+        raise ValueError(f"Source ends inside a {unterminated.get(mode, 'template literal')}")
+    states.append((line_start == 'template', False))
+    return states
+
+def minify_js(source):
+    """Conservative JS minification: drop indentation, blank and comment-only lines.
+
+    Lines inside template literals are kept as written, since their whitespace
+    and any '//' in them are part of the string.
+    """
+    lines = []
+    for line, (starts_in_template, ends_in_template) in zip(source.split('\n'), scan_js(source)):
+        if starts_in_template:
+            lines.append(line if ends_in_template else line.rstrip())
+            continue
+        line = line.lstrip() if ends_in_template else line.strip()
+        if not line or line.startswith('//'):
+            continue
+        lines.append(line)
+    return '\n'.join(lines) + '\n'
+
+def find_sources():
+    """Relative paths (e.g. 'js/core.js') of every asset to build"""
+    sources = []
+    for folder, extension in SOURCE_DIRS.items():
+        for root, _, files in os.walk(os.path.join(STATIC_DIR, folder)):
+            for name in sorted(files):
+                if name.endswith(extension):
+                    full_path = os.path.join(root, name)
+                    sources.append(os.path.relpath(full_path, STATIC_DIR).replace(os.sep, '/'))
+    return sorted(sources)
+
+def write_file(path, data):
+    """Write aside and rename, so a file being served is never seen half-written"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def write_variants(path, data):
+    """Write the asset and its precompressed variants"""
+    write_file(path, data)
+
+    # mtime=0 keeps the gzip output byte-identical between builds
+    write_file(path + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+
+    if brotli:
+        write_file(path + '.br', brotli.compress(data, quality=11))
+
+def build_asset(source, manifest, building=()):
+    """Build one asset (after the modules it imports) and record it in the manifest"""
+    if source in manifest:
+        return manifest[source]
+    if source in building:
+        # A content hash can't include itself, so import cycles can't be fingerprinted
+        raise ValueError(f"Import cycle: {' -> '.join(building + (source,))}")
+
+    with open(os.path.join(STATIC_DIR, source), 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    if source.endswith('.js'):
+        # Build imported modules first so their fingerprinted names are known
+        source_dir = os.path.dirname(source)
+
+        def rewrite(match):
+            prefix, quote, specifier = match.groups()
+            target = os.path.normpath(os.path.join(source_dir, specifier)).replace(os.sep, '/')
+            built_target = build_asset(target, manifest, building + (source,))
+            relative = os.path.relpath(built_target, source_dir).replace(os.sep, '/')
+            return f'{prefix}{quote}./{relative}{quote}'
+
+        minified = minify_js(IMPORT_PATTERN.sub(rewrite, content))
+    else:
+        minified = minify_css(content)
+    data = minified.encode('utf-8')
+
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    stem, extension = os.path.splitext(source)
+    built = f'{stem}.{digest}{extension}'
+
+    output_path = os.path.join(DIST_DIR, built)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    write_variants(output_path, data)
+
+    manifest[source] = built
+    logging.info(f"{source} -> {built} ({len(content.encode('utf-8'))} -> {len(data)} bytes)")
+    return built
+
+def read_manifest():
+    """The manifest of the build being replaced ({} if there is none)"""
+    try:
+        with open(MANIFEST_PATH, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def prune(keep):
+    """Delete built files (and their variants) not named in `keep`; returns how many"""
+    removed = 0
+    for root, _, files in os.walk(DIST_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            if path == MANIFEST_PATH:
+                continue
+            built = os.path.relpath(path, DIST_DIR).replace(os.sep, '/')
+            for suffix in ('.gz', '.br', '.tmp'):
+                if built.endswith(suffix):
+                    built = built[:-len(suffix)]
+                    break
+            if built not in keep:
+                os.remove(path)
+                removed += 1
+    return removed
+
+def build():
+    """Build every asset, switch the manifest, then prune builds older than the previous one"""
+    previous = read_manifest()
+    os.makedirs(DIST_DIR, exist_ok=True)
+
+    manifest = {}
+    for source in find_sources():
+        build_asset(source, manifest)
+
+    # The switch: workers pick up the new names once the manifest changes
+    write_file(MANIFEST_PATH, json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+
+    # Pages rendered (and modules loaded) before the switch still use the previous build
+    removed = prune(set(manifest.values()) | set(previous.values()))
+    if removed:
+        logging.info(f"Removed {removed} files from older builds")
+
+    if not brotli:
+        logging.warning("brotli not installed, only gzip variants were written")
+    return manifest
+
+if __name__ == '__main__':
+    logging.info("Building static assets...")
+    try:
+        build()
+        logging.info("Asset build completed successfully")
+        sys.exit(0)
+    except Exception as e:
+        logging.error(f"Asset build failed: {str(e)}")
+        sys.exit(1)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Shard move read-cursor check
+Builds a throwaway two-shard database, reads a table's responses on shard 1,
+moves the table down to shard 0 and drops the moved responses (as the cold
+archive does once they age out), so the next response gets a lower id than
+any the members have seen. Passes if that response still counts as unread,
+and stops counting once the member has seen it.
+Run: python3 scripts/check_shard_move.py
+"""
+
+import sys
+import os
+import time
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Point the app at a scratch database before anything reads Config
+scratch = tempfile.mkdtemp()
+os.environ['DATABASE_PATH'] = os.path.join(scratch, 'check.db')
+os.environ['ARCHIVE_DATABASE_PATH'] = os.path.join(scratch, 'check_archive.db')
+os.environ['METRICS_DATABASE_PATH'] = os.path.join(scratch, 'check_metrics.db')
+os.environ['DB_SHARDS'] = '2'
+
+from app import app
+from utils.db import init_db, get_db, shard_for
+from utils.writer import run_write
+from utils.shards import move_table
+from utils.auth import create_jwt_token
+from models.user import User
+from models.table import Table
+import logging
+
+# Setup logging
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+def client(user_id):
+    c = app.test_client()
+    c.set_cookie('auth_token', create_jwt_token(user_id))
+    return c
+
+def unread(user_id, table_id):
+    # mark_seen doesn't wait for the writer; anything queued before this runs first
+    run_write(lambda conn: None, shard=shard_for(table_id))
+    return next(t['unread_count'] for t in Table.get_user_tables(user_id) if t['id'] == table_id)
+
+def main():
+    init_db()
+    reader, writer, late = (User.create(f'member{i}', f'member{i}@example.com', 'password123', f'Member {i}')
+                            for i in range(3))
+    table_id, _ = Table.create('Moving', reader, prompt_time='00:00')
+    Table.add_member(table_id, writer)
+    Table.add_member(table_id, late)
+    move_table(table_id, 1)
+
+    # Shard 0 gets responses of its own, so its ids stay below shard 1's
+    other = User.create('other', 'other@example.com', 'password123', 'Other')
+    other_table, _ = Table.create('Staying', other, prompt_time='00:00')
+    move_table(other_table, 0)
+    client(other).post('/api/response/submit', json={'response': 'On shard 0'})
+
+    client(writer).post('/api/response/submit', json={'response': 'Written on shard 1'})
+    client(reader).post('/api/response/submit', json={'response': 'Read on shard 1'})
+    before = unread(reader, table_id)
+
+    move_table(table_id, 0)
+    conn = get_db()
+    conn.execute('''
+        DELETE FROM responses WHERE prompt_id IN (SELECT id FROM prompts WHERE table_id = ?)
+    ''', (table_id,))
+    conn.commit()
+    conn.close()
+
+    # The app is stopped for moves, so new responses come at least a second later
+    time.sleep(1.1)
+    client(late).post('/api/response/submit', json={'response': 'Written on shard 0'})
+    conn = get_db()
+    new_id = conn.execute('SELECT MAX(id) FROM responses WHERE user_id = ?', (late,)).fetchone()[0]
+    conn.close()
+    after_move = unread(reader, table_id)
+
+    # Their own answer went with the others; answering again shows them the page
+    client(reader).post('/api/response/submit', json={'response': 'Read on shard 0'})
+    after_seen = unread(reader, table_id)
+
+    print(f"Unread before the move: {before}, after it: {after_move} (new response id {new_id}), "
+          f"after reading: {after_seen}")
+
+    failures = []
+    if before != 0:
+        failures.append(f"expected 0 unread before the move, found {before}")
+    if new_id >= 1 << 40:
+        failures.append("the new response did not get a shard 0 id")
+    if after_move != 1:
+        failures.append(f"expected 1 unread after the move, found {after_move}")
+    if after_seen != 0:
+        failures.append(f"expected 0 unread after reading, found {after_seen}")
+
+    if failures:
+        logging.error(f"FAILED: {', '.join(failures)}")
+        return 1
+    print("OK")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,16 +1,21 @@
 #!/usr/bin/env python3
 """
 Daily prompt generation script
-Run this via cron to create daily prompts for all tables
+Run this via cron to create today's prompts for all tables
+With --due, it only creates prompts for tables whose prompt time (in the
+table's own time zone) falls within the next minute, found with a range
+scan on tables.next_boundary_utc; run it every minute in that mode
 """
 
 import sys
 import os
+import argparse
 
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from utils.prompts import create_prompts_for_all_tables
+from utils.db import migrate_db
+from utils.prompts import create_due_prompts, create_prompts_for_all_tables
 import logging
 
 # Setup logging
@@ -20,8 +25,16 @@ logging.basicConfig(
 )
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Create Kitchen Table prompts')
+    parser.add_argument('--due', action='store_true',
+                        help='Only tables whose prompt time is within the next minute (cron every minute)')
+    args = parser.parse_args()
+
     logging.info("Starting daily prompt generation...")
-    success = create_prompts_for_all_tables()
+    if args.due:
+        success = migrate_db() and create_due_prompts()
+    else:
+        success = migrate_db() and create_prompts_for_all_tables()
     
     if success:
         logging.info("Daily prompt generation completed successfully")
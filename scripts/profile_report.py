@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Request profile report
+Works with the profiles the app saves to PROFILE_DIR (see utils/profiler.py):
+  token     - print an X-Profile header value signed with PROFILE_SECRET
+  list      - profiles saved per route
+  collapse  - merge sampled stacks into one collapsed-stack file for
+              flamegraph.pl or speedscope
+  stats     - merge cProfile dumps and print the most expensive functions
+Example:
+  curl -H "X-Profile: $(python3 scripts/profile_report.py token)" ... /api/prompt/today
+  python3 scripts/profile_report.py collapse --route /api/prompt/today > today.folded
+  flamegraph.pl today.folded > today.svg
+"""
+
+import sys
+import os
+import time
+import argparse
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Config
+from utils.profiler import sign_token, list_profiles, merge_collapsed, merge_pstats
+import logging
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+def main():
+    parser = argparse.ArgumentParser(description='Kitchen Table request profiles')
+    parser.add_argument('--profile-dir', default=Config.PROFILE_DIR)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    token = commands.add_parser('token', help='Print a signed X-Profile header value')
+    token.add_argument('--minutes', type=int, default=10, help='How long the token stays valid')
+
+    for name, help_text in [('list', 'List saved profiles'),
+                            ('collapse', 'Merge sampled stacks (flamegraph input)'),
+                            ('stats', 'Merge cProfile dumps and print the top functions')]:
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('--route', help='URL rule, e.g. /api/prompt/today (default: all)')
+        command.add_argument('--hours', type=float, help='Only profiles from the last N hours')
+        if name == 'stats':
+            command.add_argument('--sort', default='cumulative', help='pstats sort key')
+            command.add_argument('--limit', type=int, default=30)
+
+    args = parser.parse_args()
+    Config.PROFILE_DIR = args.profile_dir
+
+    try:
+        if args.command == 'token':
+            if not Config.PROFILE_SECRET:
+                logging.error("PROFILE_SECRET is not set")
+                return 1
+            print(sign_token(time.time() + args.minutes * 60))
+            return 0
+
+        since = time.time() - args.hours * 3600 if args.hours else None
+        profiles = list_profiles(args.route, since)
+
+        if args.command == 'list':
+            for mtime, path in profiles:
+                print(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(mtime))}  "
+                      f"{os.path.relpath(path, Config.PROFILE_DIR)}")
+            logging.info(f"{len(profiles)} profiles in {Config.PROFILE_DIR}")
+
+        elif args.command == 'collapse':
+            paths = [path for _, path in profiles if path.endswith('.folded')]
+            stacks = merge_collapsed(paths)
+            for stack, count in sorted(stacks.items()):
+                print(f"{stack} {count}")
+            logging.info(f"Merged {sum(stacks.values())} samples from {len(paths)} profiles")
+
+        elif args.command == 'stats':
+            paths = [path for _, path in profiles if path.endswith('.pstats')]
+            stats = merge_pstats(paths)
+            if stats is None:
+                logging.error("No cProfile dumps found (profiles are only dumped with PROFILE_MODE=cprofile)")
+                return 1
+            stats.sort_stats(args.sort).print_stats(args.limit)
+            logging.info(f"Merged {len(paths)} profiles")
+
+        return 0
+    except Exception as e:
+        logging.error(f"Profile {args.command} failed: {str(e)}")
+        return 1
+
+if __name__ == '__main__':
+    sys.exit(main())
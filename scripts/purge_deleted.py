@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Deleted data purge script
+Finishes deleting tombstoned accounts and tables in small batches. The app
+does this itself in a background thread; run this via cron instead when
+PURGE_ENABLED=false, or by hand to check on progress with --status.
+"""
+
+import sys
+import os
+import argparse
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.db import migrate_db, get_db
+from utils.purge import run_pending_jobs
+import logging
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+def show_status():
+    conn = get_db(query_only=True)
+    try:
+        jobs = conn.execute('''
+            SELECT * FROM deletion_jobs
+            WHERE status = 'pending' OR finished_at > datetime('now', '-1 day')
+            ORDER BY id
+        ''').fetchall()
+    finally:
+        conn.close()
+    for job in jobs:
+        print(f"#{job['id']} {job['kind']} {job['target_id']}: {job['status']}, "
+              f"{job['rows_deleted']} rows deleted, queued {job['created_at']}")
+    if not jobs:
+        print("No pending or recent deletion jobs")
+
+def main():
+    parser = argparse.ArgumentParser(description='Finish background deletions')
+    parser.add_argument('--status', action='store_true', help='List pending and recent jobs instead')
+    args = parser.parse_args()
+
+    try:
+        if not migrate_db():
+            return 1
+        if args.status:
+            show_status()
+            return 0
+        count = run_pending_jobs()
+        logging.info(f"Purge completed: {count} deletion jobs finished")
+        return 0
+    except Exception as e:
+        logging.error(f"Purge failed: {str(e)}")
+        return 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Shard rebalancing script
+Moves tables (their members, prompts and responses) between shard files so
+each of the DB_SHARDS shards holds about the same number of tables, or moves
+one table with --table/--to. Also use it after lowering DB_SHARDS to move
+tables off the shards that are going away.
+Stop the app first: each worker caches which shard a table lives on.
+"""
+
+import sys
+import os
+import argparse
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Config
+from utils.db import migrate_db
+from utils.shards import move_table, rebalance, shard_table_counts
+import logging
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+def main():
+    parser = argparse.ArgumentParser(description='Move tables between database shards (app must be stopped)')
+    parser.add_argument('--table', type=int, help='Move only this table')
+    parser.add_argument('--to', type=int, help='Destination shard for --table')
+    parser.add_argument('--dry-run', action='store_true', help='Show the moves without making them')
+    args = parser.parse_args()
+
+    if (args.table is None) != (args.to is None):
+        logging.error("--table and --to must be given together")
+        return 1
+    if args.to is not None and not 0 <= args.to < Config.DB_SHARDS:
+        logging.error(f"--to must be between 0 and {Config.DB_SHARDS - 1} (DB_SHARDS={Config.DB_SHARDS})")
+        return 1
+
+    try:
+        if not migrate_db():
+            return 1
+        if args.table is not None:
+            if not args.dry_run:
+                move_table(args.table, args.to)
+        else:
+            moves = rebalance(dry_run=args.dry_run)
+            logging.info(f"Rebalance {'planned' if args.dry_run else 'completed'}: {len(moves)} tables moved")
+        logging.info(f"Tables per shard: {shard_table_counts()}")
+        return 0
+    except Exception as e:
+        logging.error(f"Rebalance failed: {str(e)}")
+        return 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Prompt-boundary concurrency test
+Builds a throwaway database with one full table whose prompt for today
+doesn't exist yet, then fires hundreds of simultaneous /api/prompt/today
+and /api/response/submit requests at it from several processes.
+Passes if there are no server errors, exactly one prompt for the day and
+exactly one response per member.
+Run: python3 scripts/stress_prompt_boundary.py [--processes 4] [--requests 400]
+"""
+
+import sys
+import os
+import argparse
+import tempfile
+import threading
+import multiprocessing
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Point the app at a scratch database before anything reads Config
+scratch = tempfile.mkdtemp()
+os.environ['DATABASE_PATH'] = os.path.join(scratch, 'stress.db')
+os.environ['METRICS_DATABASE_PATH'] = os.path.join(scratch, 'stress_metrics.db')
+
+from app import app
+from config import Config
+from utils.db import init_db, get_db, shard_for
+from utils.auth import create_jwt_token
+from models.user import User
+from models.table import Table
+import logging
+
+# Setup logging
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+def setup(members):
+    """One table with `members` members and no prompt yet"""
+    init_db()
+    user_ids = []
+    for i in range(members):
+        user_id = User.create(f'member{i}', f'member{i}@example.com', 'password123', f'Member {i}')
+        user_ids.append(user_id)
+    table_id, _ = Table.create('Stress', user_ids[0], prompt_time='00:00')
+    for user_id in user_ids[1:]:
+        Table.add_member(table_id, user_id)
+    return table_id, user_ids
+
+def fire(user_ids, count, barrier, results):
+    """Release `count` threads at once, each sending one request as a member"""
+    def request(i):
+        # Every member both polls and submits
+        user_id = user_ids[(i // 2) % len(user_ids)]
+        client = app.test_client()
+        client.set_cookie('auth_token', create_jwt_token(user_id))
+        barrier.wait()
+        if i % 2:
+            response = client.post('/api/response/submit', json={'response': f'Answer from {user_id}'})
+        else:
+            response = client.get('/api/prompt/today')
+        results.append(response.status_code)
+
+    threads = [threading.Thread(target=request, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def worker(user_ids, count, queue):
+    results = []
+    fire(user_ids, count, threading.Barrier(count), results)
+    queue.put(results)
+
+def main():
+    parser = argparse.ArgumentParser(description='Prompt-boundary concurrency test')
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=400, help='Total requests across all processes')
+    parser.add_argument('--members', type=int, default=Config.TABLE_MAX_MEMBERS)
+    args = parser.parse_args()
+
+    table_id, user_ids = setup(args.members)
+    per_process = args.requests // args.processes
+
+    # fork keeps the app and config; each process then starts its own writer thread
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    processes = [context.Process(target=worker, args=(user_ids, per_process, queue))
+                 for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    statuses = []
+    for _ in processes:
+        statuses.extend(queue.get())
+    for process in processes:
+        process.join()
+
+    conn = get_db(shard=shard_for(table_id))
+    prompts = conn.execute('SELECT COUNT(*) FROM prompts WHERE table_id = ?', (table_id,)).fetchone()[0]
+    per_user = conn.execute('''
+        SELECT COUNT(*) FROM responses r JOIN prompts p ON r.prompt_id = p.id
+        WHERE p.table_id = ? GROUP BY r.user_id
+    ''', (table_id,)).fetchall()
+    conn.close()
+
+    counts = {code: statuses.count(code) for code in sorted(set(statuses))}
+    print(f"{len(statuses)} requests from {args.processes} processes, {args.members} members")
+    print(f"Status codes: {counts}")
+    print(f"Prompts for today: {prompts}, responses: {sum(r[0] for r in per_user)}")
+
+    failures = []
+    if any(code >= 500 for code in statuses):
+        failures.append("server errors")
+    if prompts != 1:
+        failures.append(f"expected 1 prompt, found {prompts}")
+    if len(per_user) != args.members or any(r[0] != 1 for r in per_user):
+        failures.append("expected exactly one response per member")
+
+    if failures:
+        logging.error(f"FAILED: {', '.join(failures)}")
+        return 1
+    print("OK")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
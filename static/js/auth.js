@@ -0,0 +1,86 @@
+// Kitchen Table - Auth pages (signup, login, forgot and reset password)
+import { API } from './core.js';
+
+// Auth Forms
+if (typeof mode !== 'undefined') {
+    const form = document.getElementById('auth-form');
+    
+    if (form) {
+        form.addEventListener('submit', async (e) => {
+            e.preventDefault();
+            
+            const errorEl = document.getElementById('error-message');
+            const successEl = document.getElementById('success-message');
+            if (errorEl) errorEl.classList.remove('show');
+            if (successEl) successEl.classList.remove('show');
+            
+            const formData = new FormData(form);
+            const data = Object.fromEntries(formData);
+            
+            try {
+                let response;
+                
+                if (mode === 'signup') {
+                    response = await API.call('/api/auth/signup', {
+                        method: 'POST',
+                        body: JSON.stringify(data)
+                    });
+                } else if (mode === 'login') {
+                    response = await API.call('/api/auth/login', {
+                        method: 'POST',
+                        body: JSON.stringify(data)
+                    });
+                } else if (mode === 'forgot') {
+                    response = await API.call('/api/auth/forgot-password', {
+                        method: 'POST',
+                        body: JSON.stringify(data)
+                    });
+                    
+                    if (successEl) {
+                        successEl.textContent = response.message;
+                        if (response.reset_token) {
+                            successEl.textContent += ` Reset link: ${window.location.origin}/reset-password/${response.reset_token}`;
+                        }
+                        successEl.classList.add('show');
+                    }
+                    form.reset();
+                    return;
+                } else if (mode === 'reset') {
+                    if (data.password !== data.confirm_password) {
+                        throw new Error('Passwords do not match');
+                    }
+                    response = await API.call('/api/auth/reset-password', {
+                        method: 'POST',
+                        body: JSON.stringify({
+                            token: document.getElementById('token').value,
+                            password: data.password
+                        })
+                    });
+                    
+                    // Show success message for password reset
+                    if (successEl) {
+                        successEl.textContent = response.message || 'Password reset successful! Redirecting to login...';
+                        successEl.classList.add('show');
+                    }
+                    form.reset();
+                    
+                    // Redirect to login after 2 seconds
+                    setTimeout(() => {
+                        window.location.href = '/login';
+                    }, 2000);
+                    return;
+                }
+                
+                if (response.redirect) {
+                    window.location.href = response.redirect;
+                }
+
+            } catch (error) {
+                if (errorEl) {
+                    errorEl.textContent = error.message;
+                    errorEl.classList.add('show');
+                }
+            }
+        });
+    }
+}
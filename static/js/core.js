@@ -0,0 +1,117 @@
+// Kitchen Table - Shared API client and helpers
+
+// Utility functions
+export const API = {
+    async call(endpoint, options = {}) {
+        try {
+            const response = await fetch(endpoint, {
+                ...options,
+                headers: {
+                    'Content-Type': 'application/json',
+                    ...options.headers
+                },
+                credentials: 'include'
+            });
+            
+            const data = await response.json();
+            
+            if (!response.ok) {
+                throw new Error(data.error || 'An error occurred');
+            }
+            
+            return data;
+        } catch (error) {
+            throw error;
+        }
+    }
+};
+
+export function showError(elementId, message) {
+    const el = document.getElementById(elementId);
+    if (el) {
+        el.textContent = message;
+        el.classList.add('show');
+        setTimeout(() => el.classList.remove('show'), 5000);
+    }
+}
+
+export function showSuccess(elementId, message) {
+    const el = document.getElementById(elementId);
+    if (el) {
+        el.textContent = message;
+        el.classList.add('show');
+        setTimeout(() => el.classList.remove('show'), 5000);
+    }
+}
+
+export function showLoading() {
+    const overlay = document.getElementById('loading-overlay');
+    if (overlay) overlay.style.display = 'flex';
+}
+
+export function hideLoading() {
+    const overlay = document.getElementById('loading-overlay');
+    if (overlay) overlay.style.display = 'none';
+}
+
+export function formatTimeAgo(timestamp) {
+    const now = new Date();
+    const time = new Date(timestamp);
+    const seconds = Math.floor((now - time) / 1000);
+    
+    if (seconds < 60) return 'Just now';
+    if (seconds < 3600) return `${Math.floor(seconds / 60)}m ago`;
+    if (seconds < 86400) return `${Math.floor(seconds / 3600)}h ago`;
+    return `${Math.floor(seconds / 86400)}d ago`;
+}
+
+export function formatDate(dateString) {
+    const date = new Date(dateString);
+    const options = { weekday: 'long', month: 'long', day: 'numeric' };
+    return date.toLocaleDateString('en-US', options);
+}
+
+export function formatTimeUntilPrompt(seconds) {
+    if (seconds <= 0) return '';
+    
+    const hours = Math.floor(seconds / 3600);
+    const minutes = Math.floor((seconds % 3600) / 60);
+    
+    if (hours > 0) {
+        return `Today's prompt available in ${hours}h ${minutes}m`;
+    } else if (minutes > 0) {
+        return `Today's prompt available in ${minutes}m`;
+    } else {
+        return `Today's prompt available in less than 1 minute`;
+    }
+}
+
+export function getUserPillClass(userId) {
+    const colors = ['pill-lavender', 'pill-mint', 'pill-peach', 'pill-sky', 'pill-rose', 'pill-lemon', 'pill-sage', 'pill-lilac'];
+    return colors[userId % colors.length];
+}
+
+export function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
+// First-paint data embedded by the server (same shape as /api/bootstrap)
+let bootstrapData;
+export function getBootstrapData() {
+    if (bootstrapData === undefined) {
+        const el = document.getElementById('bootstrap-data');
+        bootstrapData = el ? JSON.parse(el.textContent) : null;
+    }
+    return bootstrapData;
+}
+
+export function formatPromptTime(time24) {
+    // Convert 24-hour time (e.g., "17:00") to 12-hour format (e.g., "5:00 PM")
+    const [hours, minutes] = time24.split(':');
+    const hour = parseInt(hours);
+    const ampm = hour >= 12 ? 'PM' : 'AM';
+    const hour12 = hour % 12 || 12;
+    return `${hour12}:${minutes} ${ampm}`;
+}
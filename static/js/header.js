@@ -0,0 +1,24 @@
+// Kitchen Table - Page header (logout button and table switcher)
+import { API } from './core.js';
+
+// Logout button (shared by the table, history and settings headers)
+export function initLogout() {
+    const logoutBtn = document.getElementById('logout-btn');
+    if (logoutBtn) {
+        logoutBtn.addEventListener('click', async () => {
+            try {
+                await API.call('/api/auth/logout', { method: 'POST' });
+                window.location.href = '/';
+            } catch (error) {
+                console.error('Logout error:', error);
+            }
+        });
+    }
+}
+
+// Table switcher is only fetched on pages that have a container for it
+export async function initTableSwitcher() {
+    if (!document.getElementById('table-switcher-container')) return;
+    const { TableSwitcher } = await import('./switcher.js');
+    new TableSwitcher();
+}
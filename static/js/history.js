@@ -0,0 +1,121 @@
+// Kitchen Table - History page
+import { API, formatDate, formatTimeAgo, getUserPillClass, escapeHtml } from './core.js';
+import { initLogout, initTableSwitcher } from './header.js';
+
+async function loadHistoryPrompt() {
+    try {
+        const urlParams = new URLSearchParams(window.location.search);
+        const dateParam = urlParams.get('date') || currentDate;
+
+        const data = await API.call(`/api/prompt/date/${dateParam}`);
+
+        // Update date
+        document.getElementById('date-label').textContent = formatDate(data.date).split(',')[0].toUpperCase();
+        document.getElementById('date-value').textContent = formatDate(data.date).split(',').slice(1).join(',');
+
+        // Update prompt
+        document.getElementById('prompt-text').textContent = data.prompt.prompt_text;
+
+        // Navigation buttons
+        const shownDate = new Date(data.date);
+        const prevDate = new Date(shownDate);
+        prevDate.setDate(prevDate.getDate() - 1);
+        const nextDate = new Date(shownDate);
+        nextDate.setDate(nextDate.getDate() + 1);
+        const today = new Date();
+
+        const prevLink = document.getElementById('prev-day-link');
+        const nextLink = document.getElementById('next-day-link');
+
+        // Show prev if within 7 days
+        const daysBack = Math.floor((today - shownDate) / (1000 * 60 * 60 * 24));
+        if (daysBack < 7) {
+            prevLink.href = `/table/history?date=${prevDate.toISOString().split('T')[0]}`;
+            prevLink.textContent = `← ${formatDate(prevDate.toISOString().split('T')[0])}`;
+            prevLink.style.display = 'inline-block';
+        } else {
+            prevLink.style.display = 'none';
+        }
+
+        // Show next if not today
+        if (daysBack > 0) {
+            nextLink.href = `/table/history?date=${nextDate.toISOString().split('T')[0]}`;
+            nextLink.textContent = `${formatDate(nextDate.toISOString().split('T')[0])} →`;
+            nextLink.style.display = 'inline-block';
+        } else {
+            nextLink.style.display = 'none';
+        }
+
+        // Render responses
+        const container = document.getElementById('responses-container');
+
+        if (!data.responses || data.responses.length === 0) {
+            container.innerHTML = `
+                <div class="empty-state">
+                    <div class="empty-state-icon">🤷</div>
+                    <p>No one answered this question</p>
+                </div>
+            `;
+            return;
+        }
+
+        const currentUserId = data.user_response && data.user_response.user_id;
+        container.innerHTML = data.responses.map(r => responseCardHTML(r, currentUserId)).join('');
+
+        // Large tables come a page at a time
+        let cursor = data.next_cursor;
+        if (data.has_more) {
+            const moreBtn = document.createElement('button');
+            moreBtn.className = 'btn btn-secondary';
+            moreBtn.style.cssText = 'width: 100%; margin-top: 1rem;';
+            moreBtn.textContent = 'Show more';
+            container.after(moreBtn);
+
+            moreBtn.addEventListener('click', async () => {
+                try {
+                    moreBtn.disabled = true;
+                    const params = new URLSearchParams({ prompt_id: data.prompt.id, after: cursor });
+                    const page = await API.call(`/api/response/list?${params}`);
+                    container.insertAdjacentHTML('beforeend', page.responses.map(r => responseCardHTML(r, currentUserId)).join(''));
+                    cursor = page.next_cursor;
+                    if (!page.has_more) moreBtn.remove();
+                } catch (error) {
+                    alert(error.message);
+                } finally {
+                    moreBtn.disabled = false;
+                }
+            });
+        }
+    } catch (error) {
+        console.error('Error loading history prompt:', error);
+        const container = document.getElementById('responses-container');
+        container.innerHTML = `
+            <div class="empty-state">
+                <p>No prompt available for this date</p>
+            </div>
+        `;
+    }
+}
+
+function responseCardHTML(r, currentUserId) {
+    const isCurrentUser = r.user_id === currentUserId;
+    const pillClass = getUserPillClass(r.user_id);
+    const editedLabel = r.edited_at ? ' <span style="font-size: 0.75rem; opacity: 0.7;">(edited)</span>' : '';
+
+    return `
+        <div class="response-card">
+            <div class="response-header">
+                ${isCurrentUser 
+                    ? `<span class="response-author you">You</span>`
+                    : `<span class="response-author pill ${pillClass}">${escapeHtml(r.display_name)}</span>`
+                }
+                <span class="response-time">${formatTimeAgo(r.created_at)}${editedLabel}</span>
+            </div>
+            <p class="response-text">${escapeHtml(r.response_text)}</p>
+        </div>
+    `;
+}
+
+loadHistoryPrompt();
+initLogout();
+initTableSwitcher();
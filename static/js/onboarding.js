@@ -0,0 +1,74 @@
+// Kitchen Table - Create and join table pages
+import { API, showError, showLoading, hideLoading } from './core.js';
+
+// Create Table Form
+const createTableForm = document.getElementById('create-table-form');
+if (createTableForm) {
+    createTableForm.addEventListener('submit', async (e) => {
+        e.preventDefault();
+        
+        const formData = new FormData(createTableForm);
+        const data = Object.fromEntries(formData);
+        
+        try {
+            showLoading();
+            const response = await API.call('/api/table/create', {
+                method: 'POST',
+                body: JSON.stringify({
+                    name: data.table_name,
+                    prompt_time: data.prompt_time,
+                    // The question opens at prompt_time in the creator's zone
+                    timezone: Intl.DateTimeFormat().resolvedOptions().timeZone
+                })
+            });
+            
+            if (response.redirect) {
+                window.location.href = response.redirect;
+            }
+        } catch (error) {
+            hideLoading();
+            showError('error-message', error.message);
+        }
+    });
+}
+
+// Join Table Form
+const joinTableForm = document.getElementById('join-table-form');
+if (joinTableForm) {
+    const inviteCodeInput = document.getElementById('invite_code');
+    
+    // Auto-format invite code
+    if (inviteCodeInput) {
+        inviteCodeInput.addEventListener('input', (e) => {
+            let value = e.target.value.toUpperCase().replace(/[^A-Z0-9]/g, '');
+            if (value.length > 4) {
+                value = value.slice(0, 4) + '-' + value.slice(4, 8);
+            }
+            e.target.value = value;
+        });
+    }
+    
+    joinTableForm.addEventListener('submit', async (e) => {
+        e.preventDefault();
+        
+        const formData = new FormData(joinTableForm);
+        const data = Object.fromEntries(formData);
+        
+        try {
+            showLoading();
+            const response = await API.call('/api/table/join', {
+                method: 'POST',
+                body: JSON.stringify({
+                    invite_code: data.invite_code
+                })
+            });
+            
+            if (response.redirect) {
+                window.location.href = response.redirect;
+            }
+        } catch (error) {
+            hideLoading();
+            showError('error-message', error.message);
+        }
+    });
+}
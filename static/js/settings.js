@@ -0,0 +1,261 @@
+// Kitchen Table - Settings page
+import { API, showError, showSuccess, showLoading, hideLoading, formatPromptTime } from './core.js';
+import { initLogout, initTableSwitcher } from './header.js';
+
+// Cursor for the next page of members, or null once they're all shown
+let membersCursor = null;
+// Members seen at the table in the last couple of minutes
+let onlineUserIds = new Set();
+
+async function loadSettings() {
+    try {
+        const data = await API.call('/api/table/info');
+
+        // Update profile info
+        document.getElementById('display_name').value = data.user.display_name || data.user.username;
+        document.getElementById('username-display').textContent = data.user.username;
+
+        // Update table info (visible to all members)
+        document.getElementById('table-name-display').textContent = data.table.name;
+        document.getElementById('invite-code-display').textContent = data.table.invite_code;
+
+        // Format and display prompt time for all members
+        const promptTimeFormatted = formatPromptTime(data.table.prompt_time);
+        document.getElementById('prompt-time-display').textContent = `${promptTimeFormatted} (${data.table.timezone})`;
+
+        // Show owner settings if user is owner
+        if (data.table.is_owner) {
+            document.getElementById('owner-settings').style.display = 'block';
+            document.getElementById('table_name').value = data.table.name;
+            document.getElementById('prompt_time').value = data.table.prompt_time;
+            document.getElementById('timezone').value = data.table.timezone;
+            const maxMembers = document.getElementById('max_members');
+            maxMembers.value = data.table.max_members;
+            maxMembers.min = Math.max(2, data.table.member_count);
+        }
+
+        // Render the first page of members
+        onlineUserIds = new Set(data.table.online_user_ids);
+        document.getElementById('member-count').textContent = `(${data.table.member_count} of ${data.table.max_members}, ${onlineUserIds.size} online now)`;
+        document.getElementById('members-list').innerHTML = '';
+        renderMembers(data.members, data.members_next_cursor);
+    } catch (error) {
+        console.error('Error loading settings:', error);
+    }
+}
+
+function renderMembers(members, nextCursor) {
+    const membersHTML = members.map(m => `
+        <div class="member-item">
+            <div class="member-info">
+                <div class="member-name">${m.display_name}${onlineUserIds.has(m.id) ? '<span class="online-dot" title="Online now"></span>' : ''}</div>
+                <div class="member-username">@${m.username}${m.streak_current > 1 ? ` · ${m.streak_current} days in a row` : ''}</div>
+            </div>
+            ${m.role === 'owner' ? '<span class="member-role">Owner</span>' : ''}
+        </div>
+    `).join('');
+
+    document.getElementById('members-list').insertAdjacentHTML('beforeend', membersHTML);
+    membersCursor = nextCursor;
+    document.getElementById('more-members-btn').style.display = nextCursor ? 'block' : 'none';
+}
+
+const moreMembersBtn = document.getElementById('more-members-btn');
+if (moreMembersBtn) {
+    moreMembersBtn.addEventListener('click', async () => {
+        try {
+            moreMembersBtn.disabled = true;
+            const data = await API.call(`/api/table/members?after=${encodeURIComponent(membersCursor)}`);
+            renderMembers(data.members, data.has_more ? data.next_cursor : null);
+        } catch (error) {
+            alert(error.message);
+        } finally {
+            moreMembersBtn.disabled = false;
+        }
+    });
+}
+
+// Leave table modal
+const leaveTableBtn = document.getElementById('leave-table-btn');
+const leaveModal = document.getElementById('leave-modal');
+const cancelLeaveBtn = document.getElementById('cancel-leave-btn');
+const confirmLeaveBtn = document.getElementById('confirm-leave-btn');
+
+if (leaveTableBtn) {
+    leaveTableBtn.addEventListener('click', () => {
+        leaveModal.style.display = 'flex';
+    });
+}
+
+if (cancelLeaveBtn) {
+    cancelLeaveBtn.addEventListener('click', () => {
+        leaveModal.style.display = 'none';
+    });
+}
+
+if (confirmLeaveBtn) {
+    confirmLeaveBtn.addEventListener('click', async () => {
+        try {
+            showLoading();
+            const response = await API.call('/api/table/leave', {
+                method: 'POST'
+            });
+
+            if (response.redirect) {
+                window.location.href = response.redirect;
+            }
+        } catch (error) {
+            hideLoading();
+            leaveModal.style.display = 'none';
+            alert(error.message);
+        }
+    });
+}
+
+// Delete account modal
+const deleteAccountBtn = document.getElementById('delete-account-btn');
+const deleteModal = document.getElementById('delete-modal');
+const cancelDeleteBtn = document.getElementById('cancel-delete-btn');
+const deleteConfirmForm = document.getElementById('delete-confirm-form');
+
+if (deleteAccountBtn) {
+    deleteAccountBtn.addEventListener('click', () => {
+        deleteModal.style.display = 'flex';
+        document.getElementById('delete-password').value = '';
+        const deleteError = document.getElementById('delete-error');
+        if (deleteError) deleteError.classList.remove('show');
+    });
+}
+
+if (cancelDeleteBtn) {
+    cancelDeleteBtn.addEventListener('click', () => {
+        deleteModal.style.display = 'none';
+    });
+}
+
+if (deleteConfirmForm) {
+    deleteConfirmForm.addEventListener('submit', async (e) => {
+        e.preventDefault();
+
+        const password = document.getElementById('delete-password').value;
+
+        if (!password) {
+            showError('delete-error', 'Please enter your password');
+            return;
+        }
+
+        try {
+            const submitBtn = deleteConfirmForm.querySelector('button[type="submit"]');
+            submitBtn.disabled = true;
+            submitBtn.textContent = 'Deleting...';
+
+            const response = await API.call('/api/user/delete', {
+                method: 'POST',
+                body: JSON.stringify({ password })
+            });
+
+            if (response.redirect) {
+                window.location.href = response.redirect;
+            }
+        } catch (error) {
+            const submitBtn = deleteConfirmForm.querySelector('button[type="submit"]');
+            submitBtn.disabled = false;
+            submitBtn.textContent = 'Yes, Delete My Account';
+            showError('delete-error', error.message);
+        }
+    });
+}
+
+// Profile form
+const profileForm = document.getElementById('profile-form');
+if (profileForm) {
+    profileForm.addEventListener('submit', async (e) => {
+        e.preventDefault();
+
+        const formData = new FormData(profileForm);
+        const data = Object.fromEntries(formData);
+
+        try {
+            const submitBtn = profileForm.querySelector('button[type="submit"]');
+            submitBtn.disabled = true;
+            submitBtn.textContent = 'Saving...';
+
+            await API.call('/api/user/profile', {
+                method: 'PUT',
+                body: JSON.stringify({
+                    display_name: data.display_name
+                })
+            });
+
+            showSuccess('profile-message', 'Display name updated successfully!');
+            submitBtn.disabled = false;
+            submitBtn.textContent = 'Save Display Name';
+
+            // Reload settings to show updated info
+            await loadSettings();
+        } catch (error) {
+            const submitBtn = profileForm.querySelector('button[type="submit"]');
+            submitBtn.disabled = false;
+            submitBtn.textContent = 'Save Display Name';
+            showError('profile-error', error.message);
+        }
+    });
+}
+
+// Copy invite code
+const copyCodeBtn = document.getElementById('copy-code-btn');
+if (copyCodeBtn) {
+    copyCodeBtn.addEventListener('click', () => {
+        const code = document.getElementById('invite-code-display').textContent;
+        navigator.clipboard.writeText(code).then(() => {
+            copyCodeBtn.textContent = 'Copied!';
+            setTimeout(() => {
+                copyCodeBtn.textContent = 'Copy Code';
+            }, 2000);
+        });
+    });
+}
+
+// Settings form (owner only)
+const settingsForm = document.getElementById('settings-form');
+if (settingsForm) {
+    settingsForm.addEventListener('submit', async (e) => {
+        e.preventDefault();
+
+        const formData = new FormData(settingsForm);
+        const data = Object.fromEntries(formData);
+
+        try {
+            const submitBtn = settingsForm.querySelector('button[type="submit"]');
+            submitBtn.disabled = true;
+            submitBtn.textContent = 'Saving...';
+
+            await API.call('/api/table/settings', {
+                method: 'PUT',
+                body: JSON.stringify({
+                    name: data.table_name,
+                    prompt_time: data.prompt_time,
+                    timezone: data.timezone,
+                    max_members: data.max_members ? parseInt(data.max_members, 10) : undefined
+                })
+            });
+
+            showSuccess('settings-message', 'Settings saved successfully!');
+            submitBtn.disabled = false;
+            submitBtn.textContent = 'Save Changes';
+
+            // Reload settings
+            await loadSettings();
+        } catch (error) {
+            const submitBtn = settingsForm.querySelector('button[type="submit"]');
+            submitBtn.disabled = false;
+            submitBtn.textContent = 'Save Changes';
+            showError('settings-error', error.message);
+        }
+    });
+}
+
+// Initialize
+loadSettings();
+initLogout();
+initTableSwitcher();
@@ -0,0 +1,293 @@
+// Kitchen Table - Table page (today's prompt, responses and polling)
+import { API, showError, formatTimeAgo, formatDate, formatTimeUntilPrompt, getUserPillClass, escapeHtml, getBootstrapData } from './core.js';
+import { initLogout, initTableSwitcher } from './header.js';
+
+let pollInterval;
+let currentPromptData = null;
+// Where the loaded responses end: later pages and polls continue from here
+let responsePage = { cursor: null, hasMore: false };
+
+async function loadTodayPrompt(initialData) {
+    try {
+        const data = initialData || await API.call('/api/prompt/today');
+        currentPromptData = data;
+
+        // Determine if we're before or after today's prompt time
+        const isBeforePromptTime = data.seconds_until_next_prompt > 0 && data.seconds_until_next_prompt < 86400;
+
+        // Update date label - show YESTERDAY if we're before prompt time
+        document.getElementById('date-label').textContent = isBeforePromptTime ? 'YESTERDAY' : 'TODAY';
+        document.getElementById('date-value').textContent = formatDate(data.date);
+
+        // Show countdown if before prompt time
+        if (isBeforePromptTime) {
+            const timeUntil = document.getElementById('time-until-prompt');
+            timeUntil.textContent = formatTimeUntilPrompt(data.seconds_until_next_prompt);
+            timeUntil.style.display = 'block';
+        } else {
+            // Hide countdown after prompt time
+            const timeUntil = document.getElementById('time-until-prompt');
+            if (timeUntil) {
+                timeUntil.style.display = 'none';
+            }
+        }
+
+        // Update prompt
+        document.getElementById('prompt-text').textContent = data.prompt.prompt_text;
+
+        // Update history link
+        const historyDate = new Date(data.date);
+        historyDate.setDate(historyDate.getDate() - 1);
+        const historyLink = document.getElementById('history-link');
+        historyLink.href = `/table/history?date=${historyDate.toISOString().split('T')[0]}`;
+        historyLink.textContent = `← ${formatDate(historyDate.toISOString().split('T')[0])}`;
+
+        // Update response section
+        const responseSection = document.getElementById('response-section');
+
+        if (data.user_response) {
+            // User has responded - show the first page of responses
+            responsePage = { cursor: data.prompt.next_cursor, hasMore: data.prompt.has_more };
+            renderResponses(data.prompt.responses, data.user_response.user_id, data.prompt.is_editable);
+            startPolling();
+        } else {
+            // Show response form with count
+            renderResponseForm(data.prompt.response_count);
+        }
+    } catch (error) {
+        console.error('Error loading prompt:', error);
+        showError('error-message', error.message);
+    }
+}
+
+function renderResponseForm(responseCount) {
+    const responseSection = document.getElementById('response-section');
+
+    let countHTML = '';
+    if (responseCount > 0) {
+        const plural = responseCount === 1 ? 'person has' : 'people have';
+        countHTML = `<div style="text-align: center; margin-bottom: 1rem; color: var(--text-secondary); font-size: 0.95rem;">${responseCount} ${plural} answered today</div>`;
+    }
+
+    responseSection.innerHTML = countHTML + `
+        <div class="response-form">
+            <textarea 
+                id="response-textarea" 
+                class="response-textarea" 
+                placeholder="Share your answer..." 
+                maxlength="500"
+            ></textarea>
+            <div id="char-count" class="char-count">0 / 500</div>
+            <div id="form-error" class="error-message"></div>
+            <button id="submit-response-btn" class="btn btn-primary">Share your answer</button>
+        </div>
+    `;
+
+    const textarea = document.getElementById('response-textarea');
+    const charCount = document.getElementById('char-count');
+    const submitBtn = document.getElementById('submit-response-btn');
+
+    textarea.addEventListener('input', () => {
+        const length = textarea.value.length;
+        charCount.textContent = `${length} / 500`;
+
+        if (length > 450) {
+            charCount.classList.add('warning');
+        } else {
+            charCount.classList.remove('warning');
+        }
+
+        if (length === 500) {
+            charCount.classList.add('error');
+        } else {
+            charCount.classList.remove('error');
+        }
+    });
+
+    submitBtn.addEventListener('click', async () => {
+        const response = textarea.value.trim();
+
+        if (!response) {
+            showError('form-error', 'Please enter a response');
+            return;
+        }
+
+        try {
+            submitBtn.disabled = true;
+            submitBtn.textContent = 'Sharing...';
+
+            const data = await API.call('/api/response/submit', {
+                method: 'POST',
+                body: JSON.stringify({ response })
+            });
+
+            await loadTodayPrompt();
+        } catch (error) {
+            submitBtn.disabled = false;
+            submitBtn.textContent = 'Share your answer';
+            showError('form-error', error.message);
+        }
+    });
+}
+
+function renderResponses(responses, currentUserId, isEditable) {
+    const responseSection = document.getElementById('response-section');
+
+    if (!responses || responses.length === 0) {
+        responseSection.innerHTML = `
+            <div class="empty-state">
+                <div class="empty-state-icon">☕</div>
+                <p>You're the first one here today!</p>
+            </div>
+        `;
+        return;
+    }
+
+    responseSection.innerHTML = `
+        <div class="responses-container"></div>
+        <button id="more-responses-btn" class="btn btn-secondary" style="display: none; width: 100%; margin-top: 1rem;">Show more</button>
+    `;
+    document.getElementById('more-responses-btn').addEventListener('click', loadMoreResponses);
+    appendResponses(responses, currentUserId, isEditable);
+}
+
+function responseCardHTML(r, currentUserId, isEditable) {
+    const isCurrentUser = r.user_id === currentUserId;
+    const pillClass = getUserPillClass(r.user_id);
+    const editedLabel = r.edited_at ? ' <span style="font-size: 0.75rem; opacity: 0.7;">(edited)</span>' : '';
+    const editButton = isCurrentUser && isEditable ? 
+        `<button class="edit-response-btn" data-response-id="${r.id}" data-prompt-id="${currentPromptData.prompt.id}" style="background: none; border: none; color: var(--text-secondary); cursor: pointer; font-size: 0.85rem; padding: 0.25rem 0.5rem;">✏️ Edit</button>` : '';
+
+    return `
+        <div class="response-card" data-response-id="${r.id}">
+            <div class="response-header">
+                <div style="display: flex; align-items: center; gap: 0.5rem;">
+                    ${isCurrentUser 
+                        ? `<span class="response-author you">You</span>`
+                        : `<span class="response-author pill ${pillClass}">${escapeHtml(r.display_name)}</span>`
+                    }
+                    ${editButton}
+                </div>
+                <span class="response-time">${formatTimeAgo(r.created_at)}${editedLabel}</span>
+            </div>
+            <p class="response-text" data-original-text="${escapeHtml(r.response_text)}">${escapeHtml(r.response_text)}</p>
+        </div>
+    `;
+}
+
+function appendResponses(responses, currentUserId, isEditable) {
+    const container = document.querySelector('.responses-container');
+    const moreBtn = document.getElementById('more-responses-btn');
+    if (!container) return;
+
+    const cards = document.createElement('div');
+    cards.innerHTML = responses.map(r => responseCardHTML(r, currentUserId, isEditable)).join('');
+    moreBtn.style.display = responsePage.hasMore ? 'block' : 'none';
+
+    // Add edit functionality
+    cards.querySelectorAll('.edit-response-btn').forEach(btn => {
+        btn.addEventListener('click', (e) => {
+            const responseCard = e.target.closest('.response-card');
+            const responseText = responseCard.querySelector('.response-text');
+            const originalText = responseText.dataset.originalText;
+            const promptId = e.target.dataset.promptId;
+
+            // Replace text with textarea
+            responseText.innerHTML = `
+                <textarea class="response-textarea" style="width: 100%; min-height: 80px;">${originalText}</textarea>
+                <div style="display: flex; gap: 0.5rem; margin-top: 0.5rem;">
+                    <button class="btn btn-primary btn-small save-edit-btn">Save</button>
+                    <button class="btn btn-secondary btn-small cancel-edit-btn">Cancel</button>
+                </div>
+            `;
+
+            const saveBtn = responseText.querySelector('.save-edit-btn');
+            const cancelBtn = responseText.querySelector('.cancel-edit-btn');
+            const textarea = responseText.querySelector('textarea');
+
+            cancelBtn.addEventListener('click', () => {
+                responseText.innerHTML = escapeHtml(originalText);
+            });
+
+            saveBtn.addEventListener('click', async () => {
+                const newText = textarea.value.trim();
+                if (!newText) {
+                    alert('Response cannot be empty');
+                    return;
+                }
+
+                try {
+                    saveBtn.disabled = true;
+                    saveBtn.textContent = 'Saving...';
+
+                    await API.call('/api/response/edit', {
+                        method: 'PUT',
+                        body: JSON.stringify({
+                            prompt_id: promptId,
+                            response: newText
+                        })
+                    });
+
+                    await loadTodayPrompt();
+                } catch (error) {
+                    alert(error.message);
+                    saveBtn.disabled = false;
+                    saveBtn.textContent = 'Save';
+                }
+            });
+        });
+    });
+
+    container.append(...cards.children);
+}
+
+async function loadMoreResponses() {
+    const moreBtn = document.getElementById('more-responses-btn');
+    try {
+        moreBtn.disabled = true;
+        const params = new URLSearchParams({ prompt_id: currentPromptData.prompt.id, after: responsePage.cursor });
+        const data = await API.call(`/api/response/list?${params}`);
+        responsePage = { cursor: data.next_cursor, hasMore: data.has_more };
+        appendResponses(data.responses, currentPromptData.user_response.user_id, currentPromptData.prompt.is_editable);
+    } catch (error) {
+        showError('error-message', error.message);
+    } finally {
+        moreBtn.disabled = false;
+    }
+}
+
+async function pollForNewResponses() {
+    // Until everything is loaded, new responses come in through "Show more"
+    if (responsePage.hasMore) return;
+
+    try {
+        const params = responsePage.cursor ? `?after=${encodeURIComponent(responsePage.cursor)}` : '';
+        const data = await API.call(`/api/response/poll${params}`);
+
+        if (data.prompt_id !== currentPromptData.prompt.id) {
+            // A new day's prompt opened
+            await loadTodayPrompt();
+        } else if (data.responses.length > 0) {
+            if (!document.querySelector('.responses-container')) {
+                // Replaces the "first one here" message
+                await loadTodayPrompt();
+                return;
+            }
+            responsePage = { cursor: data.next_cursor, hasMore: data.has_more };
+            appendResponses(data.responses, currentPromptData.user_response.user_id, currentPromptData.prompt.is_editable);
+        }
+    } catch (error) {
+        console.error('Poll error:', error);
+    }
+}
+
+function startPolling() {
+    if (pollInterval) clearInterval(pollInterval);
+    pollInterval = setInterval(pollForNewResponses, 30000);
+}
+
+// First render uses the data embedded in the page
+const bootstrap = getBootstrapData();
+loadTodayPrompt(bootstrap && bootstrap.today);
+initLogout();
+initTableSwitcher();
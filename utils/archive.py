@@ -0,0 +1,169 @@
+import os
+import logging
+from datetime import timedelta
+from contextlib import contextmanager
+from config import Config
+from utils.db import get_db, shard_for, all_shards
+from utils.prompts import utc_now
+
+logger = logging.getLogger(__name__)
+
+# Same columns as the hot tables, without foreign keys (users stay in the hot file)
+ARCHIVE_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS archive.prompts (
+        id INTEGER PRIMARY KEY,
+        table_id INTEGER NOT NULL,
+        prompt_text TEXT NOT NULL,
+        prompt_date DATE NOT NULL,
+        is_custom INTEGER DEFAULT 0,
+        editable_from TIMESTAMP,
+        editable_until TIMESTAMP,
+        created_at TIMESTAMP,
+        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS archive.responses (
+        id INTEGER PRIMARY KEY,
+        prompt_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        response_text TEXT NOT NULL,
+        created_at TIMESTAMP,
+        edited_at TIMESTAMP
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS archive.idx_archive_prompts_date ON prompts(table_id, prompt_date)',
+    'CREATE INDEX IF NOT EXISTS archive.idx_archive_responses_prompt ON responses(prompt_id)',
+    'CREATE INDEX IF NOT EXISTS archive.idx_archive_responses_user ON responses(user_id)',
+]
+
+PROMPT_COLUMNS = 'id, table_id, prompt_text, prompt_date, is_custom, editable_from, editable_until, created_at'
+RESPONSE_COLUMNS = 'id, prompt_id, user_id, response_text, created_at, edited_at'
+
+def attach_archive(conn, path=None):
+    """ATTACH the archive file as `archive` (must be outside a transaction)"""
+    conn.execute('ATTACH DATABASE ? AS archive', (path or Config.ARCHIVE_DATABASE_PATH,))
+    for statement in ARCHIVE_SCHEMA:
+        conn.execute(statement)
+
+@contextmanager
+def archive_context(path=None, shard=0):
+    """Connection with the archive attached, for rare lookups, exports and deletes"""
+    conn = get_db(shard=shard)
+    try:
+        attach_archive(conn, path)
+        yield conn
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Archive database error: {str(e)}")
+        raise
+    finally:
+        conn.close()
+
+def archive_old_prompts(days=None, batch_size=None, path=None):
+    """Move prompts (and their responses) older than `days` into the archive file.
+
+    Each batch is copied in one transaction and deleted from the hot file in a
+    second one. WAL mode doesn't make a transaction atomic across attached
+    files, so this order means a crash can leave rows in both files (the next
+    run finishes the job) but never in neither.
+    """
+    days = days or Config.ARCHIVE_AFTER_DAYS
+    batch_size = batch_size or Config.ARCHIVE_BATCH_SIZE
+    cutoff = (utc_now().date() - timedelta(days=days)).isoformat()
+
+    moved_prompts = moved_responses = 0
+    for shard in all_shards():
+        prompts, responses = archive_shard(shard, cutoff, batch_size, path)
+        moved_prompts += prompts
+        moved_responses += responses
+
+    logger.info(f"Archived {moved_prompts} prompts and {moved_responses} responses from before {cutoff}")
+    return moved_prompts, moved_responses
+
+def archive_shard(shard, cutoff, batch_size, path=None):
+    """Move one shard's prompts from before `cutoff` in batches (see archive_old_prompts)"""
+    conn = get_db(shard=shard)
+    # Transactions are managed explicitly below
+    conn.isolation_level = None
+    moved_prompts = moved_responses = 0
+    try:
+        attach_archive(conn, path)
+        while True:
+            ids = [row['id'] for row in conn.execute(
+                'SELECT id FROM prompts WHERE prompt_date < ? ORDER BY id LIMIT ?',
+                (cutoff, batch_size)
+            )]
+            if not ids:
+                break
+            placeholders = ','.join('?' * len(ids))
+
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(f'''
+                INSERT OR IGNORE INTO archive.prompts ({PROMPT_COLUMNS})
+                SELECT {PROMPT_COLUMNS} FROM main.prompts WHERE id IN ({placeholders})
+            ''', ids)
+            conn.execute(f'''
+                INSERT OR IGNORE INTO archive.responses ({RESPONSE_COLUMNS})
+                SELECT {RESPONSE_COLUMNS} FROM main.responses WHERE prompt_id IN ({placeholders})
+            ''', ids)
+            conn.execute('COMMIT')
+
+            conn.execute('BEGIN IMMEDIATE')
+            moved_responses += conn.execute(
+                f'DELETE FROM main.responses WHERE prompt_id IN ({placeholders})', ids
+            ).rowcount
+            moved_prompts += conn.execute(
+                f'DELETE FROM main.prompts WHERE id IN ({placeholders})', ids
+            ).rowcount
+            conn.execute('COMMIT')
+    except Exception:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+
+    return moved_prompts, moved_responses
+
+def get_archived_prompt(table_id, prompt_date):
+    """Archived prompt and its responses for a date, or None"""
+    if not os.path.exists(Config.ARCHIVE_DATABASE_PATH):
+        return None
+    # The shard has the member display names
+    with archive_context(shard=shard_for(table_id)) as conn:
+        prompt = conn.execute(
+            'SELECT * FROM archive.prompts WHERE table_id = ? AND prompt_date = ?',
+            (table_id, str(prompt_date))
+        ).fetchone()
+        if not prompt:
+            return None
+        responses = conn.execute('''
+            SELECT r.*, tm.display_name, u.username
+            FROM archive.responses r
+            JOIN users u ON r.user_id = u.id
+            LEFT JOIN table_members tm ON tm.user_id = r.user_id AND tm.table_id = ?
+            WHERE r.prompt_id = ?
+            ORDER BY r.created_at ASC
+        ''', (table_id, prompt['id'])).fetchall()
+        return {'prompt': prompt, 'responses': responses}
+
+def delete_archived_responses(user_id):
+    """Remove a user's archived responses (account deletion)"""
+    if not os.path.exists(Config.ARCHIVE_DATABASE_PATH):
+        return 0
+    with archive_context() as conn:
+        return conn.execute('DELETE FROM archive.responses WHERE user_id = ?', (user_id,)).rowcount
+
+def delete_archived_table(table_id):
+    """Remove a table's archived prompts and responses (table deletion)"""
+    if not os.path.exists(Config.ARCHIVE_DATABASE_PATH):
+        return 0
+    with archive_context() as conn:
+        conn.execute('''
+            DELETE FROM archive.responses
+            WHERE prompt_id IN (SELECT id FROM archive.prompts WHERE table_id = ?)
+        ''', (table_id,))
+        return conn.execute('DELETE FROM archive.prompts WHERE table_id = ?', (table_id,)).rowcount
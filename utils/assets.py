@@ -0,0 +1,74 @@
+import os
+import json
+import mimetypes
+import logging
+from flask import request, send_from_directory, abort
+from werkzeug.security import safe_join
+from utils.singleflight import singleflight
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+
+# Fingerprinted files never change, so browsers can keep them for a year
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Precompressed variants written by scripts/build_assets.py, in preference order
+PRECOMPRESSED = [('br', '.br'), ('gzip', '.gz')]
+
+_manifest = {}
+_manifest_mtime = None
+
+def load_manifest():
+    """Load the asset manifest, re-reading it only when the file changes"""
+    global _manifest, _manifest_mtime
+    try:
+        mtime = os.path.getmtime(MANIFEST_PATH)
+    except OSError:
+        # No build has been run, serve the raw sources
+        _manifest, _manifest_mtime = {}, None
+        return _manifest
+
+    if mtime != _manifest_mtime:
+        # After a deploy every worker thread notices at once; read the file once
+        singleflight(('manifest', mtime), _read_manifest, mtime)
+    return _manifest
+
+def _read_manifest(mtime):
+    global _manifest, _manifest_mtime
+    try:
+        with open(MANIFEST_PATH, 'r') as f:
+            _manifest = json.load(f)
+        _manifest_mtime = mtime
+    except Exception as e:
+        logger.error(f"Error loading asset manifest: {str(e)}")
+        _manifest = {}
+
+def asset_url(path):
+    """URL for a static asset, using the fingerprinted build when available"""
+    built = load_manifest().get(path)
+    if built:
+        return f'/static/dist/{built}'
+    return f'/static/{path}'
+
+def send_asset(filename):
+    """Serve a fingerprinted asset, preferring a precompressed variant"""
+    path = safe_join(DIST_DIR, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    encoding = None
+    for coding, suffix in PRECOMPRESSED:
+        if request.accept_encodings[coding] > 0 and os.path.isfile(path + suffix):
+            encoding, filename = coding, filename + suffix
+            break
+
+    response = send_from_directory(DIST_DIR, filename, max_age=31536000)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+        response.mimetype = mimetypes.guess_type(path)[0]
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
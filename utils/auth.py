@@ -7,6 +7,8 @@ from functools import wraps
 from flask import request, jsonify
 from config import Config
 from utils.db import get_db_context, dict_from_row
+from utils.presence import note_active
+from utils.cache import cached, cache_key
 
 logger = logging.getLogger(__name__)
 
@@ -49,22 +51,25 @@ def get_current_user():
     if not user_id:
         return None
     
+    # Cached per worker (last_active in it goes stale; the other columns are
+    # invalidated by the writes in models/user.py)
+    user = cached(cache_key('user', user_id), load_user, user_id)
+    if user:
+        # Throttled in memory, so most requests don't queue a write
+        note_active(user_id)
+        return dict(user)
+    return None
+
+def load_user(user_id):
+    """A live user's row as a dict, or None"""
     try:
-        with get_db_context() as conn:
+        with get_db_context(query_only=True) as conn:
             cursor = conn.execute(
-                'SELECT * FROM users WHERE id = ?',
+                'SELECT * FROM users WHERE id = ? AND deleted_at IS NULL',
                 (user_id,)
             )
             user = cursor.fetchone()
-            
-            if user:
-                # Update last active
-                conn.execute(
-                    'UPDATE users SET last_active = CURRENT_TIMESTAMP WHERE id = ?',
-                    (user_id,)
-                )
-                return dict_from_row(user)
-            return None
+            return dict_from_row(user) if user else None
     except Exception as e:
         logger.error(f"Error getting current user: {str(e)}")
         return None
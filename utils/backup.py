@@ -0,0 +1,467 @@
+import os
+import gzip
+import json
+import time
+import fcntl
+import shutil
+import struct
+import sqlite3
+import hashlib
+import logging
+import tempfile
+from datetime import datetime
+from contextlib import contextmanager
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+LOCK_NAME = 'manifest.lock'
+WAL_HEADER_SIZE = 32
+WAL_FRAME_HEADER_SIZE = 24
+WAL_MAGIC = (0x377f0682, 0x377f0683)
+
+def file_sha256(path):
+    """SHA-256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def write_checksum(path):
+    """Write a sha256sum-compatible sidecar next to a backup file"""
+    checksum = file_sha256(path)
+    with open(path + '.sha256', 'w') as f:
+        f.write(f"{checksum}  {os.path.basename(path)}\n")
+    return checksum
+
+def check_checksum(path):
+    """Compare a backup file against its .sha256 sidecar"""
+    try:
+        with open(path + '.sha256', 'r') as f:
+            expected = f.read().split()[0]
+    except (OSError, IndexError):
+        return False
+    return file_sha256(path) == expected
+
+def load_manifest(backup_dir):
+    """Load the snapshot/segment manifest for a backup directory"""
+    try:
+        with open(os.path.join(backup_dir, MANIFEST_NAME), 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'snapshots': []}
+
+@contextmanager
+def manifest_lock(backup_dir, blocking=True):
+    """Hold a backup directory's lock while reading and updating its manifest.
+
+    Yields False instead of waiting when blocking is off and someone else has it.
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    with open(os.path.join(backup_dir, LOCK_NAME), 'a') as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def backup_dir_for(shard, root=None):
+    """Backup directory of a shard's file: BACKUP_DIR for the core, BACKUP_DIR/shard<n> otherwise"""
+    root = root or Config.BACKUP_DIR
+    if shard == 0:
+        return root
+    return os.path.join(root, f'shard{shard}')
+
+def save_manifest(backup_dir, manifest):
+    """Atomically replace the manifest"""
+    path = os.path.join(backup_dir, MANIFEST_NAME)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+def wal_checksum(data, s0, s1, big_endian):
+    """SQLite's WAL checksum over data (a multiple of 8 bytes)"""
+    words = struct.unpack(('>' if big_endian else '<') + f'{len(data) // 4}I', data)
+    for i in range(0, len(words), 2):
+        s0 = (s0 + words[i] + s1) & 0xFFFFFFFF
+        s1 = (s1 + words[i + 1] + s0) & 0xFFFFFFFF
+    return s0, s1
+
+def read_wal_header(wal_path):
+    """Parse the WAL header, or None if the WAL is missing, empty or invalid"""
+    try:
+        with open(wal_path, 'rb') as f:
+            header = f.read(WAL_HEADER_SIZE)
+    except FileNotFoundError:
+        return None
+    if len(header) < WAL_HEADER_SIZE:
+        return None
+
+    magic, _, page_size, checkpoint_seq, salt1, salt2, c1, c2 = struct.unpack('>8I', header)
+    if magic not in WAL_MAGIC:
+        return None
+    big_endian = bool(magic & 1)
+    if wal_checksum(header[:24], 0, 0, big_endian) != (c1, c2):
+        return None
+
+    return {
+        'page_size': page_size,
+        'checkpoint_seq': checkpoint_seq,
+        'salt1': salt1,
+        'salt2': salt2,
+        'big_endian': big_endian,
+        'checksum': (c1, c2)
+    }
+
+def read_wal_frames(wal_path, header):
+    """Valid, committed frames of the current WAL generation as raw bytes"""
+    frame_size = WAL_FRAME_HEADER_SIZE + header['page_size']
+    s0, s1 = header['checksum']
+    frames = []
+    committed = 0
+
+    with open(wal_path, 'rb') as f:
+        f.seek(WAL_HEADER_SIZE)
+        while True:
+            frame = f.read(frame_size)
+            if len(frame) < frame_size:
+                break
+            pgno, commit, salt1, salt2, c1, c2 = struct.unpack('>6I', frame[:WAL_FRAME_HEADER_SIZE])
+            if (salt1, salt2) != (header['salt1'], header['salt2']):
+                break
+            s0, s1 = wal_checksum(frame[:8] + frame[WAL_FRAME_HEADER_SIZE:], s0, s1, header['big_endian'])
+            if (s0, s1) != (c1, c2):
+                break
+            frames.append(frame)
+            if commit:
+                committed = len(frames)
+
+    # Frames after the last commit belong to an unfinished transaction
+    return frames[:committed]
+
+def wal_generation(header):
+    """Identify a WAL generation; salts change every time the WAL restarts"""
+    return [header['salt1'], header['salt2']] if header else None
+
+def gzip_file(source, destination):
+    """Compress a file in chunks"""
+    with open(source, 'rb') as src, gzip.open(destination, 'wb', compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+
+def gunzip_file(source, destination):
+    """Decompress a file in chunks"""
+    with gzip.open(source, 'rb') as src, open(destination, 'wb') as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+
+def create_snapshot(backup_dir, db_path=None, scheduled=True):
+    """Take a consistent, compressed, checksummed snapshot of a live database.
+
+    Only scheduled snapshots count towards BACKUP_KEEP; the ones archive_wal
+    takes when the WAL chain breaks are pruned along with the scheduled
+    snapshot before them.
+    """
+    db_path = db_path or Config.DATABASE_PATH
+    # Held throughout, so the checkpointer doesn't restart the WAL mid-copy
+    with manifest_lock(backup_dir):
+        return _create_snapshot(backup_dir, db_path, scheduled)
+
+class BackupRestarting(Exception):
+    """Raised from the online backup's progress callback to stop copying in steps"""
+
+def _create_snapshot(backup_dir, db_path, scheduled):
+    os.makedirs(backup_dir, exist_ok=True)
+    wal_path = db_path + '-wal'
+
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    name = f"kitchen_table_{stamp}.db.gz"
+    count = 1
+    while os.path.exists(os.path.join(backup_dir, name)):
+        # A fallback snapshot can follow a scheduled one within the same second
+        count += 1
+        name = f"kitchen_table_{stamp}_{count}.db.gz"
+    generation = wal_generation(read_wal_header(wal_path))
+
+    progress = {'remaining': None, 'restarts': 0}
+
+    def pause(status, remaining, total):
+        # A write from another connection restarts the copy from the first page
+        if progress['remaining'] is not None and remaining > progress['remaining']:
+            progress['restarts'] += 1
+            if progress['restarts'] > Config.BACKUP_MAX_RESTARTS:
+                raise BackupRestarting()
+        progress['remaining'] = remaining
+        # Yield between steps so app writers aren't stalled
+        time.sleep(Config.BACKUP_STEP_SLEEP)
+
+    started = time.time()
+    fd, tmp_path = tempfile.mkstemp(suffix='.db', dir=backup_dir)
+    os.close(fd)
+    try:
+        source = sqlite3.connect(db_path)
+        target = sqlite3.connect(tmp_path)
+        try:
+            try:
+                source.backup(target, pages=Config.BACKUP_STEP_PAGES, progress=pause)
+            except BackupRestarting:
+                # Too busy to finish in steps (while the manifest lock holds off
+                # checkpoints); copy in one read transaction, which WAL writers don't wait on
+                logger.warning(f"Online backup of {db_path} restarted {progress['restarts']} times, "
+                               f"copying it in one step")
+                source.backup(target)
+        finally:
+            target.close()
+            source.close()
+
+        gzip_file(tmp_path, os.path.join(backup_dir, name))
+    finally:
+        os.remove(tmp_path)
+
+    checksum = write_checksum(os.path.join(backup_dir, name))
+
+    # The WAL chain is only continuous if the WAL didn't restart (or appear) during the backup
+    header = read_wal_header(wal_path)
+    manifest = load_manifest(backup_dir)
+    manifest['snapshots'].append({
+        'name': name,
+        'sha256': checksum,
+        'created_at': datetime.now().isoformat(),
+        'scheduled': scheduled,
+        'database': os.path.abspath(db_path),
+        'wal': {
+            'generation': generation,
+            'page_size': header['page_size'] if header else None,
+            'next_frame': 0,
+            'continuous': generation == wal_generation(header),
+            # With no WAL during the copy, the next one holds nothing the snapshot lacks
+            'sealed': generation is None and header is None
+        },
+        'segments': []
+    })
+    prune_snapshots(backup_dir, manifest)
+    save_manifest(backup_dir, manifest)
+
+    logger.info(f"Snapshot {name} written in {time.time() - started:.1f}s ({progress['restarts']} restarts)")
+    return name
+
+def same_database(snapshot, db_path):
+    """Whether a snapshot is of db_path (snapshots from before this was recorded are assumed to be)"""
+    return snapshot.get('database', os.path.abspath(db_path)) == os.path.abspath(db_path)
+
+# _archive_frames result when frames were lost to a WAL restart
+CHAIN_BROKEN = object()
+
+def archive_wal(backup_dir, db_path=None):
+    """Archive WAL frames committed since the last run, or snapshot if the chain broke"""
+    db_path = db_path or Config.DATABASE_PATH
+    with manifest_lock(backup_dir):
+        manifest = load_manifest(backup_dir)
+        if manifest['snapshots'] and not same_database(manifest['snapshots'][-1], db_path):
+            raise ValueError(f"{backup_dir} holds backups of {manifest['snapshots'][-1]['database']}, not {db_path}")
+        if not manifest['snapshots']:
+            logger.info("No snapshot yet, taking a full snapshot")
+            return _create_snapshot(backup_dir, db_path, scheduled=False)
+
+        # Hold the write lock so the WAL can't grow or restart while it is read
+        conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                result = _archive_frames(backup_dir, db_path, manifest)
+            finally:
+                conn.execute('COMMIT')
+        finally:
+            conn.close()
+
+        if result is CHAIN_BROKEN:
+            logger.info("WAL restarted before its frames were archived, taking a full snapshot")
+            return _create_snapshot(backup_dir, db_path, scheduled=False)
+        return result
+
+def checkpoint_archived(backup_dir, db_path, checkpoint):
+    """Archive new WAL frames, then checkpoint before anything else can be written.
+
+    For the app's checkpointer when BACKUP_WAL_ARCHIVE turns autocheckpoint
+    off: every frame a checkpoint backfills has been archived first, so the
+    restart that follows a complete checkpoint doesn't break the chain and
+    archive_wal carries on with the same snapshot. `checkpoint()` runs a
+    PASSIVE checkpoint on its own connection, which proceeds while the write
+    lock is held here. Returns its (busy, log, checkpointed), or None if a
+    snapshot holds the manifest lock (it then waits for the next interval).
+    """
+    if not os.path.isdir(backup_dir):
+        # Backups were never set up here
+        return checkpoint()
+    with manifest_lock(backup_dir, blocking=False) as locked:
+        if not locked:
+            return None
+        manifest = load_manifest(backup_dir)
+        if manifest['snapshots'] and not same_database(manifest['snapshots'][-1], db_path):
+            # e.g. a script pointed at a scratch database; leave the real chain alone
+            return checkpoint()
+
+        conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                result = _archive_frames(backup_dir, db_path, manifest) if manifest['snapshots'] else None
+                busy, log_frames, checkpointed = checkpoint()
+                if result is CHAIN_BROKEN:
+                    # Left to the next archive_wal run, which takes a snapshot outside the app
+                    logger.warning(f"WAL archive chain of {db_path} is broken, the next wal run takes a snapshot")
+                elif manifest['snapshots']:
+                    wal = manifest['snapshots'][-1]['wal']
+                    header = read_wal_header(db_path + '-wal')
+                    if header and not busy and log_frames == checkpointed == wal['next_frame']:
+                        # Everything in this WAL is archived and backfilled; it may restart now
+                        wal['sealed'] = True
+                        wal['sealed_seq'] = header['checkpoint_seq']
+                        save_manifest(backup_dir, manifest)
+            finally:
+                conn.execute('COMMIT')
+        finally:
+            conn.close()
+    return busy, log_frames, checkpointed
+
+def _archive_frames(backup_dir, db_path, manifest):
+    """Archive new frames of the latest snapshot's chain (manifest and write locks held).
+
+    Returns the segment name, None if there is nothing new, or CHAIN_BROKEN.
+    """
+    snapshot = manifest['snapshots'][-1]
+    wal = snapshot['wal']
+    header = read_wal_header(db_path + '-wal')
+    if not header:
+        logger.info("WAL is empty, nothing to archive")
+        return None
+
+    generation = wal_generation(header)
+    if not wal['continuous']:
+        return CHAIN_BROKEN
+    if generation != wal['generation']:
+        if not wal.get('sealed'):
+            return CHAIN_BROKEN
+        if wal.get('sealed_seq') is not None and header['checkpoint_seq'] != wal['sealed_seq'] + 1:
+            # It restarted more than once since the seal, so a whole WAL went unarchived
+            return CHAIN_BROKEN
+        # The previous WAL was fully archived before the checkpoint that let it
+        # restart, so the chain carries on from the start of this one
+        wal['generation'] = generation
+        wal['next_frame'] = 0
+        wal['sealed'] = False
+        wal['sealed_seq'] = None
+        save_manifest(backup_dir, manifest)
+
+    frames = read_wal_frames(db_path + '-wal', header)
+    new_frames = frames[wal['next_frame']:]
+    if not new_frames:
+        logger.info("No new WAL frames to archive")
+        return None
+
+    name = f"{snapshot['name'][:-len('.db.gz')]}.wal{len(snapshot['segments']) + 1:06d}.gz"
+    path = os.path.join(backup_dir, name)
+    with gzip.open(path, 'wb', compresslevel=6) as f:
+        for frame in new_frames:
+            f.write(frame)
+
+    snapshot['segments'].append({
+        'name': name,
+        'sha256': write_checksum(path),
+        'generation': generation,
+        'first_frame': wal['next_frame'],
+        'frames': len(new_frames)
+    })
+    wal['next_frame'] += len(new_frames)
+    wal['page_size'] = header['page_size']
+    wal['sealed'] = False
+    wal['sealed_seq'] = None
+    save_manifest(backup_dir, manifest)
+
+    logger.info(f"Archived {len(new_frames)} WAL frames to {name}")
+    return name
+
+def prune_snapshots(backup_dir, manifest):
+    """Keep the last Config.BACKUP_KEEP scheduled snapshots (and anything newer).
+
+    Snapshots archive_wal took after a broken chain don't count; they go with
+    the scheduled snapshot before them. Manifests from before the distinction
+    have no 'scheduled' key and count as scheduled.
+    """
+    scheduled = [i for i, snapshot in enumerate(manifest['snapshots']) if snapshot.get('scheduled', True)]
+    if len(scheduled) <= Config.BACKUP_KEEP:
+        return
+    first_kept = scheduled[-Config.BACKUP_KEEP]
+    for old in manifest['snapshots'][:first_kept]:
+        for name in [old['name']] + [s['name'] for s in old['segments']]:
+            for path in (os.path.join(backup_dir, name), os.path.join(backup_dir, name + '.sha256')):
+                if os.path.exists(path):
+                    os.remove(path)
+        logger.info(f"Pruned snapshot {old['name']}")
+    del manifest['snapshots'][:first_kept]
+
+def find_snapshot(manifest, name=None):
+    """Snapshot entry by name, or the latest one"""
+    if not manifest['snapshots']:
+        return None
+    if name is None:
+        return manifest['snapshots'][-1]
+    return next((s for s in manifest['snapshots'] if s['name'] == name), None)
+
+def apply_segment(db_file, segment_path, page_size):
+    """Replay archived WAL frames onto a database file"""
+    frame_size = WAL_FRAME_HEADER_SIZE + page_size
+    with gzip.open(segment_path, 'rb') as segment:
+        while True:
+            frame = segment.read(frame_size)
+            if len(frame) < frame_size:
+                break
+            pgno, commit = struct.unpack('>2I', frame[:8])
+            db_file.seek((pgno - 1) * page_size)
+            db_file.write(frame[WAL_FRAME_HEADER_SIZE:])
+            if commit:
+                # Commit frames carry the database size in pages
+                db_file.truncate(commit * page_size)
+
+def restore_snapshot(backup_dir, target_path, name=None, segments=None):
+    """Restore a snapshot plus its WAL segments into target_path"""
+    manifest = load_manifest(backup_dir)
+    snapshot = find_snapshot(manifest, name)
+    if not snapshot:
+        raise ValueError(f"Snapshot not found: {name or 'latest'}")
+
+    to_apply = snapshot['segments'] if segments is None else snapshot['segments'][:segments]
+    for entry in [snapshot] + to_apply:
+        if not check_checksum(os.path.join(backup_dir, entry['name'])):
+            raise ValueError(f"Checksum mismatch: {entry['name']}")
+
+    gunzip_file(os.path.join(backup_dir, snapshot['name']), target_path)
+    for stale in (target_path + '-wal', target_path + '-shm'):
+        if os.path.exists(stale):
+            os.remove(stale)
+
+    with open(target_path, 'r+b') as db_file:
+        for segment in to_apply:
+            apply_segment(db_file, os.path.join(backup_dir, segment['name']), snapshot['wal']['page_size'])
+
+    logger.info(f"Restored {snapshot['name']} with {len(to_apply)} WAL segments to {target_path}")
+    return snapshot['name'], len(to_apply)
+
+def verify_snapshot(backup_dir, name=None):
+    """Check a snapshot's checksums and restore it to a temp file for integrity_check"""
+    tmp_dir = tempfile.mkdtemp(dir=backup_dir)
+    try:
+        target = os.path.join(tmp_dir, 'verify.db')
+        snapshot_name, segment_count = restore_snapshot(backup_dir, target, name)
+        conn = sqlite3.connect(target)
+        try:
+            result = conn.execute('PRAGMA integrity_check').fetchone()[0]
+        finally:
+            conn.close()
+        return result == 'ok', f"{snapshot_name} + {segment_count} segments: {result}"
+    finally:
+        shutil.rmtree(tmp_dir)
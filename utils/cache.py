@@ -0,0 +1,172 @@
+import os
+import time
+import logging
+import threading
+from config import Config
+from utils.db import get_db, all_shards
+
+logger = logging.getLogger(__name__)
+
+# In-process read cache shared by a worker's threads, kept coherent across
+# workers through the cache_invalidations table in every database file: a
+# write that changes cached data records the keys it touched, and each worker
+# evicts them the next time it checks. A check is one PRAGMA data_version per
+# file, plus a read of the new rows only when some other connection committed,
+# so stale reads last at most CACHE_CHECK_INTERVAL_MS plus the commit itself.
+
+# Cache metrics for this process
+cache_stats = {
+    'hits': 0,
+    'misses': 0,
+    'evictions': 0,
+    'flushes': 0,
+    'checks': 0,
+    'last_lag_ms': 0.0,
+    'max_lag_ms': 0.0,
+}
+
+_entries = {}
+_lock = threading.Lock()
+_sync_lock = threading.Lock()
+# epoch moves on every eviction, so a value read before one is never stored after it
+_state = {'pid': None, 'epoch': 0, 'checked_at': 0.0, 'pruned_at': 0.0}
+# shard -> [watch connection, last data_version, last seq applied]
+_files = {}
+
+def cache_key(*parts):
+    """Cache key for e.g. ('table', 5): also what cache_invalidations stores"""
+    return ':'.join(str(part) for part in parts)
+
+def cached(key, fn, *args):
+    """fn(*args), from this worker's cache when possible; falsy results aren't kept"""
+    if not Config.CACHE_ENABLED:
+        return fn(*args)
+    sync()
+    with _lock:
+        if key in _entries:
+            cache_stats['hits'] += 1
+            return _entries[key]
+        cache_stats['misses'] += 1
+        epoch = _state['epoch']
+
+    value = fn(*args)
+    if value:
+        with _lock:
+            if _state['epoch'] == epoch:
+                if len(_entries) >= Config.CACHE_MAX_ENTRIES:
+                    # Oldest first (dicts keep insertion order)
+                    del _entries[next(iter(_entries))]
+                _entries[key] = value
+    return value
+
+def invalidate(conn, *keys):
+    """Evict keys everywhere; call inside the write that changes what they cache.
+
+    The keys are evicted here at once and recorded in the same transaction for
+    the other workers. Rows older than CACHE_INVALIDATION_RETENTION are pruned
+    as part of the write now and then.
+    """
+    now = time.time()
+    conn.executemany(
+        'INSERT INTO main.cache_invalidations (cache_key, created_at) VALUES (?, ?)',
+        [(key, now) for key in keys]
+    )
+    if now - _state['pruned_at'] >= Config.CACHE_INVALIDATION_RETENTION:
+        _state['pruned_at'] = now
+        conn.execute('DELETE FROM main.cache_invalidations WHERE created_at < ?',
+                     (now - Config.CACHE_INVALIDATION_RETENTION,))
+    _evict(keys)
+
+def _evict(keys):
+    with _lock:
+        _state['epoch'] += 1
+        for key in keys:
+            if _entries.pop(key, None) is not None:
+                cache_stats['evictions'] += 1
+
+def flush():
+    """Drop everything this worker has cached"""
+    with _lock:
+        _state['epoch'] += 1
+        _entries.clear()
+        cache_stats['flushes'] += 1
+
+def sync():
+    """Apply invalidations other workers committed, at most every CACHE_CHECK_INTERVAL_MS"""
+    now = time.time()
+    with _lock:
+        if _state['pid'] != os.getpid():
+            # Forked: the parent's connections and entries aren't ours
+            _state['pid'] = os.getpid()
+            _files.clear()
+            _entries.clear()
+        if (now - _state['checked_at']) * 1000 < Config.CACHE_CHECK_INTERVAL_MS:
+            return
+        _state['checked_at'] = now
+
+    # One thread checks; the others carry on with what is cached
+    if not _sync_lock.acquire(blocking=False):
+        return
+    try:
+        cache_stats['checks'] += 1
+        for shard in all_shards():
+            try:
+                _sync_file(shard)
+            except Exception as e:
+                # Whatever was missed can't be evicted precisely any more
+                logger.error(f"Cache invalidation check failed on shard {shard}: {str(e)}")
+                _files.pop(shard, None)
+                flush()
+    finally:
+        _sync_lock.release()
+
+def _sync_file(shard):
+    watch = _files.get(shard)
+    if watch is None:
+        conn = get_db(query_only=True, shard=shard)
+        version = conn.execute('PRAGMA main.data_version').fetchone()[0]
+        seq = conn.execute('SELECT COALESCE(MAX(seq), 0) FROM main.cache_invalidations').fetchone()[0]
+        _files[shard] = [conn, version, seq]
+        if _entries:
+            # Entries cached before this file was watched may have missed changes
+            flush()
+        return
+
+    conn, version, last_seq = watch
+    current = conn.execute('PRAGMA main.data_version').fetchone()[0]
+    if current == version:
+        # Nobody else has committed to this file since the last check
+        return
+    watch[1] = current
+
+    rows = conn.execute('''
+        SELECT seq, cache_key, created_at FROM main.cache_invalidations
+        WHERE seq > ? ORDER BY seq
+    ''', (last_seq,)).fetchall()
+    first = rows[0]['seq'] if rows else None
+    if first != last_seq + 1:
+        high = _pruned_past(conn, last_seq)
+        if high:
+            # Idle for longer than the retention: rows this worker never saw are gone
+            flush()
+            watch[2] = high
+    if not rows:
+        return
+
+    watch[2] = rows[-1]['seq']
+    _evict({row['cache_key'] for row in rows})
+    lag = (time.time() - min(row['created_at'] for row in rows)) * 1000
+    cache_stats['last_lag_ms'] = lag
+    cache_stats['max_lag_ms'] = max(cache_stats['max_lag_ms'], lag)
+
+def _pruned_past(conn, last_seq):
+    """The highest seq so far if rows after last_seq were deleted before this worker read them"""
+    row = conn.execute('''
+        SELECT (SELECT seq FROM main.sqlite_sequence WHERE name = 'cache_invalidations') AS high,
+               (SELECT MIN(seq) FROM main.cache_invalidations) AS low
+    ''').fetchone()
+    if row['high'] is None or row['high'] <= last_seq:
+        return None
+    if row['low'] is None or row['low'] > last_seq + 1:
+        return row['high']
+    return None
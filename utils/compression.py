@@ -0,0 +1,56 @@
+import gzip
+import logging
+from flask import request
+from config import Config
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+def compress_body(data, encoding):
+    """Compress a response body with the given content coding"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=Config.COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=Config.COMPRESS_LEVEL, mtime=0)
+
+def choose_encoding():
+    """Best content coding the client accepts, or None"""
+    if brotli and request.accept_encodings['br'] > 0:
+        return 'br'
+    if request.accept_encodings['gzip'] > 0:
+        return 'gzip'
+    return None
+
+def compress_response(response):
+    """after_request hook: compress eligible responses based on Accept-Encoding"""
+    if not Config.COMPRESS_ENABLED:
+        return response
+
+    # Streaming (SSE, send_file) and already-encoded responses pass through untouched
+    if (response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in Config.COMPRESS_MIMETYPES
+            or response.status_code < 200 or response.status_code in (204, 304)):
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    encoding = choose_encoding()
+    if not encoding:
+        return response
+
+    data = response.get_data()
+    if len(data) < Config.COMPRESS_MIN_SIZE:
+        return response
+
+    try:
+        response.set_data(compress_body(data, encoding))
+    except Exception as e:
+        logger.error(f"Error compressing response: {str(e)}")
+        return response
+
+    response.headers['Content-Encoding'] = encoding
+    return response
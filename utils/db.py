@@ -1,24 +1,104 @@
+import os
+import time
 import sqlite3
 import logging
+import threading
+from urllib.parse import quote
 from config import Config
 from contextlib import contextmanager
+from utils.metrics import MeteredConnection
+from utils.backup import backup_dir_for, checkpoint_archived
 
 logger = logging.getLogger(__name__)
 
-def get_db():
+# Connections shared by nested get_db_context calls, per shard (see shared_db_context)
+_local = threading.local()
+
+# Alias the core database is attached under on connections to other shards
+CORE_ALIAS = 'core'
+
+# Each shard allocates row ids from its own range so ids stay unique across shards
+SHARD_ID_STRIDE = 1 << 40
+
+# Per-table data that lives on the table's shard; users, tables and default_prompts stay in the core file
+SHARDED_TABLES = ['prompts', 'responses', 'table_members']
+
+def shard_path(shard):
+    """Database file for a shard; shard 0 is the core database itself"""
+    if shard == 0:
+        return Config.DATABASE_PATH
+    base, ext = os.path.splitext(Config.DATABASE_PATH)
+    return f'{base}.shard{shard}{ext or ".db"}'
+
+def all_shards():
+    return range(Config.DB_SHARDS)
+
+def get_db(query_only=False, shard=0):
     """Get database connection"""
-    conn = sqlite3.connect(Config.DATABASE_PATH, check_same_thread=False)
+    conn = sqlite3.connect(shard_path(shard), check_same_thread=False, uri=True,
+                           factory=MeteredConnection if Config.METRICS_ENABLED else sqlite3.Connection)
     conn.row_factory = sqlite3.Row
     # Enable foreign keys
     conn.execute('PRAGMA foreign_keys = ON')
     # Enable WAL mode for better concurrency
     conn.execute('PRAGMA journal_mode=WAL')
+    apply_profile(conn)
+    if shard:
+        # Unqualified users/tables/default_prompts resolve to the core file. Read-only,
+        # or BEGIN IMMEDIATE would also take core's write lock and serialize every shard
+        core = 'file:' + quote(os.path.abspath(Config.DATABASE_PATH)) + '?mode=ro'
+        conn.execute(f'ATTACH DATABASE ? AS {CORE_ALIAS}', (core,))
+    if query_only:
+        # Writes go through utils.writer; refuse any that slip through
+        conn.execute('PRAGMA query_only = ON')
     return conn
 
+def apply_profile(conn, profile=None):
+    """Apply the PRAGMAs of a named DB profile (Config.DB_PROFILE by default)"""
+    pragmas = Config.DB_PROFILES.get(profile or Config.DB_PROFILE)
+    if pragmas is None:
+        logger.warning(f"Unknown DB profile: {profile or Config.DB_PROFILE}")
+        return
+    for name, value in pragmas.items():
+        conn.execute(f'PRAGMA {name} = {value}')
+    if archiving_wal():
+        # Only the checkpointer may checkpoint, right after archiving (see run_checkpointer)
+        conn.execute('PRAGMA wal_autocheckpoint = 0')
+
+def archiving_wal():
+    """Whether the checkpointer archives WAL frames for the backups before each checkpoint"""
+    return Config.BACKUP_WAL_ARCHIVE and Config.DB_CHECKPOINT_ENABLED
+
+def shared_conn(shard=0):
+    """The connection nested calls on this thread share for a shard, if any"""
+    return getattr(_local, 'conns', {}).get(shard)
+
+def set_shared_conn(shard, conn):
+    """Share conn with nested get_db_context calls on this thread (None to stop)"""
+    if not hasattr(_local, 'conns'):
+        _local.conns = {}
+    if conn is None:
+        _local.conns.pop(shard, None)
+    else:
+        _local.conns[shard] = conn
+
 @contextmanager
-def get_db_context():
+def get_db_context(query_only=False, shard=0):
     """Context manager for database connections"""
-    conn = get_db()
+    shared = shared_conn(shard)
+    if shared is not None:
+        # Reuse the enclosing shared connection; it commits when it closes
+        yield shared
+        return
+    
+    sharing = getattr(_local, 'sharing', None)
+    if sharing is not None:
+        # Inside shared_db_context: keep this shard's connection for the rest of the block
+        with shared_db_context(sharing['query_only'], shard) as conn:
+            yield conn
+        return
+    
+    conn = get_db(query_only, shard)
     try:
         yield conn
         conn.commit()
@@ -29,6 +109,74 @@ def get_db_context():
     finally:
         conn.close()
 
+@contextmanager
+def shared_db_context(query_only=False, shard=0):
+    """Run every get_db_context inside this block on one connection per shard"""
+    if shared_conn(shard) is not None:
+        yield shared_conn(shard)
+        return
+    
+    sharing = getattr(_local, 'sharing', None)
+    if sharing is not None:
+        # Another shard joins the enclosing block and closes with it
+        conn = get_db(sharing['query_only'], shard)
+        set_shared_conn(shard, conn)
+        sharing['owned'].append((shard, conn))
+        yield conn
+        return
+    
+    _local.sharing = {'query_only': query_only, 'owned': []}
+    try:
+        with get_db_context(query_only, shard) as conn:
+            set_shared_conn(shard, conn)
+            try:
+                yield conn
+            finally:
+                set_shared_conn(shard, None)
+    finally:
+        for other, conn in _local.sharing['owned']:
+            set_shared_conn(other, None)
+            conn.commit()
+            conn.close()
+        _local.sharing = None
+
+_shard_cache = {}
+
+def shard_for(table_id):
+    """Shard holding a table's prompts, responses and members.
+    
+    Cached per process, so move tables (scripts/rebalance_shards.py) with the app stopped.
+    """
+    if Config.DB_SHARDS == 1:
+        return 0
+    if table_id not in _shard_cache:
+        with get_db_context() as conn:
+            row = conn.execute('SELECT shard FROM tables WHERE id = ?', (table_id,)).fetchone()
+        if row is None:
+            return 0
+        _shard_cache[table_id] = row['shard']
+    return _shard_cache[table_id]
+
+def table_db_context(table_id, query_only=False):
+    """get_db_context on the shard that holds table_id's data"""
+    return get_db_context(query_only, shard_for(table_id))
+
+def init_shard(shard):
+    """Create a shard file with the per-table schema and its own id range"""
+    conn = get_db(shard=shard)
+    try:
+        with open('shard_schema.sql', 'r') as f:
+            conn.executescript(f.read())
+        
+        for table in SHARDED_TABLES:
+            if not conn.execute('SELECT 1 FROM sqlite_sequence WHERE name = ?', (table,)).fetchone():
+                conn.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)',
+                             (table, shard * SHARD_ID_STRIDE))
+        conn.commit()
+        logger.info(f"Initialized shard {shard} at {shard_path(shard)}")
+    finally:
+        conn.close()
+
 def init_db():
     """Initialize database with schema"""
     try:
@@ -40,15 +188,381 @@ def init_db():
             # Seed default prompts
             with open('seed_prompts.sql', 'r') as f:
                 conn.executescript(f.read())
-            
-            logger.info("Database initialized successfully")
-            return True
+        
+        for shard in all_shards():
+            if shard:
+                init_shard(shard)
+        
+        logger.info("Database initialized successfully")
+        return True
     except Exception as e:
         logger.error(f"Failed to initialize database: {str(e)}")
         return False
 
+def backfill_member_counts(conn):
+    """Fill tables.member_count from whichever file holds each table's members"""
+    for row in conn.execute('SELECT DISTINCT shard FROM main.tables').fetchall():
+        shard = row['shard']
+        if shard == 0:
+            conn.execute('''
+                UPDATE main.tables SET member_count =
+                    (SELECT COUNT(*) FROM main.table_members WHERE table_id = tables.id)
+                WHERE shard = 0
+            ''')
+            continue
+        if not os.path.exists(shard_path(shard)):
+            continue
+        source = sqlite3.connect(shard_path(shard))
+        try:
+            counts = source.execute('SELECT COUNT(*), table_id FROM table_members GROUP BY table_id').fetchall()
+        finally:
+            source.close()
+        conn.executemany('UPDATE main.tables SET member_count = ? WHERE id = ?', counts)
+
+# Columns added since the first release: (table, column, definition, backfill statements or functions)
+MIGRATIONS = [
+    ('table_members', 'display_name', 'TEXT', ['''
+        UPDATE table_members SET display_name =
+            (SELECT display_name FROM users WHERE users.id = table_members.user_id)
+        WHERE display_name IS NULL
+    ''']),
+    ('prompts', 'editable_from', 'TIMESTAMP', []),
+    # Windows start out in server local time; the timezone step below converts them to UTC
+    ('prompts', 'editable_until', 'TIMESTAMP', ['''
+        UPDATE prompts SET
+            editable_from = datetime(prompt_date || ' ' ||
+                (SELECT prompt_time FROM tables WHERE tables.id = prompts.table_id)),
+            editable_until = datetime(prompt_date || ' ' ||
+                (SELECT prompt_time FROM tables WHERE tables.id = prompts.table_id), '+1 day')
+        WHERE editable_until IS NULL
+    ''']),
+    # Existing tables keep rolling over in the server's zone
+    ('tables', 'timezone', 'TEXT', [
+        ('UPDATE tables SET timezone = ? WHERE timezone IS NULL', (Config.DEFAULT_TIMEZONE,)),
+        "UPDATE prompts SET editable_from = datetime(editable_from, 'utc'), "
+        "editable_until = datetime(editable_until, 'utc')",
+    ]),
+    # Filled in by utils.prompts.schedule_unscheduled_tables
+    ('tables', 'next_boundary_utc', 'TIMESTAMP', []),
+    # Everything created before sharding lives in the main database (shard 0)
+    ('tables', 'shard', 'INTEGER NOT NULL DEFAULT 0', []),
+    # Tombstones; rows are removed later by utils.purge
+    ('users', 'deleted_at', 'TIMESTAMP', []),
+    ('tables', 'deleted_at', 'TIMESTAMP', []),
+    # Answer streaks; scripts/backfill_streaks.py fills them in for existing history
+    ('table_members', 'streak_current', 'INTEGER NOT NULL DEFAULT 0', []),
+    ('table_members', 'streak_best', 'INTEGER NOT NULL DEFAULT 0', []),
+    ('table_members', 'last_answered_prompt_date', 'DATE', []),
+    # Read cursor for unread badges; start everyone caught up rather than with a week unread
+    ('table_members', 'last_seen_response_seq', 'INTEGER NOT NULL DEFAULT 0', [
+        'UPDATE table_members SET last_seen_response_seq = (SELECT COALESCE(MAX(id), 0) FROM responses)',
+    ]),
+    # Ids aren't ordered across shards once tables move, so the cursor is (created_at, id)
+    ('table_members', 'last_seen_response_at', 'TIMESTAMP', [
+        '''
+        UPDATE table_members SET last_seen_response_at = (
+            SELECT created_at FROM responses WHERE id <= table_members.last_seen_response_seq
+            ORDER BY id DESC LIMIT 1
+        )
+        ''',
+    ]),
+    # Kept in step by Table.sync_member_count
+    ('tables', 'member_count', 'INTEGER NOT NULL DEFAULT 0', [backfill_member_counts]),
+    ('tables', 'max_members', 'INTEGER', []),
+]
+
+# Tables added since the first release (schema.sql creates them for new databases)
+MIGRATION_TABLES = [
+    '''
+    CREATE TABLE IF NOT EXISTS deletion_jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        target_id INTEGER NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        rows_deleted INTEGER NOT NULL DEFAULT 0,
+        lease_until TIMESTAMP,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        finished_at TIMESTAMP
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS presence (
+        table_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        seen_at TIMESTAMP NOT NULL,
+        PRIMARY KEY (table_id, user_id)
+    ) WITHOUT ROWID
+    ''',
+]
+
+# Objects added since the first release to every file holding responses: (name, statements)
+MIGRATION_OBJECTS = [
+    ('cache_invalidations', [
+        '''CREATE TABLE main.cache_invalidations (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            cache_key TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )''',
+    ]),
+    # Keyset pagination reads responses by (created_at, id) and members by (joined_at, id)
+    ('idx_responses_prompt_created', [
+        'DROP INDEX IF EXISTS main.idx_responses_prompt',
+        'CREATE INDEX main.idx_responses_prompt_created ON responses(prompt_id, created_at)',
+    ]),
+    ('idx_table_members_joined', [
+        'DROP INDEX IF EXISTS main.idx_table_members_table',
+        'CREATE INDEX main.idx_table_members_joined ON table_members(table_id, joined_at)',
+    ]),
+    # Search is scoped by an indexed table_id column; replaces the unscoped response_search
+    ('table_response_search', [
+        'DROP TRIGGER IF EXISTS main.response_search_insert',
+        'DROP TRIGGER IF EXISTS main.response_search_update',
+        'DROP TRIGGER IF EXISTS main.response_search_delete',
+        'DROP TABLE IF EXISTS main.response_search',
+        "CREATE VIRTUAL TABLE main.table_response_search USING fts5("
+        "response_text, prompt_text, table_id, tokenize = 'porter unicode61')",
+        '''
+        CREATE TRIGGER main.table_response_search_insert AFTER INSERT ON responses BEGIN
+            INSERT OR REPLACE INTO table_response_search (rowid, response_text, prompt_text, table_id)
+            SELECT new.id, new.response_text, prompt_text, table_id FROM prompts WHERE id = new.prompt_id;
+        END
+        ''',
+        '''
+        CREATE TRIGGER main.table_response_search_update AFTER UPDATE OF response_text ON responses BEGIN
+            UPDATE table_response_search SET response_text = new.response_text WHERE rowid = new.id;
+        END
+        ''',
+        '''
+        CREATE TRIGGER main.table_response_search_delete AFTER DELETE ON responses BEGIN
+            DELETE FROM table_response_search WHERE rowid = old.id;
+        END
+        ''',
+        # Index what is already there
+        '''
+        INSERT INTO main.table_response_search (rowid, response_text, prompt_text, table_id)
+        SELECT r.id, r.response_text, p.prompt_text, p.table_id
+        FROM main.responses r JOIN main.prompts p ON r.prompt_id = p.id
+        ''',
+    ]),
+    ('table_daily_stats', [
+        '''
+        CREATE TABLE main.table_daily_stats (
+            table_id INTEGER NOT NULL,
+            prompt_date DATE NOT NULL,
+            members INTEGER NOT NULL DEFAULT 0,
+            responses INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (table_id, prompt_date)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE TABLE main.member_stats (
+            table_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            responses INTEGER NOT NULL DEFAULT 0,
+            last_response_at TIMESTAMP,
+            PRIMARY KEY (table_id, user_id)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE TRIGGER main.stats_prompt_insert AFTER INSERT ON prompts BEGIN
+            INSERT INTO table_daily_stats (table_id, prompt_date, members)
+            VALUES (new.table_id, new.prompt_date,
+                    (SELECT COUNT(*) FROM table_members WHERE table_id = new.table_id))
+            ON CONFLICT (table_id, prompt_date) DO NOTHING;
+        END
+        ''',
+        '''
+        CREATE TRIGGER main.stats_member_insert AFTER INSERT ON table_members BEGIN
+            UPDATE table_daily_stats SET members = members + 1
+            WHERE table_id = new.table_id
+              AND prompt_date = (SELECT MAX(prompt_date) FROM prompts WHERE table_id = new.table_id);
+        END
+        ''',
+        '''
+        CREATE TRIGGER main.stats_response_insert AFTER INSERT ON responses BEGIN
+            INSERT INTO table_daily_stats (table_id, prompt_date, responses)
+            SELECT table_id, prompt_date, 1 FROM prompts WHERE id = new.prompt_id
+            ON CONFLICT (table_id, prompt_date) DO UPDATE SET responses = responses + 1;
+            INSERT INTO member_stats (table_id, user_id, responses, last_response_at)
+            SELECT table_id, new.user_id, 1, new.created_at FROM prompts WHERE id = new.prompt_id
+            ON CONFLICT (table_id, user_id) DO UPDATE
+            SET responses = responses + 1, last_response_at = excluded.last_response_at;
+        END
+        ''',
+        # Past member counts aren't recorded; count who had joined before each
+        # prompt closed (both UTC; prompts without a window fall back to the date)
+        '''
+        INSERT INTO main.table_daily_stats (table_id, prompt_date, members, responses)
+        SELECT p.table_id, p.prompt_date,
+               (SELECT COUNT(*) FROM main.table_members tm
+                WHERE tm.table_id = p.table_id
+                  AND COALESCE(tm.joined_at < p.editable_until, date(tm.joined_at) <= p.prompt_date)),
+               (SELECT COUNT(*) FROM main.responses r WHERE r.prompt_id = p.id)
+        FROM main.prompts p
+        ''',
+        '''
+        INSERT INTO main.member_stats (table_id, user_id, responses, last_response_at)
+        SELECT p.table_id, r.user_id, COUNT(*), MAX(r.created_at)
+        FROM main.responses r JOIN main.prompts p ON r.prompt_id = p.id
+        GROUP BY p.table_id, r.user_id
+        ''',
+    ]),
+]
+
+# Indexes on migrated columns (schema.sql creates them for new databases)
+MIGRATION_INDEXES = [
+    'CREATE INDEX IF NOT EXISTS idx_prompts_editable ON prompts(table_id, editable_until)',
+    'CREATE INDEX IF NOT EXISTS idx_tables_next_boundary ON tables(next_boundary_utc)',
+    'CREATE INDEX IF NOT EXISTS idx_deletion_jobs_status ON deletion_jobs(status)',
+]
+
+_migrated = {'pid': None}
+
+def migrate_db():
+    """Bring an existing database up to schema.sql, once per process"""
+    if _migrated['pid'] == os.getpid():
+        return True
+    
+    try:
+        for shard in all_shards():
+            if shard and not os.path.exists(shard_path(shard)):
+                init_shard(shard)
+            # Shard files only hold the per-table tables
+            tables = None if shard == 0 else SHARDED_TABLES
+            migrate_file(shard, tables)
+        _migrated['pid'] = os.getpid()
+        return True
+    except Exception as e:
+        logger.error(f"Failed to migrate database: {str(e)}")
+        return False
+
+def migrate_file(shard, tables=None):
+    """Apply MIGRATIONS (for `tables` only, if given) to one database file"""
+    conn = get_db(shard=shard)
+    # BEGIN IMMEDIATE so workers starting together migrate one at a time
+    conn.isolation_level = None
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        for table, column, definition, backfill in MIGRATIONS:
+            if tables is not None and table not in tables:
+                continue
+            columns = [row['name'] for row in conn.execute(f'PRAGMA main.table_info({table})')]
+            if column in columns:
+                continue
+            conn.execute(f'ALTER TABLE main.{table} ADD COLUMN {column} {definition}')
+            for statement in backfill:
+                if callable(statement):
+                    statement(conn)
+                elif isinstance(statement, tuple):
+                    conn.execute(*statement)
+                else:
+                    conn.execute(statement)
+            logger.info(f"Migrated {shard_path(shard)}: added {table}.{column}")
+        for name, statements in MIGRATION_OBJECTS:
+            if conn.execute('SELECT 1 FROM main.sqlite_master WHERE name = ?', (name,)).fetchone():
+                continue
+            for statement in statements:
+                conn.execute(statement)
+            logger.info(f"Migrated {shard_path(shard)}: added {name}")
+        if shard == 0:
+            for statement in MIGRATION_TABLES + MIGRATION_INDEXES:
+                conn.execute(statement)
+        conn.execute('COMMIT')
+    except Exception:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+
 def dict_from_row(row):
     """Convert sqlite3.Row to dictionary"""
     if row is None:
         return None
     return {key: row[key] for key in row.keys()}
+
+# Checkpoint metrics for this process
+checkpoint_stats = {
+    'checkpoints': 0,
+    'truncates': 0,
+    'busy': 0,
+    'errors': 0,
+    'wal_bytes': 0,
+    'last_duration_ms': 0.0,
+    'max_duration_ms': 0.0,
+    'last_checkpoint_at': None,
+}
+
+_checkpointer = {'pid': None, 'thread': None}
+
+def wal_size(shard=None):
+    """Current size of a shard's -wal file in bytes (all shards if shard is None)"""
+    if shard is None:
+        return sum(wal_size(shard) for shard in all_shards())
+    try:
+        return os.path.getsize(shard_path(shard) + '-wal')
+    except OSError:
+        return 0
+
+def checkpoint(mode='PASSIVE', shard=0):
+    """Run a WAL checkpoint and record its metrics"""
+    conn = sqlite3.connect(shard_path(shard), timeout=0.1)
+    try:
+        started = time.perf_counter()
+        busy, log_frames, checkpointed = conn.execute(f'PRAGMA wal_checkpoint({mode})').fetchone()
+        duration_ms = (time.perf_counter() - started) * 1000
+    finally:
+        conn.close()
+
+    checkpoint_stats['checkpoints'] += 1
+    checkpoint_stats['truncates'] += mode == 'TRUNCATE'
+    checkpoint_stats['busy'] += busy
+    checkpoint_stats['wal_bytes'] = wal_size()
+    checkpoint_stats['last_duration_ms'] = duration_ms
+    checkpoint_stats['max_duration_ms'] = max(checkpoint_stats['max_duration_ms'], duration_ms)
+    checkpoint_stats['last_checkpoint_at'] = time.time()
+
+    logger.debug(f"WAL checkpoint {mode} on shard {shard}: busy={busy} log={log_frames} "
+                 f"checkpointed={checkpointed} in {duration_ms:.1f}ms")
+    return busy, log_frames, checkpointed
+
+def run_checkpointer():
+    """Checkpoint passively every interval.
+
+    A PASSIVE checkpoint that catches up lets the next write restart the WAL,
+    and under light load it nearly always catches up. With BACKUP_WAL_ARCHIVE
+    each checkpoint therefore archives the new frames first, under the write
+    lock, so the restart never drops frames the backup chain hasn't seen
+    (utils.backup.checkpoint_archived). Without it, the WAL is also truncated
+    once it passes the profile's journal_size_limit.
+    """
+    limit = Config.DB_PROFILES.get(Config.DB_PROFILE, {}).get('journal_size_limit', 0)
+    while True:
+        time.sleep(Config.DB_CHECKPOINT_INTERVAL)
+        for shard in all_shards():
+            try:
+                if not os.path.exists(shard_path(shard)):
+                    continue
+                if archiving_wal():
+                    # No TRUNCATE here: journal_size_limit trims the file when the WAL restarts
+                    checkpoint_archived(backup_dir_for(shard), shard_path(shard),
+                                        lambda: checkpoint('PASSIVE', shard))
+                    continue
+                checkpoint('PASSIVE', shard)
+                if limit and wal_size(shard) > limit:
+                    # TRUNCATE waits for readers, so only pay for it when the WAL is too big
+                    size = wal_size(shard)
+                    busy, _, _ = checkpoint('TRUNCATE', shard)
+                    logger.info(f"Truncated WAL of {shard_path(shard)} from {size} bytes (busy={busy})")
+            except Exception as e:
+                checkpoint_stats['errors'] += 1
+                logger.error(f"WAL checkpoint error: {str(e)}")
+
+def start_checkpointer():
+    """Start the background checkpointer once per process (safe to call per request)"""
+    if not Config.DB_CHECKPOINT_ENABLED or _checkpointer['pid'] == os.getpid():
+        return
+    _checkpointer['pid'] = os.getpid()
+    _checkpointer['thread'] = threading.Thread(target=run_checkpointer, name='wal-checkpointer', daemon=True)
+    _checkpointer['thread'].start()
+    logger.info(f"Started WAL checkpointer every {Config.DB_CHECKPOINT_INTERVAL}s")
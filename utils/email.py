@@ -1,3 +1,4 @@
+import time
 import logging
 import smtplib
 from email.mime.text import MIMEText
@@ -6,6 +7,15 @@ from config import Config
 
 logger = logging.getLogger(__name__)
 
+# Email metrics for this process (sends happen inside the request, so 'sending'
+# is how many requests are waiting on the SMTP server)
+email_stats = {
+    'sending': 0,
+    'sent': 0,
+    'failed': 0,
+    'last_send_ms': 0.0,
+}
+
 def send_password_reset_email(recipient_email, reset_token, app_url):
     """
     Send password reset email to user
@@ -23,6 +33,8 @@ def send_password_reset_email(recipient_email, reset_token, app_url):
         logger.warning(f"SMTP not configured. Reset link for {recipient_email}: {app_url}/reset-password/{reset_token}")
         return False
     
+    email_stats['sending'] += 1
+    started = time.perf_counter()
     try:
         # Create reset link
         reset_link = f"{app_url}/reset-password/{reset_token}"
@@ -143,11 +155,16 @@ The Kitchen Table
             server.send_message(msg)
         
         logger.info(f"Password reset email sent to {recipient_email}")
+        email_stats['sent'] += 1
         return True
         
     except Exception as e:
         logger.error(f"Failed to send password reset email to {recipient_email}: {str(e)}")
+        email_stats['failed'] += 1
         return False
+    finally:
+        email_stats['sending'] -= 1
+        email_stats['last_send_ms'] = (time.perf_counter() - started) * 1000
 
 
 def test_email_config():
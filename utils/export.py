@@ -0,0 +1,127 @@
+import io
+import os
+import csv
+import json
+import zipfile
+import logging
+from config import Config
+from utils.db import get_db, shard_for
+from utils.archive import attach_archive
+
+logger = logging.getLogger(__name__)
+
+EXPORT_COLUMNS = ['prompt_date', 'prompt_text', 'username', 'display_name',
+                  'response_text', 'created_at', 'edited_at']
+
+EXPORT_FORMATS = {
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'csv': ('text/csv', 'csv'),
+    'zip': ('application/zip', 'zip'),
+}
+
+# One row per response (or per prompt nobody answered), like the history view:
+# responses from people who have since left the table are left out
+HISTORY_QUERY = '''
+    SELECT p.prompt_date, p.prompt_text, u.username, tm.display_name,
+           r.response_text, r.created_at, r.edited_at
+    FROM {schema}.prompts p
+    LEFT JOIN {schema}.responses r ON r.prompt_id = p.id
+    LEFT JOIN table_members tm ON tm.user_id = r.user_id AND tm.table_id = p.table_id
+    LEFT JOIN users u ON u.id = r.user_id
+    WHERE p.table_id = ? AND p.prompt_date > ? AND p.prompt_date < ?
+      AND (r.id IS NULL OR tm.user_id IS NOT NULL)
+    ORDER BY p.prompt_date, r.created_at
+'''
+
+def iter_history(table_id, before):
+    """Yield export rows for prompts dated before `before`, oldest first, in fetchmany batches.
+
+    Archived prompts come first. Prompts still in the hot file are only read
+    after the last archived date, so rows an interrupted archive run left in
+    both files are exported once.
+    """
+    conn = get_db(shard=shard_for(table_id))
+    try:
+        sources = ['main']
+        if os.path.exists(Config.ARCHIVE_DATABASE_PATH):
+            attach_archive(conn)
+            conn.commit()
+            sources.insert(0, 'archive')
+
+        after = ''
+        for schema in sources:
+            cursor = conn.execute(HISTORY_QUERY.format(schema=schema), (table_id, after, str(before)))
+            while True:
+                rows = cursor.fetchmany(Config.EXPORT_BATCH_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    yield row
+                after = rows[-1]['prompt_date']
+    finally:
+        conn.close()
+
+def jsonl_chunks(rows):
+    """One JSON object per line"""
+    batch = []
+    for row in rows:
+        batch.append(json.dumps({column: row[column] for column in EXPORT_COLUMNS}, ensure_ascii=False))
+        if len(batch) >= Config.EXPORT_BATCH_SIZE:
+            yield ('\n'.join(batch) + '\n').encode('utf-8')
+            batch = []
+    if batch:
+        yield ('\n'.join(batch) + '\n').encode('utf-8')
+
+def csv_chunks(rows):
+    """CSV with a header row; the buffer is emptied after every batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    count = 0
+    for row in rows:
+        writer.writerow([row[column] for column in EXPORT_COLUMNS])
+        count += 1
+        if count % Config.EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable stream that hands out whatever was written since the last take()"""
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def zip_chunks(rows, name):
+    """ZIP holding the CSV export, compressed as it streams"""
+    sink = _ChunkSink()
+    # An unseekable sink makes zipfile write data descriptors instead of seeking back
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        with archive.open(f'{name}.csv', 'w', force_zip64=True) as member:
+            for chunk in csv_chunks(rows):
+                member.write(chunk)
+                data = sink.take()
+                if data:
+                    yield data
+    yield sink.take()
+
+def export_chunks(table_id, before, export_format, name):
+    """Byte chunks of a table's history in the given format"""
+    rows = iter_history(table_id, before)
+    if export_format == 'csv':
+        return csv_chunks(rows)
+    if export_format == 'zip':
+        return zip_chunks(rows, name)
+    return jsonl_chunks(rows)
@@ -0,0 +1,378 @@
+import os
+import sys
+import hmac
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from flask import request, Response
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics for the blueprint routes, summed over every gunicorn worker.
+# Each worker counts in memory and adds what it counted since its last flush to
+# a small SQLite file every METRICS_FLUSH_INTERVAL (and when scraped), so a
+# request pays for a few dict updates and never for a write. Counters there are
+# running totals over all workers, including ones that have since exited; gauges
+# are stored per worker and only read back for workers that flushed recently.
+
+# name -> (type, help); histograms are stored as their _bucket, _sum and _count series
+FAMILIES = {
+    'kitchen_table_requests_total': ('counter', 'Requests by route, method and status'),
+    'kitchen_table_request_duration_seconds': ('histogram', 'Request latency by route and method'),
+    'kitchen_table_requests_in_flight': ('gauge', 'Requests being served by route'),
+    'kitchen_table_sql_statements_total': ('counter', 'SQL statements executed by route'),
+    'kitchen_table_sql_duration_seconds_total': ('counter', 'Seconds spent in SQL statements by route'),
+    'kitchen_table_cache_hit_ratio': ('gauge', 'Share of cache lookups answered from worker caches'),
+    'kitchen_table_workers': ('gauge', 'Workers that flushed metrics recently'),
+}
+
+# The per-process *_stats dicts, exported once their module is loaded. Counters
+# are summed over workers; gauges are summed ('sum') or the highest worker's
+# reading ('max', for readings every worker takes of the same shared state)
+STATS = [
+    ('utils.cache', 'cache_stats', {'hits': 'counter', 'misses': 'counter', 'evictions': 'counter',
+                                    'flushes': 'counter', 'checks': 'counter',
+                                    'last_lag_ms': 'max', 'max_lag_ms': 'max'}),
+    ('utils.writer', 'writer_stats', {'batches': 'counter', 'writes': 'counter', 'errors': 'counter',
+                                      'max_batch': 'max', 'last_commit_ms': 'max', 'max_commit_ms': 'max'}),
+    ('utils.db', 'checkpoint_stats', {'checkpoints': 'counter', 'truncates': 'counter', 'busy': 'counter',
+                                      'errors': 'counter', 'wal_bytes': 'max',
+                                      'last_duration_ms': 'max', 'max_duration_ms': 'max'}),
+    ('utils.purge', 'purge_stats', {'jobs_done': 'counter', 'batches': 'counter',
+                                    'rows_deleted': 'counter', 'errors': 'counter'}),
+    ('utils.singleflight', 'singleflight_stats', {'calls': 'counter', 'shared': 'counter'}),
+    ('utils.presence', 'presence_stats', {'touches': 'counter', 'heartbeats': 'counter'}),
+    ('utils.email', 'email_stats', {'sending': 'sum', 'sent': 'counter', 'failed': 'counter',
+                                    'last_send_ms': 'max'}),
+    ('utils.profiler', 'profile_stats', {'profiled': 'counter', 'busy': 'counter', 'errors': 'counter'}),
+]
+
+# Gauges read as the highest worker's value rather than the sum
+MAX_GAUGES = set()
+
+def stats_metric(stats, key, kind):
+    name = f"kitchen_table_{stats[:-len('_stats')]}_{key}"
+    return f'{name}_total' if kind == 'counter' else name
+
+for _module, _stats, _keys in STATS:
+    for _key, _kind in _keys.items():
+        _name = stats_metric(_stats, _key, _kind)
+        if _kind == 'counter':
+            FAMILIES[_name] = ('counter', f"{_stats}['{_key}'] summed over workers")
+        else:
+            FAMILIES[_name] = ('gauge', f"{_stats}['{_key}'], {'highest' if _kind == 'max' else 'sum'} over workers")
+        if _kind == 'max':
+            MAX_GAUGES.add(_name)
+
+METRICS_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (name, labels)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS gauges (
+    pid INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    value REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (pid, name, labels)
+) WITHOUT ROWID;
+'''
+
+# (name, labels) -> amount counted since the last flush
+_pending = {}
+# route -> requests being served by this worker
+_in_flight = {}
+# (stats dict, key) -> counter value already added to _pending
+_reported = {}
+_lock = threading.Lock()
+_local = threading.local()
+_blueprints = set()
+_flusher = {'pid': None, 'thread': None, 'schema_pid': None}
+
+def labels_text(**labels):
+    """Prometheus label set, e.g. route="/api/table/info",method="GET" (in argument order)"""
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+def _add(name, labels, amount=1):
+    # Caller holds _lock
+    key = (name, labels)
+    _pending[key] = _pending.get(key, 0) + amount
+
+class MeteredConnection(sqlite3.Connection):
+    """sqlite3 connection that counts and times statements for the route running them.
+
+    The time is what execute takes: the whole statement for writes, up to the
+    first row for queries (rows fetched afterwards aren't included).
+    """
+
+    def execute(self, *args):
+        started = time.perf_counter()
+        try:
+            return super().execute(*args)
+        finally:
+            note_sql(time.perf_counter() - started)
+
+    def executemany(self, *args):
+        started = time.perf_counter()
+        try:
+            return super().executemany(*args)
+        finally:
+            note_sql(time.perf_counter() - started)
+
+def note_sql(seconds):
+    """Count one statement towards the request (or bound route) on this thread"""
+    state = getattr(_local, 'request', None)
+    if state is not None:
+        state['sql'] += 1
+        state['sql_seconds'] += seconds
+        return
+    labels = labels_text(route=getattr(_local, 'route', None) or 'background')
+    with _lock:
+        _add('kitchen_table_sql_statements_total', labels)
+        _add('kitchen_table_sql_duration_seconds_total', labels, seconds)
+
+def current_route():
+    """Route of the request on this thread, for work handed to another thread"""
+    state = getattr(_local, 'request', None)
+    return state['route'] if state is not None else getattr(_local, 'route', None)
+
+@contextmanager
+def bound_route(route):
+    """Count SQL run in this block towards a route (for background threads doing its work)"""
+    previous = getattr(_local, 'route', None)
+    _local.route = route
+    try:
+        yield
+    finally:
+        _local.route = previous
+
+def install(app, *blueprints):
+    """Time every route of the given blueprints.
+
+    Call before registering other request hooks, so latency includes them and
+    after_request hooks such as compression.
+    """
+    _blueprints.update(blueprint.name for blueprint in blueprints)
+    app.before_request(start_request)
+    app.after_request(finish_request)
+    app.teardown_request(end_request)
+
+def start_request():
+    """before_request hook"""
+    if not Config.METRICS_ENABLED or request.blueprint not in _blueprints:
+        return
+    route = request.url_rule.rule
+    _local.request = {'route': route, 'started': time.perf_counter(), 'sql': 0, 'sql_seconds': 0.0}
+    with _lock:
+        _in_flight[route] = _in_flight.get(route, 0) + 1
+
+def finish_request(response):
+    """after_request hook"""
+    _record(response.status_code)
+    return response
+
+def end_request(error=None):
+    """teardown hook: records requests that failed before after_request ran"""
+    _record(500)
+
+def _record(status):
+    state = getattr(_local, 'request', None)
+    if state is None:
+        return
+    _local.request = None
+    seconds = time.perf_counter() - state['started']
+    route = state['route']
+    labels = labels_text(route=route, method=request.method)
+
+    with _lock:
+        _in_flight[route] -= 1
+        _add('kitchen_table_requests_total', labels_text(route=route, method=request.method, status=status))
+        for bound in Config.METRICS_BUCKETS:
+            if seconds <= bound:
+                _add('kitchen_table_request_duration_seconds_bucket', f'{labels},le="{format_value(bound)}"')
+        _add('kitchen_table_request_duration_seconds_bucket', f'{labels},le="+Inf"')
+        _add('kitchen_table_request_duration_seconds_sum', labels, seconds)
+        _add('kitchen_table_request_duration_seconds_count', labels)
+        if state['sql']:
+            route_labels = labels_text(route=route)
+            _add('kitchen_table_sql_statements_total', route_labels, state['sql'])
+            _add('kitchen_table_sql_duration_seconds_total', route_labels, state['sql_seconds'])
+
+def _loaded_stats():
+    """(stats dict name, dict, keys) for the stats modules this process has imported"""
+    for module, name, keys in STATS:
+        # Only modules already loaded; importing them here would be circular
+        loaded = sys.modules.get(module)
+        if loaded is not None:
+            yield name, getattr(loaded, name), keys
+
+def _connect():
+    conn = sqlite3.connect(Config.METRICS_DATABASE_PATH, timeout=1)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    if _flusher['schema_pid'] != os.getpid():
+        conn.executescript(METRICS_SCHEMA)
+        _flusher['schema_pid'] = os.getpid()
+    return conn
+
+def flush():
+    """Add this worker's counts since the last flush to the shared store; False on failure"""
+    now = time.time()
+    gauges = [('kitchen_table_workers', '', 1)]
+    with _lock:
+        for name, stats, keys in _loaded_stats():
+            for key, kind in keys.items():
+                metric = stats_metric(name, key, kind)
+                if kind == 'counter':
+                    delta = stats[key] - _reported.get((name, key), 0)
+                    if delta:
+                        _add(metric, '', delta)
+                        _reported[(name, key)] = stats[key]
+                else:
+                    gauges.append((metric, '', stats[key] or 0))
+        gauges.extend(('kitchen_table_requests_in_flight', labels_text(route=route), count)
+                      for route, count in _in_flight.items())
+        counts = dict(_pending)
+        _pending.clear()
+
+    pid = os.getpid()
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                conn.executemany('''
+                    INSERT INTO counters (name, labels, value) VALUES (?, ?, ?)
+                    ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value
+                ''', [(name, labels, amount) for (name, labels), amount in counts.items()])
+                conn.execute('DELETE FROM gauges WHERE pid = ? OR updated_at < ?', (pid, now - _gauge_ttl()))
+                conn.executemany(
+                    'INSERT INTO gauges (pid, name, labels, value, updated_at) VALUES (?, ?, ?, ?, ?)',
+                    [(pid, name, labels, value, now) for name, labels, value in gauges]
+                )
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.error(f"Error flushing metrics: {str(e)}")
+        # Keep the counts for the next flush
+        with _lock:
+            for (name, labels), amount in counts.items():
+                _add(name, labels, amount)
+        return False
+    return True
+
+def _gauge_ttl():
+    """Seconds after which a worker that stopped flushing no longer counts"""
+    return Config.METRICS_FLUSH_INTERVAL * 3
+
+def run_flusher():
+    while True:
+        time.sleep(Config.METRICS_FLUSH_INTERVAL)
+        flush()
+
+def start_flusher():
+    """Start the background metrics flusher once per process (safe to call per request)"""
+    if not Config.METRICS_ENABLED or _flusher['pid'] == os.getpid():
+        return
+    _flusher['pid'] = os.getpid()
+    with _lock:
+        # Counted before a fork belongs to the parent
+        _reported.clear()
+        for name, stats, keys in _loaded_stats():
+            _reported.update(((name, key), stats[key]) for key, kind in keys.items() if kind == 'counter')
+    _flusher['thread'] = threading.Thread(target=run_flusher, name='metrics-flusher', daemon=True)
+    _flusher['thread'].start()
+    logger.info(f"Started metrics flusher every {Config.METRICS_FLUSH_INTERVAL}s")
+
+def _series_key(name, labels):
+    """Sort key that keeps each histogram's buckets in le order, then _sum and _count"""
+    if name.endswith('_bucket'):
+        base, _, le = labels.rpartition(',le=')
+        return (base, 0, float(le.strip('"').replace('+Inf', 'inf')))
+    if name.endswith('_sum'):
+        return (labels, 1, 0)
+    if name.endswith('_count'):
+        return (labels, 2, 0)
+    return (labels, 0, 0)
+
+def _family(name):
+    for suffix in ('_bucket', '_sum', '_count'):
+        base = name[:-len(suffix)]
+        if name.endswith(suffix) and FAMILIES.get(base, ('',))[0] == 'histogram':
+            return base
+    return name
+
+def render():
+    """Every worker's metrics in the Prometheus text exposition format"""
+    flush()
+    conn = _connect()
+    try:
+        counters = conn.execute('SELECT name, labels, value FROM counters').fetchall()
+        gauges = conn.execute('''
+            SELECT name, labels, SUM(value), MAX(value) FROM gauges
+            WHERE updated_at >= ? GROUP BY name, labels
+        ''', (time.time() - _gauge_ttl(),)).fetchall()
+    finally:
+        conn.close()
+
+    series = {}
+    buckets = set()
+    for name, labels, value in counters:
+        series.setdefault(_family(name), []).append((name, labels, value))
+        if name.endswith('_bucket'):
+            buckets.add((name, labels))
+    for name, labels, value in counters:
+        if name.endswith('_count') and (name[:-len('_count')] + '_bucket', f'{labels},le="+Inf"') in buckets:
+            # Buckets are only stored once something lands in them; the rest are empty
+            for bound in Config.METRICS_BUCKETS:
+                key = (name[:-len('_count')] + '_bucket', f'{labels},le="{format_value(bound)}"')
+                if key not in buckets:
+                    series[_family(name)].append((*key, 0))
+    for name, labels, total, highest in gauges:
+        series.setdefault(name, []).append((name, labels, highest if name in MAX_GAUGES else total))
+
+    totals = {name: value for name, labels, value in counters if not labels}
+    lookups = totals.get('kitchen_table_cache_hits_total', 0) + totals.get('kitchen_table_cache_misses_total', 0)
+    if lookups:
+        series['kitchen_table_cache_hit_ratio'] = [
+            ('kitchen_table_cache_hit_ratio', '', totals.get('kitchen_table_cache_hits_total', 0) / lookups)
+        ]
+
+    lines = []
+    for family, (kind, help_text) in FAMILIES.items():
+        if family not in series:
+            continue
+        lines.append(f'# HELP {family} {help_text}')
+        lines.append(f'# TYPE {family} {kind}')
+        for name, labels, value in sorted(series[family], key=lambda row: (_series_key(row[0], row[1]), row[0])):
+            lines.append(f'{name}{{{labels}}} {format_value(value)}' if labels else f'{name} {format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+def metrics_response():
+    """/metrics, behind METRICS_TOKEN (disabled until one is set)"""
+    if not Config.METRICS_ENABLED or not Config.METRICS_TOKEN:
+        return Response('Metrics are disabled\n', status=404, mimetype='text/plain')
+    supplied = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(supplied.encode(), f'Bearer {Config.METRICS_TOKEN}'.encode()):
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    try:
+        body = render()
+    except Exception as e:
+        logger.error(f"Error rendering metrics: {str(e)}")
+        return Response('Metrics unavailable\n', status=503, mimetype='text/plain')
+    return Response(body, content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,40 @@
+import json
+import base64
+import binascii
+from config import Config
+
+def encode_cursor(*values):
+    """Opaque keyset cursor for the last row of a page, e.g. (created_at, id)"""
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(text, size=2):
+    """Values of a cursor from encode_cursor; ValueError if it isn't one"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(text + '=' * (-len(text) % 4)))
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+    if (not isinstance(values, list) or len(values) != size
+            or not all(isinstance(value, (str, int)) for value in values)):
+        raise ValueError('Invalid cursor')
+    return tuple(values)
+
+def page_args(args, default_size):
+    """(after, limit) from ?after=&limit= query arguments; ValueError for bad ones"""
+    after = decode_cursor(args['after']) if args.get('after') else None
+    limit = args.get('limit', default_size, type=int)
+    if not 1 <= limit <= Config.PAGE_SIZE_MAX:
+        raise ValueError(f'limit must be between 1 and {Config.PAGE_SIZE_MAX}')
+    return after, limit
+
+def keyset_page(name, rows, limit, after, key):
+    """{name: rows, next_cursor, has_more} from up to limit + 1 rows fetched after a cursor.
+
+    next_cursor points past the last row returned (or stays at `after` when
+    nothing new came back), so polling with it picks up rows added later.
+    """
+    page = rows[:limit]
+    if page:
+        next_cursor = encode_cursor(*key(page[-1]))
+    else:
+        next_cursor = encode_cursor(*after) if after else None
+    return {name: page, 'next_cursor': next_cursor, 'has_more': len(rows) > limit}
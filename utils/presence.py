@@ -0,0 +1,99 @@
+import time
+import logging
+import threading
+from datetime import timedelta
+from config import Config
+from utils.db import get_db_context
+from utils.writer import run_write
+from utils.prompts import format_utc, utc_now
+
+logger = logging.getLogger(__name__)
+
+# Presence metrics for this process
+presence_stats = {
+    'touches': 0,
+    'heartbeats': 0,
+}
+
+# Who this worker has seen, by (table_id, user_id) and by user: time.time() of the
+# latest request, and of the latest heartbeat write sent for them
+_seen = {}
+_written = {}
+_active_written = {}
+_lock = threading.Lock()
+_pruned = {'at': 0.0}
+
+def note_active(user_id):
+    """Update users.last_active at most once per PRESENCE_HEARTBEAT per worker"""
+    now = time.time()
+    with _lock:
+        if now - _active_written.get(user_id, 0) < Config.PRESENCE_HEARTBEAT:
+            return
+        _active_written[user_id] = now
+    run_write(lambda conn: conn.execute(
+        'UPDATE users SET last_active = ? WHERE id = ?', (format_utc(utc_now()), user_id)
+    ), wait=False)
+
+def touch(table_id, user_id):
+    """Record that a member is at a table now (call on every authenticated table request).
+
+    Kept in memory; the shared presence table only gets a heartbeat when this
+    worker's last one for them is PRESENCE_HEARTBEAT old, so other workers see
+    them within that delay.
+    """
+    now = time.time()
+    key = (table_id, user_id)
+    with _lock:
+        _seen[key] = now
+        presence_stats['touches'] += 1
+        if now - _written.get(key, 0) < Config.PRESENCE_HEARTBEAT:
+            return
+        _written[key] = now
+        prune = now - _pruned['at'] >= Config.PRESENCE_TTL
+        if prune:
+            _pruned['at'] = now
+            _forget_before(now - Config.PRESENCE_TTL)
+    presence_stats['heartbeats'] += 1
+    run_write(write_heartbeat, table_id, user_id, prune, wait=False)
+
+def _forget_before(cutoff):
+    # Caller holds _lock
+    for seen in (_seen, _written, _active_written):
+        for key in [key for key, at in seen.items() if at < cutoff]:
+            del seen[key]
+
+def write_heartbeat(conn, table_id, user_id, prune=False):
+    """Upsert a member's heartbeat; with prune, also drop rows past PRESENCE_TTL"""
+    now = utc_now()
+    conn.execute('''
+        INSERT INTO presence (table_id, user_id, seen_at) VALUES (?, ?, ?)
+        ON CONFLICT (table_id, user_id) DO UPDATE SET seen_at = excluded.seen_at
+    ''', (table_id, user_id, format_utc(now)))
+    if prune:
+        conn.execute('DELETE FROM presence WHERE seen_at < ?',
+                     (format_utc(now - timedelta(seconds=Config.PRESENCE_TTL)),))
+
+def online_user_ids(table_id):
+    """Ids of members seen at a table in the last PRESENCE_TTL seconds, by any worker"""
+    cutoff = time.time() - Config.PRESENCE_TTL
+    with _lock:
+        online = {user_id for (seen_table, user_id), at in _seen.items()
+                  if seen_table == table_id and at >= cutoff}
+    try:
+        with get_db_context(query_only=True) as conn:
+            cursor = conn.execute(
+                'SELECT user_id FROM presence WHERE table_id = ? AND seen_at >= ?',
+                (table_id, format_utc(utc_now() - timedelta(seconds=Config.PRESENCE_TTL)))
+            )
+            online.update(row['user_id'] for row in cursor)
+    except Exception as e:
+        logger.error(f"Error reading presence: {str(e)}")
+    return sorted(online)
+
+def forget_table(conn, table_id):
+    """Drop a table's presence rows; call inside the write that deletes it"""
+    conn.execute('DELETE FROM presence WHERE table_id = ?', (table_id,))
+
+def forget_user(conn, user_id):
+    """Drop a user's presence rows; call inside the write that deletes them"""
+    conn.execute('DELETE FROM presence WHERE user_id = ?', (user_id,))
@@ -0,0 +1,234 @@
+import os
+import re
+import sys
+import hmac
+import time
+import random
+import pstats
+import cProfile
+import hashlib
+import logging
+import threading
+from flask import request
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Opt-in profiling of single requests. A request is profiled when it carries an
+# X-Profile header signed with PROFILE_SECRET (see sign_token), or at random
+# once in PROFILE_SAMPLE_RATE blueprint requests. The default 'sample' mode reads
+# the request thread's stack every PROFILE_INTERVAL_MS from a helper thread and
+# saves collapsed stacks (flamegraph.pl / speedscope input); 'cprofile' saves
+# pstats. Files go to PROFILE_DIR/<route>/, at most PROFILE_KEEP of them.
+# scripts/profile_report.py merges them.
+
+# Profiling metrics for this process
+profile_stats = {
+    'profiled': 0,
+    'busy': 0,
+    'errors': 0,
+}
+
+PROFILE_HEADER = 'X-Profile'
+
+_local = threading.local()
+_blueprints = set()
+# One profiled request per worker at a time: cProfile can't nest, and it bounds the cost
+_busy = threading.Lock()
+_labels = {}
+_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def sign_token(expires):
+    """X-Profile header value valid until `expires` (unix time)"""
+    expires = str(int(expires))
+    digest = hmac.new(Config.PROFILE_SECRET.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return f'{expires}.{digest}'
+
+def valid_token(value):
+    """Whether an X-Profile header value is signed with PROFILE_SECRET and unexpired"""
+    if not Config.PROFILE_SECRET or not value or '.' not in value:
+        return False
+    expires, _, digest = value.partition('.')
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(sign_token(expires).encode(), value.encode())
+
+def frame_label(code):
+    """'function (path:line)' for a code object, with the path relative to the app or site-packages"""
+    label = _labels.get(code)
+    if label is None:
+        path = code.co_filename
+        if path.startswith(_root + os.sep):
+            path = os.path.relpath(path, _root)
+        else:
+            path = os.sep.join(path.split(os.sep)[-2:])
+        # ';' separates frames in collapsed stacks (the count follows the last space)
+        label = _labels[code] = f'{code.co_name} ({path}:{code.co_firstlineno})'.replace(';', ':')
+    return label
+
+class StackSampler:
+    """Counts one thread's stacks, read every PROFILE_INTERVAL_MS by a helper thread"""
+
+    def __init__(self, thread_id, root):
+        self.thread_id = thread_id
+        self.root = root
+        self.stacks = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        interval = Config.PROFILE_INTERVAL_MS / 1000
+        while not self._stop.wait(interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                stack.append(self.root)
+                key = ';'.join(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.items())
+
+def install(app, *blueprints):
+    """Profile the given blueprints' routes on request (register after utils.metrics)"""
+    _blueprints.update(blueprint.name for blueprint in blueprints)
+    app.before_request(start_profile)
+    app.after_request(finish_profile)
+    app.teardown_request(end_profile)
+
+def start_profile():
+    """before_request hook"""
+    if not Config.PROFILE_SAMPLE_RATE and not Config.PROFILE_SECRET:
+        return
+    if request.blueprint not in _blueprints:
+        return
+    signed = valid_token(request.headers.get(PROFILE_HEADER))
+    if not signed and not (Config.PROFILE_SAMPLE_RATE and random.randrange(Config.PROFILE_SAMPLE_RATE) == 0):
+        return
+    if not _busy.acquire(blocking=False):
+        profile_stats['busy'] += 1
+        return
+
+    route = request.url_rule.rule
+    if Config.PROFILE_MODE == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+    else:
+        profiler = StackSampler(threading.get_ident(), f'{request.method} {route}')
+        profiler.start()
+    _local.profile = {'route': route, 'signed': signed, 'profiler': profiler, 'started': time.perf_counter()}
+
+def finish_profile(response):
+    """after_request hook: save the profile, and name the file for signed requests"""
+    name = _finish()
+    if name:
+        response.headers[PROFILE_HEADER] = name
+    return response
+
+def end_profile(error=None):
+    """teardown hook: saves profiles of requests that failed before after_request ran"""
+    _finish()
+
+def _finish():
+    state = getattr(_local, 'profile', None)
+    if state is None:
+        return None
+    _local.profile = None
+    try:
+        profiler = state['profiler']
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+        else:
+            profiler.stop()
+        elapsed_ms = (time.perf_counter() - state['started']) * 1000
+        name = save_profile(state['route'], profiler, elapsed_ms)
+        profile_stats['profiled'] += 1
+        return name if state['signed'] else None
+    except Exception as e:
+        profile_stats['errors'] += 1
+        logger.error(f"Error saving profile: {str(e)}")
+        return None
+    finally:
+        _busy.release()
+
+def route_dir(route):
+    """Directory name for a URL rule, e.g. /api/prompt/today -> api_prompt_today"""
+    return re.sub(r'[^A-Za-z0-9_-]+', '_', route.strip('/')).strip('_') or 'index'
+
+def save_profile(route, profiler, elapsed_ms):
+    """Write one profile under PROFILE_DIR/<route>/ and prune the oldest; returns its name"""
+    directory = os.path.join(Config.PROFILE_DIR, route_dir(route))
+    os.makedirs(directory, exist_ok=True)
+    ext = 'pstats' if isinstance(profiler, cProfile.Profile) else 'folded'
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{elapsed_ms:.0f}ms.{ext}"
+    path = os.path.join(directory, name)
+
+    # Written aside and renamed, so the report never reads half a file
+    tmp_path = path + '.tmp'
+    if ext == 'pstats':
+        profiler.dump_stats(tmp_path)
+    else:
+        with open(tmp_path, 'w') as f:
+            f.write(profiler.collapsed())
+    os.replace(tmp_path, path)
+
+    prune_profiles()
+    logger.info(f"Saved profile of {route} ({elapsed_ms:.0f}ms) to {path}")
+    return f'{route_dir(route)}/{name}'
+
+def list_profiles(route=None, since=None):
+    """[(mtime, path)] of saved profiles, oldest first; route is a URL rule or directory name"""
+    if not os.path.isdir(Config.PROFILE_DIR):
+        return []
+    wanted = route_dir(route) if route else None
+    found = []
+    for entry in os.scandir(Config.PROFILE_DIR):
+        if not entry.is_dir() or (wanted and entry.name != wanted):
+            continue
+        for profile in os.scandir(entry.path):
+            if profile.name.endswith(('.folded', '.pstats')):
+                mtime = profile.stat().st_mtime
+                if since is None or mtime >= since:
+                    found.append((mtime, profile.path))
+    return sorted(found)
+
+def prune_profiles():
+    """Delete the oldest profiles beyond PROFILE_KEEP"""
+    profiles = list_profiles()
+    for _, path in profiles[:max(0, len(profiles) - Config.PROFILE_KEEP)]:
+        try:
+            os.remove(path)
+        except OSError:
+            # Another worker pruned it first
+            pass
+
+def merge_collapsed(paths):
+    """Sum the sample counts of collapsed-stack files; returns {stack: count}"""
+    stacks = {}
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                if stack and count.isdigit():
+                    stacks[stack] = stacks.get(stack, 0) + int(count)
+    return stacks
+
+def merge_pstats(paths):
+    """One pstats.Stats over several cProfile dumps, or None if there are none"""
+    stats = None
+    for path in paths:
+        if stats is None:
+            stats = pstats.Stats(path)
+        else:
+            stats.add(path)
+    return stats
@@ -1,27 +1,101 @@
+import re
 import logging
-from datetime import datetime, date, time, timedelta
-from utils.db import get_db_context
+from datetime import datetime, date, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from config import Config
+from utils.db import get_db_context, table_db_context, shard_for
+from utils.writer import run_write
+from utils.singleflight import singleflight
+from utils.streaks import reset_broken_streaks
+from utils.cache import cache_key, invalidate
 
 logger = logging.getLogger(__name__)
 
+# Same layout as SQLite's CURRENT_TIMESTAMP (UTC), so stored times compare as strings
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+def get_zone(name):
+    """ZoneInfo for a table's IANA zone name, falling back to the server default"""
+    try:
+        return ZoneInfo(name or Config.DEFAULT_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning(f"Unknown timezone {name}, using {Config.DEFAULT_TIMEZONE}")
+        return ZoneInfo(Config.DEFAULT_TIMEZONE)
+
+def is_valid_timezone(name):
+    """Whether name is an IANA zone this server knows"""
+    try:
+        ZoneInfo(name)
+        return True
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+
+def is_valid_prompt_time(value):
+    """Whether value is a prompt time as stored: 'HH:MM' between 00:00 and 23:59"""
+    return isinstance(value, str) and re.fullmatch(r'([01]\d|2[0-3]):[0-5]\d', value) is not None
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+def format_utc(moment):
+    """Aware datetime -> stored UTC timestamp"""
+    return moment.astimezone(timezone.utc).strftime(TIMESTAMP_FORMAT)
+
+def parse_prompt_time(prompt_time):
+    if isinstance(prompt_time, str):
+        return datetime.strptime(prompt_time, '%H:%M').time()
+    return prompt_time
+
+def boundary(prompt_date, prompt_time, zone):
+    """The instant prompt_date's prompt opens: prompt_time on that date in the table's zone"""
+    if isinstance(prompt_date, str):
+        prompt_date = datetime.strptime(prompt_date, '%Y-%m-%d').date()
+    return datetime.combine(prompt_date, parse_prompt_time(prompt_time), tzinfo=zone)
+
+def prompt_date_at(moment, prompt_time, zone):
+    """Which prompt date is current at an instant"""
+    local = moment.astimezone(zone)
+    # Before today's prompt time we're still on yesterday's prompt
+    if local.time() < parse_prompt_time(prompt_time):
+        return local.date() - timedelta(days=1)
+    return local.date()
+
+def next_boundary(prompt_time, zone, now=None):
+    """The next instant a table rolls over to a new prompt date"""
+    current = prompt_date_at(now or utc_now(), prompt_time, zone)
+    return boundary(current + timedelta(days=1), prompt_time, zone)
+
+def edit_window(prompt_date, prompt_time, zone):
+    """(editable_from, editable_until) in UTC: from the prompt's boundary until the next one"""
+    opens = boundary(prompt_date, prompt_time, zone)
+    closes = boundary(opens.date() + timedelta(days=1), prompt_time, zone)
+    return format_utc(opens), format_utc(closes)
+
+def is_editable(prompt, now=None):
+    """Whether now falls inside a prompt's stored edit window"""
+    if not prompt or not prompt['editable_from'] or not prompt['editable_until']:
+        return False
+    now = format_utc(now or utc_now())
+    return prompt['editable_from'] <= now < prompt['editable_until']
+
+def get_table_clock(table_id):
+    """(prompt_time, zone) for a table, or None"""
+    with get_db_context() as conn:
+        cursor = conn.execute('SELECT prompt_time, timezone FROM tables WHERE id = ?', (table_id,))
+        table = cursor.fetchone()
+    if not table:
+        return None
+    return parse_prompt_time(table['prompt_time']), get_zone(table['timezone'])
+
 def get_current_prompt_date(table_id):
     """Get the current active prompt date for a table based on prompt time"""
     try:
-        with get_db_context() as conn:
-            cursor = conn.execute('SELECT prompt_time FROM tables WHERE id = ?', (table_id,))
-            table = cursor.fetchone()
-            
-            if not table:
-                return date.today()
-            
-            prompt_time = datetime.strptime(table['prompt_time'], '%H:%M').time()
-            now = datetime.now()
-            
-            # If we haven't reached the prompt time yet today, we're still on yesterday's prompt
-            if now.time() < prompt_time:
-                return date.today() - timedelta(days=1)
-            else:
-                return date.today()
+        clock = get_table_clock(table_id)
+        if not clock:
+            return date.today()
+        
+        prompt_time, zone = clock
+        return prompt_date_at(utc_now(), prompt_time, zone)
     except Exception as e:
         logger.error(f"Error getting current prompt date: {str(e)}")
         return date.today()
@@ -29,24 +103,21 @@ def get_current_prompt_date(table_id):
 def get_time_until_next_prompt(table_id):
     """Get seconds until TODAY'S prompt is available (returns 0 if already available)"""
     try:
-        with get_db_context() as conn:
-            cursor = conn.execute('SELECT prompt_time FROM tables WHERE id = ?', (table_id,))
-            table = cursor.fetchone()
-            
-            if not table:
-                return 0
-            
-            prompt_time = datetime.strptime(table['prompt_time'], '%H:%M').time()
-            now = datetime.now()
-            
-            # If we haven't reached today's prompt time, calculate time until then
-            if now.time() < prompt_time:
-                today_prompt = datetime.combine(date.today(), prompt_time)
-                seconds = (today_prompt - now).total_seconds()
-                return max(0, int(seconds))
-            else:
-                # Today's prompt is already available, return 0
-                return 0
+        clock = get_table_clock(table_id)
+        if not clock:
+            return 0
+        
+        prompt_time, zone = clock
+        now = utc_now()
+        local = now.astimezone(zone)
+        
+        # If we haven't reached today's prompt time, calculate time until then
+        if local.time() < prompt_time:
+            seconds = (boundary(local.date(), prompt_time, zone) - now).total_seconds()
+            return max(0, int(seconds))
+        else:
+            # Today's prompt is already available, return 0
+            return 0
     except Exception as e:
         logger.error(f"Error getting time until next prompt: {str(e)}")
         return 0
@@ -54,7 +125,7 @@ def get_time_until_next_prompt(table_id):
 def get_next_default_prompt(table_id):
     """Get the next default prompt for a table"""
     try:
-        with get_db_context() as conn:
+        with table_db_context(table_id) as conn:
             # Get the last prompt index used for this table
             cursor = conn.execute('''
                 SELECT dp.id 
@@ -92,43 +163,142 @@ def get_next_default_prompt(table_id):
         logger.error(f"Error getting next default prompt: {str(e)}")
         return "What's on your mind today?"
 
+def upsert_daily_prompt(conn, table_id, prompt_date):
+    """Insert the day's prompt unless one exists and return its row (one transaction)"""
+    table = conn.execute('SELECT prompt_time, timezone FROM tables WHERE id = ?', (table_id,)).fetchone()
+    if not table:
+        return None
+    editable_from, editable_until = edit_window(prompt_date, table['prompt_time'], get_zone(table['timezone']))
+    
+    # Get next default prompt
+    prompt_text = get_next_default_prompt(table_id)
+    
+    cursor = conn.execute('''
+        INSERT INTO prompts (table_id, prompt_text, prompt_date, is_custom, editable_from, editable_until)
+        VALUES (?, ?, ?, 0, ?, ?)
+        ON CONFLICT(table_id, prompt_date) DO NOTHING
+        RETURNING *
+    ''', (table_id, prompt_text, prompt_date, editable_from, editable_until))
+    
+    prompt = cursor.fetchone()
+    if prompt:
+        # A new day: whoever skipped the previous prompt loses their streak
+        reset_broken_streaks(conn, table_id, prompt_date)
+        logger.info(f"Created prompt for table {table_id} on {prompt_date}")
+        return prompt
+    
+    # Someone else created it first; read theirs in the same transaction
+    cursor = conn.execute('''
+        SELECT * FROM prompts 
+        WHERE table_id = ? AND prompt_date = ?
+    ''', (table_id, prompt_date))
+    return cursor.fetchone()
+
 def create_daily_prompt(table_id, prompt_date=None):
     """Create a daily prompt for a table"""
     if prompt_date is None:
         prompt_date = get_current_prompt_date(table_id)
     
     try:
-        with get_db_context() as conn:
-            # Check if prompt already exists
-            cursor = conn.execute('''
-                SELECT id FROM prompts 
-                WHERE table_id = ? AND prompt_date = ?
-            ''', (table_id, prompt_date))
-            
-            if cursor.fetchone():
-                logger.info(f"Prompt already exists for table {table_id} on {prompt_date}")
-                return True
-            
-            # Get next default prompt
-            prompt_text = get_next_default_prompt(table_id)
-            
-            # Create prompt
-            conn.execute('''
-                INSERT INTO prompts (table_id, prompt_text, prompt_date, is_custom)
-                VALUES (?, ?, ?, 0)
-            ''', (table_id, prompt_text, prompt_date))
-            
-            logger.info(f"Created prompt for table {table_id} on {prompt_date}")
-            return True
+        return run_write(upsert_daily_prompt, table_id, prompt_date, shard=shard_for(table_id)) is not None
     except Exception as e:
         logger.error(f"Error creating daily prompt: {str(e)}")
         return False
 
+def roll_over_table(table_id, now):
+    """Create a due table's prompt, then schedule its next boundary.
+    
+    The prompt lives on the table's shard and the boundary in the core file, so
+    these are two writes; if the second fails the next run redoes both, and the
+    upsert makes that harmless.
+    """
+    with get_db_context(query_only=True) as conn:
+        table = conn.execute(
+            'SELECT prompt_time, timezone, next_boundary_utc FROM tables WHERE id = ?',
+            (table_id,)
+        ).fetchone()
+    if not table:
+        return None
+    zone = get_zone(table['timezone'])
+    
+    # The boundary may still be a few seconds ahead; create the prompt for the date it opens
+    opens = now
+    if table['next_boundary_utc']:
+        due = datetime.strptime(table['next_boundary_utc'], TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc)
+        opens = max(now, due)
+    prompt = run_write(upsert_daily_prompt, table_id, prompt_date_at(opens, table['prompt_time'], zone),
+                       shard=shard_for(table_id))
+    
+    def schedule(conn):
+        conn.execute(
+            'UPDATE tables SET next_boundary_utc = ? WHERE id = ?',
+            (format_utc(next_boundary(table['prompt_time'], zone, opens)), table_id)
+        )
+        invalidate(conn, cache_key('table', table_id))
+    
+    run_write(schedule)
+    return prompt
+
+def get_due_tables(within=0, now=None):
+    """Ids of tables whose next boundary falls before now + within seconds (index range scan)"""
+    horizon = format_utc((now or utc_now()) + timedelta(seconds=within))
+    with get_db_context(query_only=True) as conn:
+        cursor = conn.execute('''
+            SELECT id FROM tables
+            WHERE next_boundary_utc <= ?
+            ORDER BY next_boundary_utc
+        ''', (horizon,))
+        return [row['id'] for row in cursor.fetchall()]
+
+def schedule_unscheduled_tables():
+    """Compute next_boundary_utc for tables that don't have one (e.g. after a migration)"""
+    def write(conn):
+        cursor = conn.execute('''
+            SELECT id, prompt_time, timezone FROM tables
+            WHERE next_boundary_utc IS NULL AND deleted_at IS NULL
+        ''')
+        tables = cursor.fetchall()
+        for table in tables:
+            conn.execute(
+                'UPDATE tables SET next_boundary_utc = ? WHERE id = ?',
+                (format_utc(next_boundary(table['prompt_time'], get_zone(table['timezone']))), table['id'])
+            )
+        if tables:
+            invalidate(conn, *(cache_key('table', table['id']) for table in tables))
+        return len(tables)
+    
+    return run_write(write)
+
+def create_due_prompts(within=None):
+    """Create prompts for tables rolling over within the next `within` seconds (for cron job)"""
+    if within is None:
+        within = Config.PROMPT_SCHEDULE_WINDOW
+    
+    try:
+        scheduled = schedule_unscheduled_tables()
+        if scheduled:
+            logger.info(f"Scheduled boundaries for {scheduled} tables")
+        
+        table_ids = get_due_tables(within)
+        success_count = 0
+        for table_id in table_ids:
+            try:
+                if roll_over_table(table_id, utc_now()) is not None:
+                    success_count += 1
+            except Exception as e:
+                logger.error(f"Error rolling over table {table_id}: {str(e)}")
+        
+        logger.info(f"Created prompts for {success_count}/{len(table_ids)} due tables")
+        return success_count == len(table_ids)
+    except Exception as e:
+        logger.error(f"Error creating due prompts: {str(e)}")
+        return False
+
 def create_prompts_for_all_tables():
-    """Create today's prompts for all tables (for cron job)"""
+    """Create today's prompts for all tables, due or not"""
     try:
         with get_db_context() as conn:
-            cursor = conn.execute('SELECT id FROM tables')
+            cursor = conn.execute('SELECT id FROM tables WHERE deleted_at IS NULL')
             tables = cursor.fetchall()
             
             success_count = 0
@@ -144,10 +314,22 @@ def create_prompts_for_all_tables():
         logger.error(f"Error creating prompts for all tables: {str(e)}")
         return False
 
+def prompt_summary(prompt):
+    """Public fields of a prompt row"""
+    return {
+        'id': prompt['id'],
+        'prompt_text': prompt['prompt_text'],
+        'prompt_date': prompt['prompt_date'],
+        'is_custom': bool(prompt['is_custom']),
+        'table_id': prompt['table_id'],
+        'editable_from': prompt['editable_from'],
+        'editable_until': prompt['editable_until']
+    }
+
 def get_prompt_for_date(table_id, prompt_date):
     """Get prompt for a specific date"""
     try:
-        with get_db_context() as conn:
+        with table_db_context(table_id, query_only=True) as conn:
             cursor = conn.execute('''
                 SELECT * FROM prompts 
                 WHERE table_id = ? AND prompt_date = ?
@@ -158,21 +340,25 @@ def get_prompt_for_date(table_id, prompt_date):
             if not prompt:
                 return None
             
-            return {
-                'id': prompt['id'],
-                'prompt_text': prompt['prompt_text'],
-                'prompt_date': prompt['prompt_date'],
-                'is_custom': bool(prompt['is_custom']),
-                'table_id': prompt['table_id']
-            }
+            return prompt_summary(prompt)
     except Exception as e:
         logger.error(f"Error getting prompt for date: {str(e)}")
         return None
 
 def ensure_prompt_exists(table_id, prompt_date):
     """Ensure a prompt exists for the given date, create if missing"""
+    # At the prompt boundary every member asks at once; let one caller do the work
+    return singleflight(('prompt', table_id, str(prompt_date)), _ensure_prompt_exists, table_id, prompt_date)
+
+def _ensure_prompt_exists(table_id, prompt_date):
     prompt = get_prompt_for_date(table_id, prompt_date)
-    if not prompt:
-        create_daily_prompt(table_id, prompt_date)
-        prompt = get_prompt_for_date(table_id, prompt_date)
-    return prompt
+    if prompt:
+        return prompt
+    
+    try:
+        # Create-or-fetch in one write, so concurrent callers all get the same row
+        prompt = run_write(upsert_daily_prompt, table_id, prompt_date, shard=shard_for(table_id))
+        return prompt_summary(prompt) if prompt else None
+    except Exception as e:
+        logger.error(f"Error ensuring prompt exists: {str(e)}")
+        return None
@@ -0,0 +1,214 @@
+import os
+import time
+import logging
+import threading
+from datetime import timedelta
+from config import Config
+from utils.db import get_db_context, shard_for, all_shards
+from utils.writer import run_write
+from utils.prompts import format_utc, utc_now
+from utils.archive import delete_archived_responses, delete_archived_table
+from utils.presence import forget_table, forget_user
+from utils.cache import cache_key, invalidate
+
+logger = logging.getLogger(__name__)
+
+# Background deletion metrics for this process
+purge_stats = {
+    'jobs_done': 0,
+    'batches': 0,
+    'rows_deleted': 0,
+    'errors': 0,
+}
+
+_purger = {'pid': None, 'thread': None, 'wake': None}
+
+# Batched deletes: each removes up to `limit` rows for one target and returns the count
+USER_BATCHES = [
+    ('responses', 'DELETE FROM responses WHERE id IN '
+                  '(SELECT id FROM responses WHERE user_id = ? LIMIT ?)'),
+    ('table_members', 'DELETE FROM table_members WHERE id IN '
+                      '(SELECT id FROM table_members WHERE user_id = ? LIMIT ?)'),
+    ('member_stats', 'DELETE FROM member_stats WHERE (table_id, user_id) IN '
+                     '(SELECT table_id, user_id FROM member_stats WHERE user_id = ? LIMIT ?)'),
+]
+
+TABLE_BATCHES = [
+    ('responses', 'DELETE FROM responses WHERE id IN '
+                  '(SELECT r.id FROM responses r JOIN prompts p ON r.prompt_id = p.id '
+                  'WHERE p.table_id = ? LIMIT ?)'),
+    ('prompts', 'DELETE FROM prompts WHERE id IN '
+                '(SELECT id FROM prompts WHERE table_id = ? LIMIT ?)'),
+    ('table_members', 'DELETE FROM table_members WHERE id IN '
+                      '(SELECT id FROM table_members WHERE table_id = ? LIMIT ?)'),
+    ('table_daily_stats', 'DELETE FROM table_daily_stats WHERE (table_id, prompt_date) IN '
+                          '(SELECT table_id, prompt_date FROM table_daily_stats WHERE table_id = ? LIMIT ?)'),
+    ('member_stats', 'DELETE FROM member_stats WHERE (table_id, user_id) IN '
+                     '(SELECT table_id, user_id FROM member_stats WHERE table_id = ? LIMIT ?)'),
+]
+
+def queue_deletion(conn, kind, target_id):
+    """Record a background deletion ('user' or 'table'); call inside the tombstoning write"""
+    conn.execute('INSERT INTO deletion_jobs (kind, target_id) VALUES (?, ?)', (kind, target_id))
+
+def get_deletion_job(kind, target_id):
+    """Latest deletion job for a target, with its progress, or None"""
+    with get_db_context(query_only=True) as conn:
+        cursor = conn.execute('''
+            SELECT * FROM deletion_jobs
+            WHERE kind = ? AND target_id = ?
+            ORDER BY id DESC LIMIT 1
+        ''', (kind, target_id))
+        return cursor.fetchone()
+
+def claim_job():
+    """Take the oldest pending job whose lease has expired, or None"""
+    def write(conn):
+        now = utc_now()
+        cursor = conn.execute('''
+            UPDATE deletion_jobs SET lease_until = ?
+            WHERE id = (
+                SELECT id FROM deletion_jobs
+                WHERE status = 'pending' AND (lease_until IS NULL OR lease_until < ?)
+                ORDER BY id LIMIT 1
+            )
+            RETURNING *
+        ''', (format_utc(now + timedelta(seconds=Config.PURGE_LEASE)), format_utc(now)))
+        return cursor.fetchone()
+
+    return run_write(write)
+
+def delete_in_batches(job, shard, statement):
+    """Run a batched delete until nothing is left, one short write per batch"""
+    total = 0
+    while True:
+        deleted = run_write(
+            lambda conn: conn.execute(statement, (job['target_id'], Config.PURGE_BATCH_SIZE)).rowcount,
+            shard=shard
+        )
+        purge_stats['batches'] += 1
+        if not deleted:
+            return total
+        total += deleted
+        purge_stats['rows_deleted'] += deleted
+        record_progress(job, deleted)
+        # Let queued request writes go first
+        time.sleep(Config.PURGE_PAUSE_MS / 1000)
+
+def record_progress(job, deleted):
+    """Add to a job's row count and extend its lease"""
+    lease_until = format_utc(utc_now() + timedelta(seconds=Config.PURGE_LEASE))
+    run_write(
+        lambda conn: conn.execute(
+            'UPDATE deletion_jobs SET rows_deleted = rows_deleted + ?, lease_until = ? WHERE id = ?',
+            (deleted, lease_until, job['id'])
+        ),
+        wait=False
+    )
+
+def purge_user(job):
+    """Delete a tombstoned user's rows on every shard, then the user"""
+    user_id = job['target_id']
+    for shard in all_shards():
+        for name, statement in USER_BATCHES:
+            deleted = delete_in_batches(job, shard, statement)
+            logger.debug(f"Deleted {deleted} {name} of user {user_id} on shard {shard}")
+    delete_archived_responses(user_id)
+
+    def write(conn):
+        forget_user(conn, user_id)
+        # Tables they created keep the (anonymized) row until those tables go
+        conn.execute('''
+            DELETE FROM users
+            WHERE id = ? AND deleted_at IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM tables WHERE created_by = ?)
+        ''', (user_id, user_id))
+
+    run_write(write)
+
+def purge_table(job):
+    """Delete a tombstoned table's history in batches, then the table"""
+    table_id = job['target_id']
+    shard = shard_for(table_id)
+    for name, statement in TABLE_BATCHES:
+        deleted = delete_in_batches(job, shard, statement)
+        logger.debug(f"Deleted {deleted} {name} of table {table_id}")
+    # Workers may have cached the member ids while the rows were still there
+    run_write(lambda conn: invalidate(conn, cache_key('members', table_id)), shard=shard)
+    delete_archived_table(table_id)
+
+    def write(conn):
+        table = conn.execute(
+            'SELECT created_by FROM tables WHERE id = ? AND deleted_at IS NOT NULL', (table_id,)
+        ).fetchone()
+        if not table:
+            return
+        forget_table(conn, table_id)
+        conn.execute('DELETE FROM tables WHERE id = ?', (table_id,))
+        # A deleted creator may have been kept only for this table
+        conn.execute('''
+            DELETE FROM users
+            WHERE id = ? AND deleted_at IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM tables WHERE created_by = ?)
+        ''', (table['created_by'], table['created_by']))
+
+    run_write(write)
+
+PURGES = {
+    'user': purge_user,
+    'table': purge_table,
+}
+
+def run_job(job):
+    """Run one claimed job to completion (safe to re-run after a crash)"""
+    started = time.perf_counter()
+    PURGES[job['kind']](job)
+    run_write(lambda conn: conn.execute(
+        "UPDATE deletion_jobs SET status = 'done', finished_at = ? WHERE id = ?",
+        (format_utc(utc_now()), job['id'])
+    ))
+    purge_stats['jobs_done'] += 1
+    logger.info(f"Purged {job['kind']} {job['target_id']} in {time.perf_counter() - started:.1f}s")
+
+def run_pending_jobs():
+    """Run pending deletion jobs until none are left; returns how many ran"""
+    count = 0
+    while True:
+        job = claim_job()
+        if job is None:
+            return count
+        try:
+            run_job(job)
+            count += 1
+        except Exception as e:
+            # The lease runs out and the job is retried later
+            purge_stats['errors'] += 1
+            logger.error(f"Deletion job {job['id']} failed: {str(e)}")
+            return count
+
+def run_purger(wake):
+    """Run deletion jobs when woken, or every PURGE_INTERVAL to pick up leftovers"""
+    while True:
+        wake.wait(Config.PURGE_INTERVAL)
+        wake.clear()
+        try:
+            run_pending_jobs()
+        except Exception as e:
+            purge_stats['errors'] += 1
+            logger.error(f"Purger error: {str(e)}")
+
+def start_purger():
+    """Start the background purger once per process (safe to call per request)"""
+    if not Config.PURGE_ENABLED or _purger['pid'] == os.getpid():
+        return
+    _purger['pid'] = os.getpid()
+    _purger['wake'] = threading.Event()
+    _purger['thread'] = threading.Thread(target=run_purger, args=(_purger['wake'],),
+                                         name='purger', daemon=True)
+    _purger['thread'].start()
+    logger.info("Started background purger")
+
+def wake_purger():
+    """Start on new jobs now rather than at the next interval"""
+    if _purger['pid'] == os.getpid():
+        _purger['wake'].set()
@@ -0,0 +1,69 @@
+import re
+import html
+import logging
+from config import Config
+from utils.db import table_db_context
+
+logger = logging.getLogger(__name__)
+
+# Marks highlight() puts around matches; swapped for <mark> after escaping the text
+MATCH_START, MATCH_END = '\x02', '\x03'
+
+MAX_TERMS = 8
+
+def match_query(text, table_id):
+    """FTS5 MATCH expression for free text in one table: every word must appear in
+    the response or prompt text, the last as a prefix.
+
+    Words are quoted so user input can't use (or break) FTS5 query syntax. The
+    table_id column filter lets FTS5 skip other tables' rows before ranking.
+    """
+    terms = re.findall(r'\w+', text.lower())[:MAX_TERMS]
+    if not terms:
+        return None
+    words = ' '.join(f'"{term}"' for term in terms) + '*'
+    return f'table_id : "{int(table_id)}" AND {{response_text prompt_text}} : ({words})'
+
+def highlight_html(text):
+    """Escape highlighted text and wrap the matches in <mark>"""
+    return html.escape(text).replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>')
+
+def search_responses(table_id, text, page=1, per_page=None):
+    """Ranked, highlighted responses in a table matching `text`, one page at a time"""
+    per_page = per_page or Config.SEARCH_PAGE_SIZE
+    query = match_query(text, table_id)
+    if query is None:
+        return {'results': [], 'page': page, 'per_page': per_page, 'has_more': False}
+    
+    with table_db_context(table_id, query_only=True) as conn:
+        # Responses weigh more than prompt text; members who left drop out like in the feed
+        cursor = conn.execute('''
+            SELECT r.id, r.prompt_id, r.user_id, r.response_text, r.created_at, r.edited_at,
+                   p.prompt_text, p.prompt_date, tm.display_name, u.username,
+                   highlight(table_response_search, 0, ?, ?) AS response_highlight,
+                   highlight(table_response_search, 1, ?, ?) AS prompt_highlight
+            FROM table_response_search
+            JOIN responses r ON r.id = table_response_search.rowid
+            JOIN prompts p ON p.id = r.prompt_id
+            JOIN table_members tm ON tm.user_id = r.user_id AND tm.table_id = p.table_id
+            JOIN users u ON u.id = r.user_id
+            WHERE table_response_search MATCH ? AND p.table_id = ?
+            ORDER BY bm25(table_response_search, 2.0, 1.0, 0.0)
+            LIMIT ? OFFSET ?
+        ''', (MATCH_START, MATCH_END, MATCH_START, MATCH_END, query, table_id,
+              per_page + 1, (page - 1) * per_page))
+        rows = cursor.fetchall()
+    
+    results = []
+    for row in rows[:per_page]:
+        result = {key: row[key] for key in row.keys() if not key.endswith('_highlight')}
+        result['response_html'] = highlight_html(row['response_highlight'])
+        result['prompt_html'] = highlight_html(row['prompt_highlight'])
+        results.append(result)
+    
+    return {
+        'results': results,
+        'page': page,
+        'per_page': per_page,
+        'has_more': len(rows) > per_page
+    }
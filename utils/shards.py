@@ -0,0 +1,154 @@
+import os
+import logging
+from utils.db import get_db, init_shard, shard_path, all_shards, _shard_cache, CORE_ALIAS
+from utils.cache import cache_key, invalidate
+
+logger = logging.getLogger(__name__)
+
+# Everything a table has on its shard, in insert order: (table, rows belonging to table_id)
+MOVED_TABLES = [
+    ('table_members', 'table_id = ?'),
+    ('prompts', 'table_id = ?'),
+    ('responses', 'prompt_id IN (SELECT id FROM {source}.prompts WHERE table_id = ?)'),
+    ('table_daily_stats', 'table_id = ?'),
+    ('member_stats', 'table_id = ?'),
+]
+
+def shard_table_counts():
+    """{shard: number of tables} for every shard in use or configured"""
+    conn = get_db()
+    try:
+        counts = {shard: 0 for shard in all_shards()}
+        for row in conn.execute('SELECT shard, COUNT(*) AS count FROM tables GROUP BY shard'):
+            counts[row['shard']] = row['count']
+        return counts
+    finally:
+        conn.close()
+
+def plan_rebalance():
+    """[(table_id, from_shard, to_shard)] that evens out tables across Config.DB_SHARDS.
+
+    Tables on shards beyond DB_SHARDS (after lowering it) are always moved.
+    """
+    conn = get_db()
+    try:
+        placement = {}
+        for row in conn.execute('SELECT id, shard FROM tables ORDER BY id DESC'):
+            placement.setdefault(row['shard'], []).append(row['id'])
+    finally:
+        conn.close()
+
+    loads = {shard: len(placement.get(shard, [])) for shard in all_shards()}
+    moves = []
+    for shard, table_ids in placement.items():
+        if shard not in loads:
+            for table_id in table_ids:
+                target = min(loads, key=loads.get)
+                moves.append((table_id, shard, target))
+                loads[target] += 1
+
+    while True:
+        fullest = max(loads, key=loads.get)
+        emptiest = min(loads, key=loads.get)
+        if loads[fullest] - loads[emptiest] <= 1:
+            break
+        # Newest tables first: they have the least history to copy
+        table_id = placement[fullest].pop(0)
+        moves.append((table_id, fullest, emptiest))
+        loads[fullest] -= 1
+        loads[emptiest] += 1
+    return moves
+
+def move_table(table_id, to_shard):
+    """Move a table's members, prompts and responses to another shard, keeping their ids.
+
+    Copies into the destination, points tables.shard at it, then deletes from the
+    source. A crash part way leaves the rows in both files with the core still
+    pointing at one of them; running the move again finishes it. The app caches
+    shard placement per process, so only run this with the app stopped.
+    """
+    core = get_db()
+    try:
+        row = core.execute('SELECT shard FROM tables WHERE id = ?', (table_id,)).fetchone()
+    finally:
+        core.close()
+    if row is None:
+        raise ValueError(f"No table with id {table_id}")
+    from_shard = row['shard']
+    if from_shard == to_shard:
+        return 0
+    if not os.path.exists(shard_path(from_shard)):
+        raise ValueError(f"Shard file {shard_path(from_shard)} does not exist")
+    if to_shard and not os.path.exists(shard_path(to_shard)):
+        init_shard(to_shard)
+
+    copied = _copy_table(table_id, from_shard, to_shard)
+
+    core = get_db()
+    try:
+        core.execute('UPDATE tables SET shard = ? WHERE id = ?', (to_shard, table_id))
+        invalidate(core, cache_key('table', table_id))
+        core.commit()
+    finally:
+        core.close()
+    _shard_cache.pop(table_id, None)
+
+    _delete_table(table_id, from_shard)
+    logger.info(f"Moved table {table_id} from shard {from_shard} to shard {to_shard} ({copied} rows)")
+    return copied
+
+def _copy_table(table_id, from_shard, to_shard):
+    conn = get_db(shard=to_shard)
+    # Transactions are managed explicitly below
+    conn.isolation_level = None
+    try:
+        if from_shard == 0 and to_shard != 0:
+            source = CORE_ALIAS
+        else:
+            source = 'source'
+            conn.execute(f'ATTACH DATABASE ? AS {source}', (shard_path(from_shard),))
+
+        conn.execute('BEGIN IMMEDIATE')
+        # Explicit ids would push this shard's sequences into the source's id range
+        sequences = conn.execute('SELECT name, seq FROM main.sqlite_sequence').fetchall()
+
+        copied = 0
+        # Parents before children for the responses -> prompts foreign key; the
+        # rollups go last, overwriting what the insert triggers counted
+        for table, where in MOVED_TABLES:
+            where = where.format(source=source)
+            columns = ', '.join(row['name'] for row in conn.execute(f'PRAGMA main.table_info({table})'))
+            copied += conn.execute(f'''
+                INSERT OR REPLACE INTO main.{table} ({columns})
+                SELECT {columns} FROM {source}.{table} WHERE {where}
+            ''', (table_id,)).rowcount
+
+        for sequence in sequences:
+            conn.execute('UPDATE main.sqlite_sequence SET seq = ? WHERE name = ?',
+                         (sequence['seq'], sequence['name']))
+        conn.execute('COMMIT')
+        return copied
+    except Exception:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+
+def _delete_table(table_id, shard):
+    conn = get_db(shard=shard)
+    try:
+        for table, where in reversed(MOVED_TABLES):
+            conn.execute(f'DELETE FROM {table} WHERE {where.format(source="main")}', (table_id,))
+        conn.commit()
+    finally:
+        conn.close()
+
+def rebalance(dry_run=False):
+    """Apply plan_rebalance(); returns the planned moves"""
+    moves = plan_rebalance()
+    for table_id, from_shard, to_shard in moves:
+        logger.info(f"{'Would move' if dry_run else 'Moving'} table {table_id}: shard {from_shard} -> {to_shard}")
+        if not dry_run:
+            move_table(table_id, to_shard)
+    return moves
@@ -0,0 +1,47 @@
+import logging
+import threading
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+# Coalescing metrics for this process
+singleflight_stats = {
+    'calls': 0,
+    'shared': 0,
+}
+
+_flights = {}
+_lock = threading.Lock()
+
+def singleflight(key, fn, *args):
+    """Run fn(*args) once per key at a time; concurrent callers wait and share its result.
+
+    Exceptions are shared too. Keys only live while a call is in flight, so this
+    never serves anything older than the call a waiter joined.
+    """
+    with _lock:
+        future = _flights.get(key)
+        leader = future is None
+        if leader:
+            future = _flights[key] = Future()
+        singleflight_stats['calls'] += 1
+        singleflight_stats['shared'] += not leader
+
+    if not leader:
+        return future.result()
+
+    try:
+        result = fn(*args)
+        future.set_result(result)
+        return result
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        forget(key, future)
+
+def forget(key, future=None):
+    """Stop sharing an in-flight call, e.g. after a write made its result stale"""
+    with _lock:
+        if future is None or _flights.get(key) is future:
+            _flights.pop(key, None)
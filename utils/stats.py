@@ -0,0 +1,97 @@
+import bisect
+import logging
+from datetime import date, datetime, timedelta, timezone
+from config import Config
+from utils.db import table_db_context
+from utils.prompts import get_table_clock, prompt_date_at, TIMESTAMP_FORMAT
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+def answered_streaks(days, current_date):
+    """(current, best) runs of consecutive prompt days with at least one response.
+
+    `days` is oldest first. The current day doesn't break the current streak
+    while it's still open and nobody has answered yet.
+    """
+    current = best = run = 0
+    previous = None
+    for day in days:
+        prompt_date = date.fromisoformat(day['prompt_date'])
+        if day['responses'] and previous is not None and prompt_date - previous == timedelta(days=1):
+            run += 1
+        elif day['responses']:
+            run = 1
+        elif prompt_date < current_date:
+            run = 0
+        previous = prompt_date
+        best = max(best, run)
+
+    if previous is not None and previous >= current_date - timedelta(days=1):
+        current = run
+    return current, best
+
+def get_table_stats(table_id, current_date):
+    """Engagement stats for a table, read from the rollups only (O(days + members))"""
+    with table_db_context(table_id, query_only=True) as conn:
+        days = conn.execute('''
+            SELECT prompt_date, members, responses FROM table_daily_stats
+            WHERE table_id = ? AND prompt_date <= ?
+            ORDER BY prompt_date
+        ''', (table_id, str(current_date))).fetchall()
+        members = conn.execute('''
+            SELECT tm.user_id, tm.display_name, tm.joined_at, tm.streak_current, tm.streak_best,
+                   COALESCE(ms.responses, 0) AS responses, ms.last_response_at
+            FROM table_members tm
+            LEFT JOIN member_stats ms ON ms.table_id = tm.table_id AND ms.user_id = tm.user_id
+            WHERE tm.table_id = ?
+            ORDER BY tm.joined_at
+        ''', (table_id,)).fetchall()
+
+    dates = [day['prompt_date'] for day in days]
+    clock = get_table_clock(table_id)
+    member_stats = []
+    for member in members:
+        # Prompts since they joined: from the prompt that was open when they
+        # joined (joined_at is UTC, prompt dates are in the table's zone)
+        joined_at = datetime.strptime(str(member['joined_at']), TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc)
+        first_date = prompt_date_at(joined_at, *clock) if clock else joined_at.date()
+        prompts = len(dates) - bisect.bisect_left(dates, str(first_date))
+        member_stats.append({
+            'user_id': member['user_id'],
+            'display_name': member['display_name'],
+            'responses': member['responses'],
+            'prompts': prompts,
+            'response_rate': round(member['responses'] / prompts, 3) if prompts else None,
+            'streak_current': member['streak_current'],
+            'streak_best': member['streak_best'],
+            'last_response_at': member['last_response_at'],
+        })
+
+    weekdays = {name: 0 for name in WEEKDAYS}
+    for day in days:
+        weekdays[WEEKDAYS[date.fromisoformat(day['prompt_date']).weekday()]] += day['responses']
+
+    total_responses = sum(day['responses'] for day in days)
+    possible = sum(day['members'] for day in days)
+    current_streak, best_streak = answered_streaks(days, current_date)
+    most_active = sorted(days, key=lambda day: (day['responses'], day['prompt_date']), reverse=True)
+
+    return {
+        'prompts': len(days),
+        'responses': total_responses,
+        'response_rate': round(total_responses / possible, 3) if possible else None,
+        'current_streak': current_streak,
+        'best_streak': best_streak,
+        'members': member_stats,
+        'weekdays': weekdays,
+        'most_active_days': [
+            {'prompt_date': day['prompt_date'], 'responses': day['responses'], 'members': day['members']}
+            for day in most_active[:Config.STATS_TOP_DAYS] if day['responses']
+        ],
+        'recent_days': [
+            {'prompt_date': day['prompt_date'], 'responses': day['responses'], 'members': day['members']}
+            for day in days[-Config.STATS_RECENT_DAYS:]
+        ],
+    }
@@ -0,0 +1,110 @@
+import os
+import logging
+from config import Config
+from utils.db import get_db, all_shards
+from utils.writer import run_write
+
+logger = logging.getLogger(__name__)
+
+# A streak counts answers to consecutive prompts of the table (not calendar days,
+# so a day nobody opened the table doesn't break it)
+
+def extend_streak(conn, prompt_id, user_id):
+    """Count a new answer towards the member's streak; call in the write that inserted it"""
+    conn.execute('''
+        WITH answered AS (
+            SELECT p.table_id, p.prompt_date,
+                   (SELECT MAX(prompt_date) FROM prompts
+                    WHERE table_id = p.table_id AND prompt_date < p.prompt_date) AS previous
+            FROM prompts p WHERE p.id = ?
+        )
+        UPDATE table_members SET
+            streak_current = CASE WHEN last_answered_prompt_date = answered.previous
+                                  THEN streak_current + 1 ELSE 1 END,
+            streak_best = MAX(streak_best, CASE WHEN last_answered_prompt_date = answered.previous
+                                                THEN streak_current + 1 ELSE 1 END),
+            last_answered_prompt_date = answered.prompt_date
+        FROM answered
+        WHERE table_members.table_id = answered.table_id AND table_members.user_id = ?
+          AND (last_answered_prompt_date IS NULL OR last_answered_prompt_date < answered.prompt_date)
+    ''', (prompt_id, user_id))
+
+def reset_broken_streaks(conn, table_id, prompt_date):
+    """Zero the streaks of members who skipped the prompt before `prompt_date` (a new day opening)"""
+    return conn.execute('''
+        UPDATE table_members SET streak_current = 0
+        WHERE table_id = ? AND streak_current > 0
+          AND last_answered_prompt_date < (
+              SELECT MAX(prompt_date) FROM prompts WHERE table_id = ? AND prompt_date < ?
+          )
+    ''', (table_id, table_id, str(prompt_date))).rowcount
+
+def compute_streaks(prompt_dates, answered_dates):
+    """(streak_current, streak_best, last_answered_prompt_date) from full history.
+
+    The latest prompt may still be open, so not having answered it yet doesn't
+    break the current streak.
+    """
+    current = best = 0
+    last = None
+    for index, prompt_date in enumerate(prompt_dates):
+        if prompt_date in answered_dates:
+            current += 1
+            best = max(best, current)
+            last = prompt_date
+        elif index < len(prompt_dates) - 1:
+            current = 0
+    return current, best, last
+
+def backfill_table(conn, table_id, sources):
+    """Recompute one table's streak columns from its prompts and responses"""
+    prompt_dates = set()
+    answered = {}
+    for schema in sources:
+        for row in conn.execute(f'''
+            SELECT p.prompt_date, r.user_id
+            FROM {schema}.prompts p
+            LEFT JOIN {schema}.responses r ON r.prompt_id = p.id
+            WHERE p.table_id = ?
+        ''', (table_id,)):
+            prompt_dates.add(row['prompt_date'])
+            if row['user_id'] is not None:
+                answered.setdefault(row['user_id'], set()).add(row['prompt_date'])
+    prompt_dates = sorted(prompt_dates)
+
+    updates = []
+    for member in conn.execute('SELECT user_id FROM table_members WHERE table_id = ?', (table_id,)):
+        current, best, last = compute_streaks(prompt_dates, answered.get(member['user_id'], set()))
+        updates.append((current, best, last, table_id, member['user_id'], last or ''))
+    return updates
+
+def backfill_streaks():
+    """Recompute every member's streak columns, archive included; returns members updated"""
+    # utils.archive imports utils.prompts, which imports this module
+    from utils.archive import attach_archive
+    
+    total = 0
+    for shard in all_shards():
+        conn = get_db(shard=shard)
+        try:
+            sources = ['main']
+            if os.path.exists(Config.ARCHIVE_DATABASE_PATH):
+                attach_archive(conn)
+                conn.commit()
+                sources.insert(0, 'archive')
+            table_ids = [row['table_id'] for row in conn.execute('SELECT DISTINCT table_id FROM table_members')]
+            for table_id in table_ids:
+                updates = backfill_table(conn, table_id, sources)
+                # One short write per table so request writes keep flowing; members
+                # who answered since the read above already have newer counts
+                run_write(lambda write_conn: write_conn.executemany('''
+                    UPDATE table_members
+                    SET streak_current = ?, streak_best = ?, last_answered_prompt_date = ?
+                    WHERE table_id = ? AND user_id = ?
+                      AND (last_answered_prompt_date IS NULL OR last_answered_prompt_date <= ?)
+                ''', updates), shard=shard)
+                total += len(updates)
+        finally:
+            conn.close()
+        logger.info(f"Backfilled streaks for {len(table_ids)} tables on shard {shard}")
+    return total
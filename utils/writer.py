@@ -0,0 +1,161 @@
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from config import Config
+from utils import db
+from utils.metrics import current_route, bound_route
+
+logger = logging.getLogger(__name__)
+
+# Group commit metrics for this process
+writer_stats = {
+    'batches': 0,
+    'writes': 0,
+    'errors': 0,
+    'max_batch': 0,
+    'last_commit_ms': 0.0,
+    'max_commit_ms': 0.0,
+}
+
+# One writer thread per shard, keyed by shard number
+_writers = {'pid': None}
+_start_lock = threading.Lock()
+
+def run_write(fn, *args, wait=True, shard=0):
+    """Run fn(conn, *args) on a shard's writer connection and return its result.
+
+    Concurrent writes are batched into one transaction; each runs in its own
+    savepoint so a failing write doesn't roll back the others, and results are
+    only returned once the batch has committed. With wait=False the write is
+    queued and a Future is returned instead.
+    """
+    if not Config.WRITE_QUEUE_ENABLED:
+        return _run_inline(fn, args, shard) if wait else _resolved(fn, args, shard)
+
+    if getattr(threading.current_thread(), 'shard', None) == shard:
+        # Nested write from inside a batch, already on the writer connection
+        return fn(db.shared_conn(shard), *args)
+
+    future = Future()
+    _start_writer(shard).put((fn, args, future, current_route()))
+    if not wait:
+        # Nobody reads the result, so make sure failures are at least logged
+        future.add_done_callback(_log_failure)
+        return future
+    return future.result(timeout=Config.WRITE_TIMEOUT)
+
+def _log_failure(future):
+    if future.exception() is not None:
+        logger.error(f"Queued write failed: {str(future.exception())}")
+
+def _run_inline(fn, args, shard=0):
+    """Fallback when the queue is disabled: one transaction on a private connection"""
+    outer_conns = getattr(db._local, 'conns', {})
+    outer_sharing = getattr(db._local, 'sharing', None)
+    db._local.conns, db._local.sharing = {}, None
+    try:
+        with db.shared_db_context(shard=shard) as conn:
+            return fn(conn, *args)
+    finally:
+        db._local.conns, db._local.sharing = outer_conns, outer_sharing
+
+def _resolved(fn, args, shard=0):
+    future = Future()
+    future.add_done_callback(_log_failure)
+    try:
+        future.set_result(_run_inline(fn, args, shard))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+def _start_writer(shard=0):
+    """Start a shard's writer thread once per process (also after a gunicorn fork)"""
+    with _start_lock:
+        if _writers['pid'] != os.getpid():
+            _writers.clear()
+            _writers['pid'] = os.getpid()
+        if shard not in _writers:
+            jobs = queue.Queue()
+            thread = threading.Thread(target=_writer_loop, args=(jobs, shard),
+                                      name=f'db-writer-{shard}', daemon=True)
+            # Lets run_write spot nested writes from inside a batch
+            thread.shard = shard
+            thread.start()
+            _writers[shard] = jobs
+            logger.info(f"Started database writer thread for shard {shard}")
+        return _writers[shard]
+
+def _next_batch(jobs):
+    """Block for one write, then gather whatever else arrives within the batch window"""
+    batch = [jobs.get()]
+    deadline = time.monotonic() + Config.WRITE_BATCH_WAIT_MS / 1000
+    while len(batch) < Config.WRITE_BATCH_MAX:
+        remaining = deadline - time.monotonic()
+        try:
+            batch.append(jobs.get(timeout=remaining) if remaining > 0 else jobs.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+def _writer_loop(jobs, shard=0):
+    conn = None
+    while True:
+        batch = _next_batch(jobs)
+        try:
+            if conn is None:
+                conn = db.get_db(shard=shard)
+                # Transactions are managed explicitly below
+                conn.isolation_level = None
+            _commit_batch(conn, batch, shard)
+        except Exception as e:
+            writer_stats['errors'] += 1
+            logger.error(f"Writer batch failed: {str(e)}")
+            for _, _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            if conn is not None:
+                conn.close()
+                conn = None
+
+def _commit_batch(conn, batch, shard=0):
+    results = []
+    started = time.perf_counter()
+    conn.execute('BEGIN IMMEDIATE')
+    # Nested get_db_context calls inside a write reuse this connection
+    db.set_shared_conn(shard, conn)
+    try:
+        for fn, args, future, route in batch:
+            conn.execute('SAVEPOINT write')
+            try:
+                # The write's statements count towards the route that queued it
+                with bound_route(route):
+                    results.append((future, True, fn(conn, *args)))
+                conn.execute('RELEASE write')
+            except Exception as e:
+                conn.execute('ROLLBACK TO write')
+                conn.execute('RELEASE write')
+                results.append((future, False, e))
+        conn.execute('COMMIT')
+    except Exception:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        raise
+    finally:
+        db.set_shared_conn(shard, None)
+
+    duration_ms = (time.perf_counter() - started) * 1000
+    writer_stats['batches'] += 1
+    writer_stats['writes'] += len(batch)
+    writer_stats['max_batch'] = max(writer_stats['max_batch'], len(batch))
+    writer_stats['last_commit_ms'] = duration_ms
+    writer_stats['max_commit_ms'] = max(writer_stats['max_commit_ms'], duration_ms)
+
+    # Only acknowledge writes once they are durable
+    for future, ok, value in results:
+        if ok:
+            future.set_result(value)
+        else:
+            future.set_exception(value)